@@ -1,16 +1,162 @@
-from fastapi import FastAPI
-from websocket_server import data_store  # ✅ Import shared data
+from contextlib import asynccontextmanager
+from typing import Optional
 
-app = FastAPI()
+from websockets.exceptions import ConnectionClosed
+from fastapi import APIRouter, FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 
-@app.get("/latest_solution")
-def get_latest_solution():
-    return {"status": "success", "solution": data_store["solution"]} if data_store["solution"] else {"status": "error", "message": "No solution received yet."}
+import websocket_server as bridge
 
-@app.get("/latest_command")
-def get_latest_command():
-    return {"status": "success", "command": data_store["command"]} if data_store["command"] else {"status": "error", "message": "No command received yet."}
+IMAGE_MEDIA_TYPES = {1: "image/jpeg", 2: "image/png"}
 
-@app.get("/latest_image")
-def get_latest_image():
-    return {"status": "success", "image": data_store["image"]} if data_store["image"] else {"status": "error", "message": "No image received yet."}
+
+@asynccontextmanager
+async def lifespan(app):
+    """MQTT ingestion runs on the uvicorn event loop, for the routes and the websockets to share the state."""
+    client = bridge.start_mqtt()
+    yield
+    bridge.stop_mqtt(client)
+
+
+app = FastAPI(lifespan=lifespan)
+router = APIRouter()
+
+
+class ASGIWebSocket:
+    """FastAPI websocket with the interface used by the bridge (send, wait_closed, close)."""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+
+    async def send(self, data, text=False):
+        try:
+            if text:
+                await self.websocket.send_text(data.decode("utf-8"))
+            else:
+                await self.websocket.send_bytes(data)
+        except WebSocketDisconnect as e:
+            raise ConnectionClosed(None, None) from e
+
+    async def wait_closed(self):
+        try:
+            while (await self.websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except WebSocketDisconnect:
+            pass
+
+    async def close(self):
+        try:
+            await self.websocket.close()
+        except (RuntimeError, WebSocketDisconnect):
+            pass  # already closed
+
+    def __str__(self):
+        return f"{self.websocket.client}"
+
+
+@app.websocket("/")
+@app.websocket("/ws/")
+async def websocket_endpoint(websocket: WebSocket, robot: Optional[str] = None, types: Optional[str] = None):
+    """Websocket subscribed to a robot (?robot=<id>, all the robots when omitted) and to
+    message types (?types=status,solution,moves,command,image,face, all when omitted)."""
+    await websocket.accept()
+    await bridge.websocket_handler(ASGIWebSocket(websocket), robot,
+                                   set(types.split(",")) if types else None)
+
+
+def image_response(payload, request):
+    """Image bytes of a binary image message, with ETag (304 when it matches If-None-Match)."""
+    if payload is None:
+        raise HTTPException(status_code=404, detail="No image received yet.")
+    magic, version, kind, side, encoding, timestamp, width, height = bridge.IMAGE_HEADER.unpack_from(payload)
+    etag = f'"{kind}-{side}-{timestamp:.6f}-{len(payload)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload[bridge.IMAGE_HEADER.size:], headers=headers,
+                    media_type=IMAGE_MEDIA_TYPES.get(encoding, "application/octet-stream"))
+
+
+def robot_snapshot(robot):
+    """Cycle snapshot of the robot; without robot, of the robot DEFAULT_ROBOT or else of the last updated one."""
+    if robot is None:
+        shard = bridge.robots.get(bridge.DEFAULT_ROBOT) or max(bridge.robots.values(), key=lambda r: r.updated, default=None)
+    else:
+        shard = bridge.robots.get(robot)
+    if shard is None:
+        raise HTTPException(status_code=404, detail="Unknown robot.")
+    return shard.snapshot
+
+
+@router.get("/robots")
+def get_robots():
+    return {"status": "success", "robots": [
+        {"robot": shard.robot_id,
+         "robot_state": shard.snapshot.status_message["robot_state"] if shard.snapshot.status_message else None,
+         "subscribers": len(shard.subscribers)} for shard in bridge.robots.values()]}
+
+@router.get("/latest_status")
+@router.get("/robots/{robot}/latest_status")
+def get_latest_status(robot: Optional[str] = None):
+    status = robot_snapshot(robot).status_message
+    return {"status": "success", "robot_state": status["robot_state"]} if status else {"status": "error", "message": "No status received yet."}
+
+@router.get("/latest_solution")
+@router.get("/robots/{robot}/latest_solution")
+def get_latest_solution(robot: Optional[str] = None):
+    solution = robot_snapshot(robot).solution_message
+    return {"status": "success", "solution": solution["solution"]} if solution else {"status": "error", "message": "No solution received yet."}
+
+@router.get("/latest_command")
+@router.get("/robots/{robot}/latest_command")
+def get_latest_command(robot: Optional[str] = None):
+    snapshot = robot_snapshot(robot)
+    command = snapshot.last_command
+    return {"status": "success", "command": command, "progress": snapshot.progress} if command else {"status": "error", "message": "No command received yet."}
+
+@router.get("/latest_image")
+@router.get("/robots/{robot}/latest_image")
+def get_latest_image(request: Request, robot: Optional[str] = None):
+    return image_response(robot_snapshot(robot).images.get("collage"), request)
+
+@router.get("/latest_face/{side}")
+@router.get("/robots/{robot}/latest_face/{side}")
+def get_latest_face(side: int, request: Request, robot: Optional[str] = None):
+    return image_response(robot_snapshot(robot).images.get(str(side)), request)
+
+
+def store():
+    if bridge.cycle_store is None:
+        raise HTTPException(status_code=503, detail="Cycle store disabled.")
+    return bridge.cycle_store
+
+@router.get("/cycles")
+def get_cycles(robot: Optional[str] = None, kind: Optional[str] = None, outcome: Optional[str] = None,
+               since: Optional[float] = None, until: Optional[float] = None, limit: int = 50, offset: int = 0):
+    return {"status": "success", **store().list(robot, kind, outcome, since, until, limit, offset)}
+
+@router.get("/cycles/{cycle_id}")
+def get_cycle(cycle_id: int):
+    cycle = store().get(cycle_id)
+    if cycle is None:
+        raise HTTPException(status_code=404, detail="Unknown cycle.")
+    return {"status": "success", "cycle": cycle}
+
+@router.get("/stats/solves_per_hour")
+def get_solves_per_hour(robot: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None):
+    return {"status": "success", **store().solves_per_hour(robot, since, until)}
+
+@router.get("/stats/phase_times")
+def get_phase_times(robot: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None):
+    return {"status": "success", "phases": store().phase_times(robot, since, until)}
+
+@router.get("/stats/color_methods")
+def get_color_methods(robot: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None):
+    return {"status": "success", "color_methods": store().color_methods(robot, since, until)}
+
+@router.get("/stats/outcomes")
+def get_outcomes(robot: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None):
+    return {"status": "success", "outcomes": store().outcomes(robot, since, until)}
+
+
+app.include_router(router)
+app.include_router(router, prefix="/api")  # Path routed to the backend by the ingress
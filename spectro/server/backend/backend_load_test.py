@@ -0,0 +1,340 @@
+"""Load test of the whole backend with a synthetic robot fleet: no robot needed.
+
+N simulated robots publish back-to-back cycles, as Cubotino_T_server.py does: status transitions,
+solution, per-op moves messages, face images (--image_kb, at --face_rate per second while
+scanning), cycle summary. The backend (api.app: MQTT ingestion, websockets, REST routes, cycle
+store) runs in this process on uvicorn; the robots reach it either
+  - in-process: a producer thread plays the paho network thread, calling on_message (default)
+  - broker: one paho client per robot publishing to a local broker (--broker, i.e. mosquitto),
+    the backend subscribing to it as in production
+Meanwhile M websocket consumers (each subscribed to one robot, or to all with --all_every) and
+H HTTP consumers (status, images with ETag, cycle stats) load the backend; they run in --procs
+worker processes, for the consumers not to compete with the backend for its event loop.
+
+Report:
+  - ingestion: messages published and processed per second, ingest buffer drops
+  - delivery: end-to-end latency (robot publish -> websocket receive) p50 / p95 / p99 / max,
+    messages missing on the websockets, frames dropped by the client queues
+  - HTTP: requests per second, latency p50 / p99, errors
+  - memory: process RSS and state store size (snapshots, dedup ids) at start and end
+
+Example: python backend_load_test.py --robots 20 --ws 200 --http 10 --seconds 30
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import multiprocessing
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+
+import aiohttp
+import paho.mqtt.client as mqtt
+import uvicorn
+import websockets
+
+import websocket_server as bridge
+from api import app
+
+FACE_ORDER = (1, 2, 3, 4, 5, 6)
+OPS = ("R", "U", "F", "D", "L", "B")
+
+
+class Message:
+    """paho MQTTMessage stand-in."""
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+
+class SimRobot:
+    """Message schedule of a robot running back-to-back scramble + solve cycles."""
+
+    def __init__(self, robot_id, args):
+        self.robot_id = robot_id
+        self.args = args
+        self.topic = f"robot/{robot_id}/data"
+        self.session = f"{random.getrandbits(32):x}"
+        self.seq = 0
+        self.image = os.urandom(args.image_kb * 1024)
+        self.tracked = 0  # messages carrying their send time, for the delivery latency
+
+    def message(self, msg_type, **fields):
+        self.seq += 1
+        return {"type": msg_type, **fields, "timestamp": int(time.time()), "id": f"{self.session}-{self.seq}",
+                "robot": self.robot_id}
+
+    def schedule(self):
+        """Endless (delay secs, kind, side / message) steps: kind "json" or "image"."""
+        args = self.args
+        op_delay = 1 / args.op_rate
+        while True:
+            yield random.uniform(0, 1), "json", self.message("status", robot_state="Scrambling")
+            for i in range(args.ops):
+                yield op_delay, "moves", self.message("moves", events=[{"op": random.choice(OPS), "arg": 1,
+                                                                      "index": i, "total": args.ops}],
+                                                      progress=round(100 * (i + 1) / args.ops), total=args.ops)
+            yield 0, "json", self.message("status", robot_state="Scramble finished")
+            yield 0, "json", self.message("status", robot_state="Solving")
+            for side in FACE_ORDER:
+                yield 1 / args.face_rate, "image", side
+            solved = random.random() > args.fail_rate
+            yield 0.5, "json", self.message("solution", solution=" ".join(random.choices(OPS, k=20)))
+            for i in range(args.ops):
+                yield op_delay, "moves", self.message("moves", events=[{"op": random.choice(OPS), "arg": 1,
+                                                                      "index": i, "total": args.ops}],
+                                                      progress=round(100 * (i + 1) / args.ops), total=args.ops)
+            yield 0, "json", self.message("cycle", color_method=random.choice(("BGR", "BGR", "HSV", "BGR_dom"))
+                                          if solved else None,
+                                          phases={"camera": 1.0, "detection": round(random.uniform(5, 15), 2),
+                                                  "solver": 0.5, "robot": args.ops * op_delay, "total": 40.0},
+                                          solved=solved)
+            yield 0, "json", self.message("status", robot_state="Idle")
+            yield 0, "image", "collage"
+
+    def payload(self, kind, item):
+        """Topic and payload bytes of a step; moves messages carry their send time."""
+        if kind == "image":
+            header = bridge.IMAGE_HEADER.pack(b"CIMG", 1, 2 if item == "collage" else 1, 0 if item == "collage" else item,
+                                              1, time.time(), 320, 240)
+            return f"{self.topic}/image/{item}", header + self.image
+        if kind == "moves":
+            item["sent"] = time.time()
+            self.tracked += 1
+        return self.topic, json.dumps(item).encode()
+
+
+def produce(robots, publish, stop, counters):
+    """Merges the robot schedules by time, and publishes them from this thread until stop is set."""
+    start = time.perf_counter()
+    heap = []
+    for i, robot in enumerate(robots):
+        steps = robot.schedule()
+        delay, kind, item = next(steps)
+        heap.append((start + delay, i, steps, kind, item))
+    heapq.heapify(heap)
+    while heap and not stop.is_set():
+        due, i, steps, kind, item = heapq.heappop(heap)
+        wait = due - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        topic, payload = robots[i].payload(kind, item)
+        publish(i, topic, payload)
+        counters["published"] += 1
+        counters["bytes"] += len(payload)
+        delay, kind, item = next(steps)
+        heapq.heappush(heap, (max(due + delay, time.perf_counter()), i, steps, kind, item))
+
+
+def percentiles(values, ps=(0.5, 0.95, 0.99)):
+    values = sorted(values)
+    if not values:
+        return "n/a"
+    pick = lambda p: 1000 * values[min(len(values) - 1, int(p * len(values)))]
+    return "  ".join(f"p{round(100 * p)} {pick(p):7.1f}" for p in ps) + f"  max {1000 * values[-1]:7.1f} ms"
+
+
+def rss_mb():
+    """Resident memory of the process (MB), from /proc (0 where not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return 0.0
+
+
+def store_size():
+    """State store size: robots, dedup ids, snapshot commands and image bytes."""
+    shards = list(bridge.robots.values())
+    return {"robots": len(shards),
+            "seen_ids": sum(len(s.seen_ids) for s in shards),
+            "commands": sum(len(s.snapshot.commands) for s in shards),
+            "image_mb": round(sum(len(p) for s in shards for p in s.snapshot.images.values()) / 2 ** 20, 2)}
+
+
+def processed():
+    """Messages processed by the ingestion: received, less dropped and still buffered."""
+    stats = bridge.ingest.stats()
+    return stats["received"] - stats["dropped"] - stats["depth"]
+
+
+async def ws_consumer(uri, robot_id, latencies, received, stop):
+    """Websocket consumer of a robot (all the robots when robot_id is None); counts the tracked messages."""
+    url = f"{uri}/ws/" + (f"?robot={robot_id}" if robot_id else "")
+    async with websockets.connect(url, max_size=None) as websocket:
+        while not stop.is_set():
+            try:
+                frame = await asyncio.wait_for(websocket.recv(), 0.5)
+            except asyncio.TimeoutError:
+                continue
+            if isinstance(frame, str) and '"sent"' in frame:
+                latencies.append(time.time() - json.loads(frame)["sent"])
+                received[robot_id] = received.get(robot_id, 0) + 1
+
+
+async def http_consumer(session, base, robot_ids, results, stop):
+    """REST consumer: latest status, latest face images (with If-None-Match), cycle stats."""
+    etags = {}
+    while not stop.is_set():
+        robot_id = random.choice(robot_ids)
+        path = random.choice((f"/api/robots/{robot_id}/latest_status", f"/api/robots/{robot_id}/latest_face/1",
+                              "/api/stats/outcomes", f"/api/cycles?robot={robot_id}&limit=20"))
+        headers = {"If-None-Match": etags[path]} if path in etags else {}
+        start = time.perf_counter()
+        try:
+            async with session.get(base + path, headers=headers) as response:
+                await response.read()
+                if "ETag" in response.headers:
+                    etags[path] = response.headers["ETag"]
+                ok = response.status in (200, 304, 404)  # 404: nothing received yet
+        except aiohttp.ClientError:
+            ok = False
+        results["latencies"].append(time.perf_counter() - start)
+        results["errors"] += not ok
+        await asyncio.sleep(0.05)
+
+
+async def run_consumers(uri, subscriptions, http, robot_ids, stop):
+    """Websocket and HTTP consumers of a worker process, until stop (multiprocessing.Event) is set."""
+    done = asyncio.Event()
+    latencies, received = [], {}
+    http_results = {"latencies": [], "errors": 0}
+    tasks = [asyncio.create_task(ws_consumer(uri, robot_id, latencies, received, done)) for robot_id in subscriptions]
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=max(1, http))) as session:
+        tasks += [asyncio.create_task(http_consumer(session, "http" + uri[2:], robot_ids, http_results, done))
+                  for _ in range(http)]
+        await asyncio.to_thread(stop.wait)
+        done.set()
+        errors = [e for e in await asyncio.gather(*tasks, return_exceptions=True) if isinstance(e, Exception)]
+    return {"latencies": latencies, "received": received, "http": http_results, "errors": [repr(e) for e in errors]}
+
+
+def consumers_process(uri, subscriptions, http, robot_ids, stop, results):
+    results.put(asyncio.run(run_consumers(uri, subscriptions, http, robot_ids, stop)))
+
+
+async def main(args):
+    loop = asyncio.get_running_loop()
+    bridge.CYCLE_DB = args.cycle_db or os.path.join(tempfile.mkdtemp(), "cycles.db")
+    robots = [SimRobot(f"sim{i:03d}", args) for i in range(args.robots)]
+    robot_ids = [robot.robot_id for robot in robots]
+    counters = {"published": 0, "bytes": 0}
+
+    if args.broker:
+        # Backend subscribed to the broker, one paho client per robot
+        bridge.MQTT_BROKER = args.broker
+        client = bridge.start_mqtt()
+        clients = []
+        for robot in robots:
+            c = mqtt.Client()
+            c.connect(args.broker, 1883, 60)
+            c.loop_start()
+            clients.append(c)
+        publish = lambda i, topic, payload: clients[i].publish(topic, payload, qos=1)
+    else:
+        # In-process: MQTT ingestion started without broker, the producer thread calls on_message
+        bridge.cycle_store = bridge.CycleStore(bridge.CYCLE_DB)
+        bridge.ingest.start(loop)
+        bridge.ingest.task = asyncio.create_task(bridge.ingest_messages())
+        client = None
+        publish = lambda i, topic, payload: bridge.on_message(None, None, Message(topic, payload))
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning",
+                                           ws_max_size=1 << 24))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    subscriptions = [None if args.all_every and i % args.all_every == 0 else robot_ids[i % len(robot_ids)]
+                     for i in range(args.ws)]
+    context = multiprocessing.get_context("spawn")
+    stop, results = context.Event(), context.Queue()
+    procs = [context.Process(target=consumers_process, daemon=True,
+                             args=(f"ws://127.0.0.1:{port}", subscriptions[i::args.procs],
+                                   args.http // args.procs + (i < args.http % args.procs), robot_ids, stop, results))
+             for i in range(args.procs)]
+    for proc in procs:
+        proc.start()
+    while len(bridge.clients) < args.ws:
+        await asyncio.sleep(0.05)
+
+    rss_start, store_start = rss_mb(), store_size()
+    processed_start = processed()
+    producer_stop = threading.Event()
+    producer = threading.Thread(target=produce, args=(robots, publish, producer_stop, counters), daemon=True)
+    start = time.perf_counter()
+    producer.start()
+    for _ in range(int(args.seconds / args.report) or 1):
+        await asyncio.sleep(args.report)
+        print(f"[{time.perf_counter() - start:6.1f} s] published {counters['published']:8d}"
+              f"   processed {processed() - processed_start:8d}   ingest depth {bridge.ingest.stats()['depth']:5d}"
+              f"   RSS {rss_mb():7.1f} MB   store {store_size()}")
+    producer_stop.set()
+    await asyncio.to_thread(producer.join)
+    elapsed = time.perf_counter() - start
+    while bridge.ingest.stats()["depth"]:
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(args.drain)  # client queues drained
+    dropped_frames = sum(queue.dropped for queue in bridge.clients.values())
+    stop.set()
+    latencies, http_results = [], {"latencies": [], "errors": 0}
+    for _ in procs:
+        result = await asyncio.to_thread(results.get, True, 60)
+        latencies += result["latencies"]
+        http_results["latencies"] += result["http"]["latencies"]
+        http_results["errors"] += result["http"]["errors"]
+        for error in result["errors"]:
+            print(f"Consumer error: {error}")
+    for proc in procs:
+        proc.join()
+
+    tracked = {robot.robot_id: robot.tracked for robot in robots}
+    expected = sum(tracked[robot_id] if robot_id else sum(tracked.values()) for robot_id in subscriptions)
+    delivered = len(latencies)
+    ingest = bridge.ingest.stats()
+    print(f"\nrobots {args.robots}   websockets {args.ws} + http {args.http} in {args.procs} processes   {elapsed:.1f} s"
+          f"   mode {'broker ' + args.broker if args.broker else 'in-process'}")
+    print(f"ingestion   published {counters['published'] / elapsed:9,.0f} msg/s ({counters['bytes'] / elapsed / 2 ** 20:6.2f} MB/s)"
+          f"   processed {(processed() - processed_start) / elapsed:9,.0f} msg/s   ingest dropped {ingest['dropped']}")
+    print(f"delivery    {percentiles(latencies)}   delivered {delivered}/{expected}   missing {expected - delivered}"
+          f"   client queue drops {dropped_frames}")
+    print(f"http        {len(http_results['latencies']) / elapsed:7.1f} req/s   "
+          f"{percentiles(http_results['latencies'], (0.5, 0.99))}   errors {http_results['errors']}")
+    print(f"memory      RSS {rss_start:.1f} -> {rss_mb():.1f} MB   store {store_start} -> {store_size()}")
+
+    server.should_exit = True
+    await server_task
+    if client is not None:
+        bridge.stop_mqtt(client)
+    else:
+        bridge.ingest.task.cancel()
+        bridge.cycle_store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backend load test with a synthetic robot fleet")
+    parser.add_argument("--robots", type=int, default=10, help="Simulated robots")
+    parser.add_argument("--ws", type=int, default=50, help="Websocket consumers")
+    parser.add_argument("--all_every", type=int, default=10, help="One websocket every N subscribed to all the robots (0 for none)")
+    parser.add_argument("--http", type=int, default=5, help="HTTP consumers")
+    parser.add_argument("--procs", type=int, default=2, help="Worker processes running the consumers")
+    parser.add_argument("--seconds", type=float, default=30, help="Test duration (secs)")
+    parser.add_argument("--ops", type=int, default=40, help="Robot ops per scramble and per solve")
+    parser.add_argument("--op_rate", type=float, default=20, help="Robot ops per second")
+    parser.add_argument("--face_rate", type=float, default=2, help="Face images per second while scanning")
+    parser.add_argument("--image_kb", type=int, default=32, help="Face and collage image size (KB)")
+    parser.add_argument("--fail_rate", type=float, default=0.05, help="Share of the solve cycles failing")
+    parser.add_argument("--broker", default=None, help="Local MQTT broker host (default: in-process, no broker)")
+    parser.add_argument("--cycle_db", default=None, help="Cycle store path (default: a temporary file)")
+    parser.add_argument("--report", type=float, default=5, help="Progress report interval (secs)")
+    parser.add_argument("--drain", type=float, default=1, help="Wait for the websocket queues to drain (secs)")
+    asyncio.run(main(parser.parse_args()))
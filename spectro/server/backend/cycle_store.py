@@ -0,0 +1,211 @@
+import json
+import sqlite3
+import threading
+import time
+
+# Phase timings of the "cycle" summary message published by the robot (secs)
+PHASES = ("camera", "detection", "solver", "robot", "total")
+MAX_PAGE = 500  # Max cycles per listing page
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cycles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    robot TEXT NOT NULL,
+    kind TEXT NOT NULL,             -- scramble or solve
+    started REAL NOT NULL,          -- unix time
+    finished REAL NOT NULL,
+    duration REAL NOT NULL,
+    outcome TEXT NOT NULL,          -- scrambled, solved, failed, timeout, stopped, interrupted
+    solution TEXT,
+    color_method TEXT,              -- color detection winner (BGR, HSV, BGR_dom), None when failed
+    camera_time REAL,
+    detection_time REAL,
+    solver_time REAL,
+    robot_time REAL,
+    total_time REAL,
+    moves INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL              -- JSON: status transitions, move events, image references
+);
+CREATE INDEX IF NOT EXISTS cycles_robot_started ON cycles (robot, started);
+CREATE INDEX IF NOT EXISTS cycles_started ON cycles (started);
+CREATE INDEX IF NOT EXISTS cycles_outcome_started ON cycles (outcome, started);
+"""
+
+COLUMNS = ("id", "robot", "kind", "started", "finished", "duration", "outcome", "solution", "color_method",
+           "camera_time", "detection_time", "solver_time", "robot_time", "total_time", "moves")
+
+
+class CycleStore:
+    """SQLite store of the completed robot cycles, with the aggregates served by the REST routes.
+
+    A cycle is a dict: robot, kind, started, finished, outcome, solution, color_method, phases
+    (PHASES -> secs), moves (count) and data (status transitions, move events, image references).
+    The aggregates are computed by SQL on the indexed columns; every query accepts the robot and
+    the since / until (unix time) filters. The connection is shared by the event loop and the
+    routes thread pool, behind a lock.
+    """
+
+    def __init__(self, path="cycles.db"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        with self.lock:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def add(self, cycle):
+        """Stores a completed cycle; returns its id."""
+        phases = cycle.get("phases") or {}
+        with self.lock, self.db:
+            cursor = self.db.execute(
+                "INSERT INTO cycles (robot, kind, started, finished, duration, outcome, solution, color_method,"
+                " camera_time, detection_time, solver_time, robot_time, total_time, moves, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cycle["robot"], cycle["kind"], cycle["started"], cycle["finished"],
+                 round(cycle["finished"] - cycle["started"], 3), cycle["outcome"], cycle.get("solution"),
+                 cycle.get("color_method"), *(phases.get(phase) for phase in PHASES), cycle.get("moves", 0),
+                 json.dumps(cycle.get("data", {}))))
+            return cursor.lastrowid
+
+    @staticmethod
+    def where(robot=None, since=None, until=None, **equals):
+        """SQL where clause and parameters of the filters (None filters are ignored)."""
+        clauses, params = [], []
+        for column, value in (("robot", robot), *equals.items()):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("started >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("started < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return [dict(row) for row in self.db.execute(sql, params)]
+
+    def list(self, robot=None, kind=None, outcome=None, since=None, until=None, limit=50, offset=0):
+        """Page of cycles (latest first, without data), with the total count of the filtered cycles."""
+        limit = max(1, min(int(limit), MAX_PAGE))
+        where, params = self.where(robot, since, until, kind=kind, outcome=outcome)
+        total = self.query(f"SELECT COUNT(*) AS n FROM cycles{where}", params)[0]["n"]
+        cycles = self.query(f"SELECT {', '.join(COLUMNS)} FROM cycles{where} ORDER BY started DESC, id DESC"
+                            " LIMIT ? OFFSET ?", (*params, limit, max(0, int(offset))))
+        return {"cycles": cycles, "total": total, "limit": limit, "offset": offset}
+
+    def get(self, cycle_id):
+        """Cycle with its data, None when not found."""
+        rows = self.query("SELECT * FROM cycles WHERE id = ?", (cycle_id,))
+        if not rows:
+            return None
+        rows[0]["data"] = json.loads(rows[0]["data"])
+        return rows[0]
+
+    def solves_per_hour(self, robot=None, since=None, until=None):
+        """Solved cycles per hour bucket, and the average rate over the period of the solves."""
+        where, params = self.where(robot, since, until, kind="solve", outcome="solved")
+        hours = self.query(f"SELECT CAST(finished / 3600 AS INTEGER) * 3600 AS hour, COUNT(*) AS solves"
+                           f" FROM cycles{where} GROUP BY hour ORDER BY hour", params)
+        span = self.query(f"SELECT COUNT(*) AS n, MIN(started) AS first, MAX(finished) AS last FROM cycles{where}",
+                          params)[0]
+        rate = 3600 * span["n"] / (span["last"] - span["first"]) if span["n"] and span["last"] > span["first"] else None
+        return {"hours": hours, "solves": span["n"], "solves_per_hour": round(rate, 2) if rate else rate}
+
+    def percentile(self, column, p, where, params):
+        """p percentile (nearest rank) of the column, by SQL ordering of the non null values."""
+        where = (where + " AND " if where else " WHERE ") + f"{column} IS NOT NULL"
+        rows = self.query(f"SELECT {column} AS value FROM cycles{where} ORDER BY {column} LIMIT 1 OFFSET"
+                          f" (SELECT MAX(0, CAST(ROUND(COUNT(*) * ? + 0.5) AS INTEGER) - 1) FROM cycles{where})",
+                          (*params, p, *params))
+        return rows[0]["value"] if rows else None
+
+    def phase_times(self, robot=None, since=None, until=None):
+        """p50 and p95 of each solve phase time (secs), of the solved cycles."""
+        where, params = self.where(robot, since, until, kind="solve", outcome="solved")
+        return {phase: {"p50": self.percentile(f"{phase}_time", 0.5, where, params),
+                        "p95": self.percentile(f"{phase}_time", 0.95, where, params)} for phase in PHASES}
+
+    def color_methods(self, robot=None, since=None, until=None):
+        """Solve cycles won by each color detection method, with their share."""
+        where, params = self.where(robot, since, until, kind="solve")
+        where += (" AND " if where else " WHERE ") + "color_method IS NOT NULL"
+        return self.query(f"SELECT color_method, COUNT(*) AS cycles,"
+                          f" ROUND(1.0 * COUNT(*) / SUM(COUNT(*)) OVER (), 4) AS rate"
+                          f" FROM cycles{where} GROUP BY color_method ORDER BY cycles DESC", params)
+
+    def outcomes(self, robot=None, since=None, until=None):
+        """Cycles per robot, kind and outcome, with the outcome rate within the robot and kind."""
+        where, params = self.where(robot, since, until)
+        return self.query(f"SELECT robot, kind, outcome, COUNT(*) AS cycles,"
+                          f" ROUND(1.0 * COUNT(*) / SUM(COUNT(*)) OVER (PARTITION BY robot, kind), 4) AS rate"
+                          f" FROM cycles{where} GROUP BY robot, kind, outcome ORDER BY robot, kind, cycles DESC",
+                          params)
+
+
+class CycleRecorder:
+    """Builds the cycles of a robot from its messages, and hands the completed ones to on_cycle(cycle).
+
+    A "Scrambling" status starts a scramble cycle, ended by "Scramble finished"; a "Solving"
+    status starts a solve cycle, ended by "Idle" (solved, or failed when the cycle summary says
+    so) or "Timeout". A "Stopping" status ends the cycle as stopped, and a new cycle starting
+    before the end marks the previous one as interrupted. Times are the robot message timestamps.
+    """
+
+    STARTS = {"Scrambling": "scramble", "Solving": "solve"}
+    ENDS = {"Scramble finished": "scrambled", "Idle": "solved", "Timeout": "timeout", "Stopping": "stopped"}
+
+    def __init__(self, robot_id, on_cycle):
+        self.robot_id = robot_id
+        self.on_cycle = on_cycle
+        self.cycle = None
+
+    def update(self, message):
+        msg_type = message.get("type")
+        now = message.get("timestamp") or time.time()
+        if msg_type == "status":
+            state = message.get("robot_state")
+            if state in self.STARTS:
+                self.finish(now, "interrupted")
+                self.cycle = {"robot": self.robot_id, "kind": self.STARTS[state], "started": now, "solution": None,
+                              "color_method": None, "phases": {}, "moves": 0, "solved": None,
+                              "data": {"statuses": [], "moves": [], "images": []}}
+            if self.cycle is not None:
+                self.cycle["data"]["statuses"].append([now, state])
+                if state in self.ENDS:
+                    self.finish(now, self.ENDS[state])
+        elif self.cycle is None:
+            return
+        elif msg_type == "solution":
+            self.cycle["solution"] = message.get("solution")
+        elif msg_type == "moves":
+            self.cycle["data"]["moves"].extend(message.get("events", []))
+            self.cycle["moves"] = message.get("total", self.cycle["moves"])
+        elif msg_type == "command":
+            self.cycle["data"]["moves"].append(message.get("command"))
+            self.cycle["moves"] = message.get("total_steps", self.cycle["moves"])
+        elif msg_type == "cycle":
+            self.cycle.update(color_method=message.get("color_method"), phases=message.get("phases", {}),
+                              solved=message.get("solved"))
+
+    def image(self, name, timestamp, size):
+        """Reference of a binary image received during the cycle (the image itself is not stored)."""
+        if self.cycle is not None:
+            self.cycle["data"]["images"].append({"name": name, "timestamp": timestamp, "bytes": size})
+
+    def finish(self, now, outcome):
+        cycle, self.cycle = self.cycle, None
+        if cycle is None:
+            return
+        if outcome == "solved" and cycle.pop("solved") is False:
+            outcome = "failed"
+        cycle.pop("solved", None)
+        cycle.update(finished=max(now, cycle["started"]), outcome=outcome)
+        self.on_cycle(cycle)
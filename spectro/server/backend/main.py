@@ -1,9 +1,8 @@
-import threading
-import asyncio
 import uvicorn
-from websocket_server import start_servers
+from api import app
+from websocket_server import WEBSOCKET_HOST, WEBSOCKET_PORT
 
 if __name__ == "__main__":
 
-    #  Start WebSockets + MQTT in the same asyncio loop
-    asyncio.run(start_servers())  #  Runs both inside one thread
+    #  REST routes, websockets and MQTT ingestion in one process, on the uvicorn event loop
+    uvicorn.run(app, host=WEBSOCKET_HOST, port=WEBSOCKET_PORT)
@@ -0,0 +1,151 @@
+"""Benchmark of the MQTT ingestion of the websocket bridge: throughput and event loop lag.
+
+A producer thread plays the paho network thread, calling on_message with a synthetic stream:
+JSON moves messages (with their send time and a unique id) and, every --image_every messages, a
+binary image of --image_kb KB on the image topic. Two ingestions are compared:
+  - per-message: json.loads in the MQTT thread, one run_coroutine_threadsafe future per message
+    (previous on_message)
+  - batched: raw payloads in the IngestBuffer, drained in batches by one asyncio task (websocket_server)
+
+Metrics:
+  - stream: --rate messages per second for --seconds; delivery latency (on_message to send_to_websockets)
+    and event loop lag (overshoot of a 5 ms periodic sleep), p50 / p99 / max
+  - burst: --burst messages pushed at once; messages per second processed by the event loop, and
+    max event loop lag
+
+Example: python websocket_ingest_bench.py --rate 1000 --seconds 5
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+import websocket_server as ws_server
+
+
+class Message:
+    """paho MQTTMessage stand-in."""
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+
+def legacy_on_message(loop):
+    """Previous on_message: parsing in the MQTT thread, one future per message."""
+    def on_message(client, userdata, msg):
+        try:
+            if msg.topic.startswith(ws_server.MQTT_IMAGE_TOPIC):
+                coro = ws_server.process_and_send_image(msg.topic, msg.payload)
+            else:
+                coro = ws_server.process_and_send(json.loads(msg.payload.decode("utf-8")))
+            asyncio.run_coroutine_threadsafe(coro, loop)
+        except (json.JSONDecodeError, KeyError) as e:
+            print(f"Error processing MQTT message: {e}")
+    return on_message
+
+
+def stream(count, image_every, image_kb, name="stream"):
+    """Synthetic messages: (topic, payload builder); name makes the message ids unique."""
+    image = b"CIMG" + bytes(image_kb * 1024)
+    for i in range(count):
+        if image_every and i % image_every == 0:
+            yield ws_server.MQTT_IMAGE_TOPIC + str(1 + i % 6), lambda: image
+        else:
+            yield ws_server.MQTT_TOPIC, lambda i=i: json.dumps(
+                {"type": "moves", "events": [{"op": "F", "arg": 1, "index": i, "total": count}],
+                 "progress": 0, "total": count, "id": f"{name}-{i}", "sent": time.perf_counter()}).encode()
+
+
+def produce(on_message, count, rate, args, name="stream"):
+    """Calls on_message from a thread, at rate messages per second (0 for as fast as possible)."""
+    def run():
+        start = time.perf_counter()
+        for i, (topic, payload) in enumerate(stream(count, args.image_every, args.image_kb, name)):
+            if rate:
+                delay = start + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            on_message(None, None, Message(topic, payload()))
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return "n/a"
+    pick = lambda p: 1000 * values[min(len(values) - 1, int(p * len(values)))]
+    return f"p50 {pick(0.5):7.2f}  p99 {pick(0.99):7.2f}  max {1000 * values[-1]:7.2f} ms"
+
+
+async def run(name, args):
+    loop = asyncio.get_running_loop()
+    ws_server.robots.clear()
+    processed = []
+    latencies = []
+
+    async def send_to_websockets(robot, message, raw=None, msg_type=None):
+        processed.append(1)
+        if isinstance(message, dict) and "sent" in message:
+            latencies.append(time.perf_counter() - message["sent"])
+
+    ws_server.send_to_websockets = send_to_websockets
+    if name == "batched":
+        ws_server.ingest = ws_server.IngestBuffer(max(ws_server.INGEST_BUFFER_SIZE, args.burst))
+        ws_server.ingest.start(loop)
+        ingest_task = asyncio.create_task(ws_server.ingest_messages(ws_server.ingest))
+        on_message = ws_server.on_message
+    else:
+        ingest_task = None
+        on_message = legacy_on_message(loop)
+
+    lags = []
+    done = asyncio.Event()
+
+    async def monitor():
+        while not done.is_set():
+            t = loop.time()
+            await asyncio.sleep(0.005)
+            lags.append(max(0.0, loop.time() - t - 0.005))
+
+    monitor_task = asyncio.create_task(monitor())
+    count = int(args.rate * args.seconds)
+    await asyncio.to_thread(produce(on_message, count, args.rate, args).join)
+    while len(processed) < count:
+        await asyncio.sleep(0.01)
+    stream_lags = list(lags)
+    stream_latencies = list(latencies)
+
+    processed.clear()
+    start = time.perf_counter()
+    produce(on_message, args.burst, 0, args, "burst")
+    while len(processed) < args.burst:
+        await asyncio.sleep(0.01)
+    burst_rate = args.burst / (time.perf_counter() - start)
+    burst_lags = lags[len(stream_lags):]
+    done.set()
+    await monitor_task
+    if ingest_task:
+        ingest_task.cancel()
+    stats = f"   ingest {ws_server.ingest.stats()}" if ingest_task else ""
+    print(f"{name:>11}  latency {percentiles(stream_latencies)}   loop lag {percentiles(stream_lags)}"
+          f"   burst {burst_rate:9,.0f} msg/s, loop lag max {1000 * max(burst_lags, default=0):7.2f} ms{stats}")
+
+
+async def main(args):
+    for name in ("per-message", "batched"):
+        await run(name, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MQTT ingestion of the websocket bridge, synthetic stream")
+    parser.add_argument("--rate", type=float, default=1000, help="Stream messages per second")
+    parser.add_argument("--seconds", type=float, default=5, help="Stream duration (secs)")
+    parser.add_argument("--burst", type=int, default=20000, help="Messages of the burst test")
+    parser.add_argument("--image_every", type=int, default=20, help="A binary image every N messages (0 for none)")
+    parser.add_argument("--image_kb", type=int, default=16, help="Binary image size (KB)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,127 @@
+"""Load test of the websocket fan-out: delivery latency with many clients, one of them slow.
+
+The websocket server (websocket_handler) runs on localhost; N clients connect, and one more reads
+only 4 KB every --slow_delay seconds (a dashboard on a bad link). Messages are sent through
+send_to_websockets at --rate per second: JSON moves messages carrying their send time, and every
+--image_every messages a binary image of --image_kb KB. The delivery latency of the JSON messages
+is measured on the fast clients.
+
+Two fan-outs are compared:
+  - sequential: the previous send_to_websockets, awaiting websocket.send for each client in turn
+  - queued: per-client bounded queues, each drained by its own task (websocket_server)
+
+Example: python websocket_load_test.py --clients 100 --messages 300 --overflow drop
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import time
+
+import websockets
+
+import websocket_server as ws_server
+
+
+async def sequential_send_to_websockets(robot, message, raw=None, msg_type=None):
+    """Previous fan-out: one awaited send per client, in turn."""
+    data, text, status = ws_server.encode(message)
+    for websocket in list(ws_server.clients):
+        try:
+            await websocket.send(data, text=text)
+        except websockets.exceptions.ConnectionClosed:
+            ws_server.clients.pop(websocket, None)
+
+
+async def fast_client(uri, latencies, done):
+    async with websockets.connect(uri, max_size=None) as websocket:
+        while not done.is_set():
+            try:
+                frame = await asyncio.wait_for(websocket.recv(), 0.5)
+            except asyncio.TimeoutError:
+                continue
+            if isinstance(frame, str):
+                message = json.loads(frame)
+                if "sent" in message:
+                    latencies.append(time.perf_counter() - message["sent"])
+
+
+async def handler(websocket):
+    """websocket_handler, with a small send buffer for the slow client: the server writes back up as on a bad link."""
+    if websocket.request.path == "/slow":
+        websocket.transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    await ws_server.websocket_handler(websocket)
+
+
+async def slow_client(uri, delay, done):
+    """Raw websocket client reading only 4 KB every delay seconds."""
+    host, port = uri[5:].split(":")
+    reader, writer = await asyncio.open_connection(host, int(port), limit=4096)
+    writer.transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    writer.write((f"GET /slow HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  "Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    await reader.readuntil(b"\r\n\r\n")
+    while not done.is_set():
+        await reader.read(4096)
+        await asyncio.sleep(delay)
+    writer.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else float("nan")
+
+
+async def run(fanout, args):
+    ws_server.clients.clear()
+    ws_server.robots.clear()
+    ws_server.all_subscribers.clear()
+    robot = ws_server.shard(ws_server.DEFAULT_ROBOT)
+    ws_server.send_to_websockets = fanout
+    done = asyncio.Event()
+    latencies = []
+    async with websockets.serve(handler, "127.0.0.1", 0, max_size=None) as server:
+        uri = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        tasks = [asyncio.create_task(fast_client(uri, latencies, done)) for _ in range(args.clients)]
+        if args.slow_delay > 0:
+            tasks.append(asyncio.create_task(slow_client(uri, args.slow_delay, done)))
+        while len(ws_server.clients) < len(tasks):
+            await asyncio.sleep(0.05)
+
+        image = b"CIMG" + bytes(args.image_kb * 1024)
+        start = time.perf_counter()
+        for i in range(args.messages):
+            await asyncio.sleep(max(0.0, start + i / args.rate - time.perf_counter()))
+            if args.image_every and i % args.image_every == 0:
+                await ws_server.send_to_websockets(robot, image, msg_type="face")
+            await ws_server.send_to_websockets(robot, {"type": "moves", "events": [], "progress": i, "sent": time.perf_counter()})
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(1)
+        dropped = sum(q.dropped for q in ws_server.clients.values())
+        done.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    expected = args.clients * args.messages
+    ms = [1000 * t for t in latencies]
+    return (f"p50 {percentile(ms, 0.5):8.1f} ms   p99 {percentile(ms, 0.99):8.1f} ms   max {max(ms, default=0):8.1f} ms"
+            f"   delivered {len(ms)}/{expected}   send time {elapsed:5.1f} s   dropped (slow client) {dropped}")
+
+
+async def main(args):
+    ws_server.CLIENT_OVERFLOW = args.overflow
+    queued = ws_server.send_to_websockets
+    for name, fanout in (("sequential", sequential_send_to_websockets), ("queued", queued)):
+        print(f"{name:>10}: {await run(fanout, args)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Websocket fan-out latency, with a slow client")
+    parser.add_argument("--clients", type=int, default=100, help="Fast clients")
+    parser.add_argument("--messages", type=int, default=300, help="JSON messages sent")
+    parser.add_argument("--rate", type=float, default=50, help="JSON messages per second")
+    parser.add_argument("--image_every", type=int, default=10, help="A binary image every N messages (0 for none)")
+    parser.add_argument("--image_kb", type=int, default=16, help="Binary image size (KB)")
+    parser.add_argument("--overflow", type=str, default="drop", help="Client queue overflow policy: drop or disconnect")
+    parser.add_argument("--slow_delay", type=float, default=1.0, help="Slow client delay between reads, secs (0 for none)")
+    asyncio.run(main(parser.parse_args()))
@@ -1,124 +1,438 @@
 import os
 import paho.mqtt.client as mqtt
 import asyncio
-import websockets
+from websockets.exceptions import ConnectionClosed
 import json
+import struct
+import threading
+from collections import deque
+
+from cycle_store import CycleRecorder, CycleStore
 
 # MQTT Configuration
 MQTT_BROKER = os.getenv("MQTT_BROKER", "localhost")
-MQTT_TOPIC = "robot/data"
+MQTT_TOPIC = "robot/data"  # single robot topic (robot id DEFAULT_ROBOT)
+MQTT_ROBOT_TOPIC = "robot/+/data"  # robot/<robot id>/data
+MQTT_IMAGE_TOPIC = MQTT_TOPIC + "/image/"  # binary image messages, one topic per side (and collage)
+DEFAULT_ROBOT = "default"
+# Binary image messages (see mqtt_publisher.py on the robot): header followed by the image bytes
+IMAGE_HEADER = struct.Struct("!4sBBBBdHH")
+CYCLE_DB = os.getenv("CYCLE_DB", "cycles.db")  # SQLite store of the completed cycles ("" to disable)
+cycle_store = None  # CycleStore, opened by start_mqtt
 
 # Websocket Configuration
 WEBSOCKET_HOST = "0.0.0.0"
 WEBSOCKET_PORT = 8765
 
-connected_websockets = set()
-current_cycle_data = []  # To store messages within the current cycle
-latest_status = {}  # To store the latest status message (if any)
-main_event_loop = None  # To store the main asyncio event loop
+SNAPSHOT_COMMANDS = int(os.getenv("SNAPSHOT_COMMANDS", "50"))  # Commands kept in the cycle snapshot
+CLIENT_QUEUE_SIZE = int(os.getenv("CLIENT_QUEUE_SIZE", "200"))  # Outbound frames queued per websocket
+CLIENT_OVERFLOW = os.getenv("CLIENT_OVERFLOW", "drop")  # Full queue: "drop" oldest non-status frame, or "disconnect"
 
-def on_connect(client, userdata, flags, rc):
-    """Callback when MQTT client connects."""
-    if rc == 0:
-        print("Connected to MQTT broker")
-        client.subscribe(MQTT_TOPIC)
-    else:
-        print(f"Connection to MQTT broker failed with code {rc}")
+clients = {}  # websocket -> ClientQueue
+robots = {}  # robot id -> RobotShard
+all_subscribers = set()  # ClientQueue subscribed to all the robots
+waiting_subscribers = {}  # robot id not seen yet -> ClientQueue subscribed to it (until they disconnect)
+INGEST_BUFFER_SIZE = int(os.getenv("INGEST_BUFFER_SIZE", "5000"))  # MQTT messages buffered for the event loop
+INGEST_BATCH = int(os.getenv("INGEST_BATCH", "200"))  # MQTT messages processed per batch, before yielding
+SEEN_IDS_SIZE = 10000  # Message ids remembered per robot, to drop the duplicates replayed from the robot spool
 
-def on_message(client, userdata, msg):
-    """Callback when MQTT message is received."""
-    try:
-        payload = json.loads(msg.payload.decode("utf-8"))
-        if main_event_loop and not main_event_loop.is_closed():
-            asyncio.run_coroutine_threadsafe(process_and_send(payload), main_event_loop)
+class CycleSnapshot:
+    """Compacted state of the current cycle: the in-memory state store of the backend.
+
+    Holds the latest status, the latest solution, the last max_commands commands (robot move
+    events and legacy command messages) with the progress summary, and the latest binary image
+    per image (face sides 1 to 6 and collage). The REST routes (api.py) read the parsed messages
+    (status_message, solution_message, last_command) and the images; for the websockets joining
+    mid-cycle each part is also kept pre-serialized, so that the snapshot frame is assembled
+    without serializing the cycle again; the frame is cached until the next update.
+    A "Scrambling" status starts a new cycle.
+    """
+
+    def __init__(self, robot_id=DEFAULT_ROBOT, max_commands=SNAPSHOT_COMMANDS):
+        self.robot = json.dumps(robot_id)
+        self.commands = deque(maxlen=max_commands)  # pre-serialized commands
+        self.status = "null"
+        self.status_message = None  # latest status message
+        self.reset()
+
+    def reset(self):
+        """Starts a new cycle (the latest status is kept)."""
+        self.solution = "null"
+        self.solution_message = None  # latest solution message
+        self.images = {}  # image name (side or "collage") -> latest binary image message
+        self.reset_commands()
+
+    def reset_commands(self):
+        """Clears the commands and the progress, at a new solution."""
+        self.commands.clear()
+        self.last_command = None  # latest robot move event (or legacy command message)
+        self.progress = {"progress": 0, "index": -1, "total": 0, "commands": 0}
+        self.frame = None
+
+    def update(self, message):
+        """Updates the snapshot with a JSON message."""
+        msg_type = message.get("type")
+        if msg_type == "status":
+            if message.get("robot_state") == "Scrambling":
+                self.reset()
+            self.status = json.dumps(message)
+            self.status_message = message
+        elif msg_type == "solution":
+            self.reset_commands()
+            self.solution = json.dumps(message)
+            self.solution_message = message
+        elif msg_type == "moves":
+            for event in message.get("events", []):
+                self.commands.append(json.dumps(event))
+                self.last_command = event
+                self.progress["index"] = event.get("index", self.progress["index"])
+            self.progress["commands"] += len(message.get("events", []))
+            self.progress["progress"] = message.get("progress", self.progress["progress"])
+            self.progress["total"] = message.get("total", self.progress["total"])
+        elif msg_type == "command":
+            self.commands.append(json.dumps({"command": message.get("command"), "step": message.get("step")}))
+            self.last_command = message
+            self.progress["commands"] += 1
+            self.progress["total"] = message.get("total_steps", self.progress["total"])
         else:
-            print("Main event loop not initialized or closed. Cannot process MQTT message.")
-    except (json.JSONDecodeError, KeyError) as e:
-        print(f"Error processing MQTT message: {e}")
+            return
+        self.frame = None
 
-async def process_and_send(message):
-    """Processes the MQTT message and sends it to websockets."""
-    global current_cycle_data
-    global latest_status
-    current_cycle_data.append(message)  # Store the message
+    def update_image(self, name, payload):
+        """Keeps the latest binary image message of the image (side or "collage")."""
+        self.images[name] = payload
 
-    if message.get("type") == "status" and message.get("robot_state") == "Scrambling":
-        current_cycle_data = [message]  # Start a new cycle
+    def frames(self):
+        """Snapshot JSON frame, followed by the latest binary image frames: list of (frame, message type)."""
+        if self.frame is None:
+            self.frame = ('{"type": "snapshot", "robot": ' + self.robot + ', "status": ' + self.status
+                          + ', "solution": ' + self.solution + ', "commands": [' + ", ".join(self.commands)
+                          + '], "progress": ' + json.dumps(self.progress) + "}")
+        return [(self.frame, "snapshot")] + [(payload, image_type(name)) for name, payload in self.images.items()]
 
-    if message.get("type") == "status":
-        latest_status = message  # Update the latest status
+class RobotShard:
+    """State of one robot: cycle snapshot, received message ids and websocket subscribers.
 
-    await send_to_websockets(message)
+    Messages of a robot are only queued to the subscribers of that robot (and to the
+    subscribers of all the robots), so the fan-out does not grow with the fleet size.
+    """
 
-async def send_to_websockets(message):
-    """Sends data to all connected websockets immediately."""
-    if not connected_websockets:
-        print("No connected websockets.")
+    def __init__(self, robot_id):
+        self.robot_id = robot_id
+        self.snapshot = CycleSnapshot(robot_id)
+        self.seen_ids = set()
+        self.seen_ids_order = deque()
+        self.subscribers = set()  # ClientQueue subscribed to this robot
+        self.recorder = CycleRecorder(robot_id, store_cycle)
+        self.updated = 0.0  # event loop time of the latest message
+
+    def is_duplicate(self, message):
+        """True when the message id has already been received (messages without id are never duplicates)."""
+        message_id = message.get("id")
+        if message_id is None:
+            return False
+        if message_id in self.seen_ids:
+            return True
+        self.seen_ids.add(message_id)
+        self.seen_ids_order.append(message_id)
+        if len(self.seen_ids_order) > SEEN_IDS_SIZE:
+            self.seen_ids.discard(self.seen_ids_order.popleft())
+        return False
+
+def store_cycle(cycle):
+    """Stores a completed cycle on the default executor: the ingestion never waits on the disk."""
+    if cycle_store is None:
         return
+    future = asyncio.get_running_loop().run_in_executor(None, cycle_store.add, cycle)
+    future.add_done_callback(lambda f: f.exception() and print(f"Error storing the cycle: {f.exception()}"))
+
+def shard(robot_id):
+    """State shard of the robot, created at its first MQTT message (adopting the subscribers waiting for it)."""
+    robot = robots.get(robot_id)
+    if robot is None:
+        robot = robots[robot_id] = RobotShard(robot_id)
+        robot.subscribers = waiting_subscribers.pop(robot_id, robot.subscribers)
+    return robot
+
+def parse_topic(topic):
+    """Robot id and image name (side or "collage"; None for JSON messages) of a MQTT topic.
+    robot/data[/image/<name>] is the robot DEFAULT_ROBOT, robot/<id>/data[/image/<name>] the robot <id>."""
+    parts = topic.split("/")
+    if len(parts) >= 2 and parts[1] == "data":
+        robot_id, rest = DEFAULT_ROBOT, parts[2:]
+    elif len(parts) >= 3 and parts[2] == "data":
+        robot_id, rest = parts[1], parts[3:]
+    else:
+        return None, None
+    return robot_id, (rest[1] if len(rest) == 2 and rest[0] == "image" else None)
+
+def image_type(name):
+    """Message type of a binary image: "image" for the collage, "face" for the sides."""
+    return "image" if name == "collage" else "face"
+
+class IngestBuffer:
+    """Thread-safe bounded buffer of the raw MQTT messages, from the MQTT thread to the event loop.
+
+    The MQTT thread only appends (topic, payload); the event loop is woken up once per batch
+    (when the buffer was empty), not once per message. The ingest task drains the buffer in
+    batches of up to INGEST_BATCH messages. When the buffer is full the oldest message is dropped.
+    """
+
+    def __init__(self, maxsize=INGEST_BUFFER_SIZE):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.items = deque()
+        self.loop = None
+        self.ready = None
+        self.task = None
+        self.received = 0
+        self.dropped = 0
+        self.batches = 0
+        self.max_depth = 0
+
+    def start(self, loop):
+        """Binds the buffer to the event loop draining it."""
+        self.loop = loop
+        self.ready = asyncio.Event()
+        if self.items:
+            self.ready.set()
+
+    def put(self, topic, payload):
+        """Appends a raw message (MQTT thread)."""
+        with self.lock:
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append((topic, payload))
+            self.received += 1
+            self.max_depth = max(self.max_depth, len(self.items))
+            wake = len(self.items) == 1
+        if wake and self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.ready.set)
+
+    def get_batch(self, max_batch=INGEST_BATCH):
+        """Removes and returns up to max_batch messages, in order (event loop)."""
+        with self.lock:
+            count = min(max_batch, len(self.items))
+            batch = [self.items.popleft() for _ in range(count)]
+        if batch:
+            self.batches += 1
+        return batch
+
+    def stats(self):
+        with self.lock:
+            return {"depth": len(self.items), "max_depth": self.max_depth, "received": self.received,
+                    "dropped": self.dropped, "batches": self.batches}
+
+ingest = IngestBuffer()
+
+class ClientQueue:
+    """Bounded outbound queue of a websocket, drained by its own sender task.
 
-    message_str = json.dumps(message)
+    Frames are (data, text, status): data is the bytes shared by all the clients, text tells
+    whether it is sent as text (JSON) or binary frame. When the queue is full, the overflow
+    policy either drops the oldest non-status frame ("drop") or closes the websocket
+    ("disconnect"), so a slow client never delays the others.
+    """
 
-    for websocket in connected_websockets.copy():
+    def __init__(self, websocket, maxsize=None, overflow=None, types=None):
+        maxsize = CLIENT_QUEUE_SIZE if maxsize is None else maxsize
+        overflow = CLIENT_OVERFLOW if overflow is None else overflow
+        if overflow not in ("drop", "disconnect"):
+            raise ValueError(f"Client queue overflow policy must be 'drop' or 'disconnect', not {overflow}")
+        self.websocket = websocket
+        self.types = types  # message types subscribed (None for all)
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.frames = deque()
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.closed = False
+        self.task = asyncio.create_task(self.run())
+
+    def put(self, data, text, status=False):
+        """Queues a frame (never blocks)."""
+        if self.closed:
+            return
+        if len(self.frames) >= self.maxsize:
+            if self.overflow == "disconnect":
+                print(f"Websocket too slow, disconnecting: {self.websocket}")
+                self.close()
+                return
+            self.drop()
+        self.frames.append((data, text, status))
+        self.ready.set()
+
+    def drop(self):
+        """Drops the oldest non-status frame (the oldest frame, when all are status)."""
+        for i, frame in enumerate(self.frames):
+            if not frame[2]:
+                del self.frames[i]
+                break
+        else:
+            self.frames.popleft()
+        self.dropped += 1
+
+    def close(self):
+        self.closed = True
+        self.frames.clear()
+        self.ready.set()
+        asyncio.ensure_future(self.websocket.close())
+
+    async def run(self):
+        """Sends the queued frames, in order."""
         try:
-            await websocket.send(message_str)
-        except websockets.exceptions.ConnectionClosed:
+            while not self.closed:
+                await self.ready.wait()
+                self.ready.clear()
+                while self.frames and not self.closed:
+                    data, text, status = self.frames.popleft()
+                    await self.websocket.send(data, text=text)
+        except ConnectionClosed:
             print("Websocket connection closed.")
-            connected_websockets.discard(websocket)
         except Exception as e:
             print(f"Error sending to websocket: {e}")
-            connected_websockets.discard(websocket)
+        finally:
+            self.closed = True
 
-async def websocket_handler(websocket):
-    """Handles websocket connections."""
-    connected_websockets.add(websocket)
-    print(f"Websocket connected: {websocket}")
+def on_connect(client, userdata, flags, rc):
+    """Callback when MQTT client connects."""
+    if rc == 0:
+        print("Connected to MQTT broker")
+        client.subscribe([(MQTT_TOPIC, 0), (MQTT_IMAGE_TOPIC + "#", 0),
+                          (MQTT_ROBOT_TOPIC, 0), (MQTT_ROBOT_TOPIC + "/image/#", 0)])
+    else:
+        print(f"Connection to MQTT broker failed with code {rc}")
 
-    # Send the latest status to the newly connected client
-    if latest_status:
-        try:
-            status_message_str = json.dumps(latest_status)
-            await websocket.send(status_message_str)
-            print(f"Sent latest status to new websocket: {websocket}")
-        except websockets.exceptions.ConnectionClosed:
-            print("Websocket connection closed before sending latest status.")
-            connected_websockets.remove(websocket)
-        except Exception as e:
-            print(f"Error sending latest status to websocket {websocket}: {e}")
-            connected_websockets.remove(websocket)
+def on_message(client, userdata, msg):
+    """Callback when MQTT message is received: the raw message is buffered for the event loop."""
+    ingest.put(msg.topic, msg.payload)
 
-    # Send the current cycle data to the newly connected client
-    if current_cycle_data:
-        try:
-            for data in current_cycle_data:
-                await websocket.send(json.dumps(data))
-            print("Sent current cycle data to new client.")
-        except websockets.exceptions.ConnectionClosed:
-            print("Websocket connection closed before sending current cycle data.")
-            connected_websockets.remove(websocket)
-        except Exception as e:
-            print(f"Error sending current cycle data to websocket: {e}")
-            connected_websockets.remove(websocket)
+async def ingest_messages(buffer=ingest):
+    """Processes the buffered MQTT messages in batches, yielding to the event loop between batches."""
+    while True:
+        await buffer.ready.wait()
+        buffer.ready.clear()
+        while True:
+            batch = buffer.get_batch()
+            if not batch:
+                break
+            for topic, payload in batch:
+                await process_raw(topic, payload)
+            await asyncio.sleep(0)
+
+async def process_raw(topic, payload):
+    """Processes a raw MQTT message: images pass straight through, JSON is parsed for the cycle snapshot."""
+    robot_id, image = parse_topic(topic)
+    if robot_id is None:
+        return
+    if image is not None:
+        # Binary image: forwarded unchanged (header + image bytes) as binary websocket frame
+        await process_and_send_image(topic, payload)
+        return
+    try:
+        message = json.loads(payload)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        print(f"Error processing MQTT message: {e}")
+        return
+    await process_and_send(message, payload, robot_id)
+
+async def process_and_send(message, raw=None, robot_id=DEFAULT_ROBOT):
+    """Processes the MQTT message of the robot and sends it to its websockets (raw: the received JSON bytes, forwarded as they are)."""
+    robot = shard(robot_id)
+    if robot.is_duplicate(message):
+        return
+    robot.snapshot.update(message)
+    robot.recorder.update(message)
+    robot.updated = asyncio.get_running_loop().time()
+    await send_to_websockets(robot, message, raw)
+
+async def process_and_send_image(topic, payload):
+    """Stores the latest binary image of the robot, and sends it to its websockets."""
+    robot_id, image = parse_topic(topic)
+    robot = shard(robot_id)
+    robot.snapshot.update_image(image, payload)
+    robot.recorder.image(image, IMAGE_HEADER.unpack_from(payload)[5] if len(payload) >= IMAGE_HEADER.size else None,
+                         len(payload))
+    await send_to_websockets(robot, payload, msg_type=image_type(image))
+
+def encode(message, raw=None):
+    """Frame data (bytes, serialized once for all the clients), text flag and status flag of a message.
+    raw: JSON bytes of the message as received, sent without serializing the message again."""
+    if raw is not None:
+        return raw, True, message.get("type") == "status"
+    if isinstance(message, bytes):
+        return message, False, False
+    if isinstance(message, str):
+        return message.encode("utf-8"), True, False
+    return json.dumps(message).encode("utf-8"), True, message.get("type") == "status"
+
+async def send_to_websockets(robot, message, raw=None, msg_type=None):
+    """Queues the message of the robot shard to its subscribers (bytes as binary frames, dicts as JSON)."""
+    if not robot.subscribers and not all_subscribers:
+        return
+    data, text, status = encode(message, raw)
+    msg_type = msg_type or message.get("type")
+    for subscribers in (robot.subscribers, all_subscribers):
+        for queue in list(subscribers):
+            if queue.types is None or msg_type in queue.types:
+                queue.put(data, text, status)
+
+async def websocket_handler(websocket, robot_id=None, types=None):
+    """Handles websocket connections, subscribed to the robot robot_id (None for all the robots),
+    for the message types in types (None for all)."""
+    queue = ClientQueue(websocket, types=types)
+    # The current cycle snapshots are queued first, before any new message
+    robot = robots.get(robot_id)
+    shards = list(robots.values()) if robot_id is None else [robot] if robot else []
+    for robot in shards:
+        for frame, msg_type in robot.snapshot.frames():
+            if msg_type == "snapshot" or types is None or msg_type in types:
+                queue.put(*encode(frame))
+    if robot_id is None:
+        subscribers = all_subscribers
+    elif robot is not None:
+        subscribers = robot.subscribers
+    else:
+        # Unknown robot: no shard is created for it, the subscribers wait for its first message
+        subscribers = waiting_subscribers.setdefault(robot_id, set())
+    subscribers.add(queue)
+    clients[websocket] = queue
+    print(f"Websocket connected: {websocket} (robot {robot_id or 'all'}, types {','.join(types) if types else 'all'})")
 
     try:
         await websocket.wait_closed()
     except Exception as e:
         print(f"Websocket error: {e}")
     finally:
-        connected_websockets.remove(websocket)
+        clients.pop(websocket, None)
+        subscribers.discard(queue)
+        if not subscribers and waiting_subscribers.get(robot_id) is subscribers:
+            del waiting_subscribers[robot_id]
+        queue.close()
+        queue.task.cancel()
         print(f"Websocket disconnected: {websocket}")
 
-async def start_servers():
-    """Main function to start MQTT and websocket servers."""
-    global main_event_loop
-    main_event_loop = asyncio.get_event_loop()  # Get the main event loop
+def start_mqtt():
+    """Starts the MQTT ingestion on the running event loop; returns the MQTT client."""
+    global cycle_store
+    if CYCLE_DB:
+        cycle_store = CycleStore(CYCLE_DB)
+    ingest.start(asyncio.get_running_loop())
+    ingest.task = asyncio.create_task(ingest_messages())
 
     client = mqtt.Client()
     client.on_connect = on_connect
     client.on_message = on_message
 
-    client.connect(MQTT_BROKER, 1883, 60)
+    client.connect_async(MQTT_BROKER, 1883, 60)
     client.loop_start()
+    return client
 
-    async with websockets.serve(websocket_handler, WEBSOCKET_HOST, WEBSOCKET_PORT):
-        print(f"Websocket server started on ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
-        await asyncio.Future()
+def stop_mqtt(client):
+    """Stops the MQTT ingestion."""
+    client.loop_stop()
+    client.disconnect()
+    ingest.task.cancel()
+    if cycle_store is not None:
+        cycle_store.close()
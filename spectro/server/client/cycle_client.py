@@ -0,0 +1,229 @@
+"""Cycle automation client: drives N robots through back-to-back scramble + solve cycles.
+
+For each robot (Cubotino_T_server.py API):
+  - one pooled keep-alive HTTP session is shared by all the requests
+  - the robot state is followed on the Server-Sent Events stream (/events), falling back to the
+    long-poll /status?wait_for_change= when the stream is not available: no fixed sleeps
+  - jobs are queued ahead (--ahead), for the robot never to idle between jobs
+  - requests are retried with jittered exponential backoff
+  - each job latency is recorded: request -> start -> finish (client clock)
+Cycles per hour, per robot and for the fleet, are printed every --report secs and at the end.
+
+Example: python cycle_client.py --robots http://192.168.88.101:8000 http://192.168.88.102:8000 --cycles 10
+The robots default to ROBOT_API_URL (comma separated).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+import aiohttp
+
+KINDS = ("scramble", "solve")
+FINISHED = ("done", "failed", "cancelled", "interrupted")  # job states of a finished job (robot_jobs.py)
+
+
+async def retry(action, what, base=0.5, cap=30.0, attempts=None):
+    """Runs the coroutine function action, retrying with jittered exponential backoff (full jitter)."""
+    attempt = 0
+    while True:
+        try:
+            return await action()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            attempt += 1
+            if attempts is not None and attempt >= attempts:
+                raise
+            delay = random.uniform(0, min(cap, base * 2 ** attempt))
+            print(f"[Retry {attempt}] {what}: {e!r}, next attempt in {delay:.1f} s")
+            await asyncio.sleep(delay)
+
+
+class Robot:
+    """A robot API: state following, job submission and per-job latency records."""
+
+    def __init__(self, session, url, ahead=1, max_cycles=None):
+        self.session = session
+        self.url = url.rstrip("/")
+        self.ahead = ahead
+        self.max_cycles = max_cycles
+        self.state = {}
+        self.changed = asyncio.Condition()
+        self.jobs = {}  # job id -> record (kind, cycle, requested, started, finished, result)
+        self.submitted = 0  # jobs submitted
+        self.completed_cycles = 0  # solve jobs with result Cube_solved
+        self.reconciling = False
+        self.started = time.monotonic()
+
+    async def request(self, method, path, **kwargs):
+        async def action():
+            async with self.session.request(method, self.url + path, **kwargs) as response:
+                response.raise_for_status()
+                return await response.json()
+        return await retry(action, f"{method} {self.url}{path}")
+
+    async def set_state(self, state):
+        """New robot state: job start and finish times are recorded on the running job changes."""
+        now = time.monotonic()
+        previous = self.state.get("running_job")
+        running = state.get("running_job")
+        if running != previous:
+            # job ids are recorded also when their submit response has not arrived yet
+            if previous is not None:
+                record = self.jobs.setdefault(previous, {"started": None, "finished": None})
+                if record["finished"] is None:
+                    record["finished"] = now
+                    if "kind" in record:
+                        asyncio.create_task(self.job_done(previous))
+            if running is not None:
+                record = self.jobs.setdefault(running, {"started": None, "finished": None})
+                if record["started"] is None:
+                    record["started"] = now
+        self.state = state
+        if state.get("running_job") is None and state.get("queued_jobs") == 0 and self.pending() and not self.reconciling:
+            # jobs cancelled while queued never run: their state is fetched once the robot queue is empty
+            self.reconciling = True
+            asyncio.create_task(self.reconcile())
+        async with self.changed:
+            self.changed.notify_all()
+
+    async def follow_events(self):
+        """Follows the robot state on the SSE stream (reconnecting with Last-Event-ID), or by long-poll."""
+        last_id = None
+        attempt = 0
+        while True:
+            headers = {"Accept": "text/event-stream"}
+            if last_id is not None:
+                headers["Last-Event-ID"] = str(last_id)
+            try:
+                async with self.session.get(self.url + "/events", headers=headers,
+                                            timeout=aiohttp.ClientTimeout(total=None, sock_read=60)) as response:
+                    if response.status == 404:
+                        return await self.follow_long_poll()
+                    response.raise_for_status()
+                    attempt = 0
+                    data = None
+                    async for raw in response.content:
+                        line = raw.decode("utf-8").rstrip("\r\n")
+                        if line.startswith("id:"):
+                            last_id = int(line[3:].strip())
+                        elif line.startswith("data:"):
+                            data = line[5:].strip()
+                        elif line == "" and data is not None:
+                            await self.set_state(json.loads(data))
+                            data = None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                attempt += 1
+                delay = random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+                print(f"[Events {self.url}] {e!r}, reconnecting in {delay:.1f} s")
+                await asyncio.sleep(delay)
+
+    async def follow_long_poll(self):
+        """Follows the robot state with long-poll requests."""
+        state = await self.request("GET", "/status")
+        while True:
+            await self.set_state(state)
+            state = await self.request("GET", "/status", params={"wait_for_change": state["version"], "timeout": 30},
+                                       timeout=aiohttp.ClientTimeout(total=45))
+
+    async def reconcile(self):
+        """Fetches the jobs still pending here, marking the finished ones (i.e. cancelled while queued)."""
+        try:
+            for job_id in [job_id for job_id, job in self.jobs.items() if "kind" in job and job["finished"] is None]:
+                job = await self.request("GET", f"/jobs/{job_id}")
+                if job["state"] in FINISHED and self.jobs[job_id]["finished"] is None:
+                    self.jobs[job_id]["finished"] = time.monotonic()
+                    await self.job_done(job_id, job)
+        finally:
+            self.reconciling = False
+        async with self.changed:
+            self.changed.notify_all()
+
+    async def wait_for(self, predicate):
+        async with self.changed:
+            await self.changed.wait_for(lambda: predicate(self.state))
+
+    def pending(self):
+        """Jobs submitted and not finished."""
+        return sum(1 for job in self.jobs.values() if "kind" in job and job["finished"] is None)
+
+    async def submit(self, kind, cycle):
+        requested = time.monotonic()
+        path, body = ("/scramble", {"scramb_cycle": cycle}) if kind == "scramble" else ("/solve", {"solv_cycle": cycle})
+        job = (await self.request("POST", path, json=body))["job"]
+        record = self.jobs.setdefault(job["id"], {"started": None, "finished": None})
+        record.update(kind=kind, cycle=cycle, requested=requested, result=None)
+        if record["finished"] is not None:   # job finished before its submit response arrived
+            asyncio.create_task(self.job_done(job["id"]))
+
+    async def job_done(self, job_id, job=None):
+        """Fetches the result of a finished job (unless given), and prints its latency."""
+        record = self.jobs[job_id]
+        if job is None:
+            job = await self.request("GET", f"/jobs/{job_id}")
+        record["result"] = job.get("result") or job.get("state")
+        queued = (record["started"] or record["finished"]) - record["requested"]
+        running = record["finished"] - (record["started"] or record["finished"])
+        print(f"[{self.url}] job {job_id} {record['kind']} cycle {record['cycle']}: {record['result']}"
+              f"   request->start {queued:6.2f} s   start->finish {running:6.2f} s")
+        if record["kind"] == "solve" and record["result"] == "Cube_solved":
+            self.completed_cycles += 1
+
+    async def run(self):
+        """Keeps `ahead` jobs queued beyond the running one, until max_cycles have been submitted."""
+        events = asyncio.create_task(self.follow_events())
+        try:
+            await self.wait_for(lambda state: "version" in state)
+            while self.max_cycles is None or self.submitted < 2 * self.max_cycles:
+                await self.wait_for(lambda state: self.pending() <= self.ahead)
+                kind, cycle = KINDS[self.submitted % 2], 1 + self.submitted // 2
+                await self.submit(kind, cycle)
+                self.submitted += 1
+            await self.wait_for(lambda state: self.pending() == 0)
+            while any("kind" in job and job["result"] is None for job in self.jobs.values()):
+                await asyncio.sleep(0.05)   # last job results being fetched
+        finally:
+            events.cancel()
+
+    def cycles_per_hour(self):
+        return 3600 * self.completed_cycles / max(1e-9, time.monotonic() - self.started)
+
+
+def report(robots):
+    for robot in robots:
+        print(f"{robot.url:>40}: {robot.completed_cycles:5d} cycles   {robot.cycles_per_hour():8.1f} cycles/hour")
+    print(f"{'fleet':>40}: {sum(r.completed_cycles for r in robots):5d} cycles"
+          f"   {sum(r.cycles_per_hour() for r in robots):8.1f} cycles/hour")
+
+
+async def main(args):
+    connector = aiohttp.TCPConnector(limit_per_host=4, keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30)) as session:
+        robots = [Robot(session, url, args.ahead, args.cycles) for url in args.robots]
+
+        async def periodic_report():
+            while True:
+                await asyncio.sleep(args.report)
+                report(robots)
+
+        reporter = asyncio.create_task(periodic_report())
+        try:
+            await asyncio.gather(*(robot.run() for robot in robots))
+        finally:
+            reporter.cancel()
+            report(robots)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Back-to-back scramble + solve cycles on N robots")
+    parser.add_argument("--robots", nargs="+", default=os.getenv("ROBOT_API_URL", "http://192.168.88.101:8000").split(","),
+                        help="Robots API URLs (default ROBOT_API_URL, comma separated)")
+    parser.add_argument("--cycles", type=int, default=None, help="Cycles per robot (default endless)")
+    parser.add_argument("--ahead", type=int, default=1, help="Jobs queued on the robot beyond the running one")
+    parser.add_argument("--report", type=float, default=300, help="Throughput report interval (secs)")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        print("Stopped by user.")
@@ -1,7 +1,31 @@
 import { useState, useEffect } from "react";
 import "./styles.css"; // Import CSS file
 
-const WS_URL = `${window.location.origin.replace(/^http/, "ws")}/ws/`;
+// ?robot=<id> in the page URL follows one robot of the fleet (all the robots when omitted)
+const ROBOT = new URLSearchParams(window.location.search).get("robot");
+const WS_URL = `${window.location.origin.replace(/^http/, "ws")}/ws/${ROBOT ? `?robot=${encodeURIComponent(ROBOT)}` : ""}`;
+
+// Binary image message: 20 bytes header (magic "CIMG", version, kind, side, encoding,
+// timestamp float64, width uint16, height uint16, big-endian) followed by the image bytes
+const IMAGE_HEADER_SIZE = 20;
+const IMAGE_KINDS = { 1: "face", 2: "image" };
+const IMAGE_MIME = { 1: "image/jpeg", 2: "image/png" };
+
+function parseImage(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== "CIMG") return null;
+  return {
+    type: IMAGE_KINDS[view.getUint8(5)],
+    side: view.getUint8(6),
+    timestamp: view.getFloat64(8),
+    width: view.getUint16(16),
+    height: view.getUint16(18),
+    url: URL.createObjectURL(
+      new Blob([new Uint8Array(buffer, IMAGE_HEADER_SIZE)], { type: IMAGE_MIME[view.getUint8(7)] })
+    ),
+  };
+}
 
 function App() {
   const [image, setImage] = useState(null);
@@ -10,25 +34,51 @@ function App() {
   const [solutionArray, setSolutionArray] = useState([]);
   const [cubeFaces, setCubeFaces] = useState({});
   const [robotState, setRobotState] = useState("");
+  const [progress, setProgress] = useState(0);
 
   useEffect(() => {
     const ws = new WebSocket(WS_URL);
+    ws.binaryType = "arraybuffer";
 
     ws.onopen = () => console.log("Connected to WebSocket:", WS_URL);
     ws.onmessage = (event) => {
+      if (event.data instanceof ArrayBuffer) {
+        const img = parseImage(event.data);
+        if (img && img.type === "image") {
+          setImage((prev) => {
+            if (prev) URL.revokeObjectURL(prev);
+            return img.url;
+          });
+        } else if (img && img.type === "face") {
+          setCubeFaces((prev) => {
+            if (prev[img.side]) URL.revokeObjectURL(prev[img.side]);
+            return { ...prev, [img.side]: img.url };
+          });
+        }
+        return;
+      }
       const data = JSON.parse(event.data);
 
-      if (data.type === "image") {
-        setImage(`data:image/jpeg;base64,${data.image_data}`);
-      } else if (data.type === "solution") {
+      if (data.type === "solution") {
         setSolution(data.solution);
         setSolutionArray(data.solution.split(""));
         setCurrentStepIndex(-1);
-      } else if (data.type === "command") {
-        setCurrentStepIndex(data.step - 1);
-      } else if (data.type === "face") {
-        const { side, image_data } = data;
-        setCubeFaces((prev) => ({ ...prev, [side]: `data:image/jpeg;base64,${image_data}` }));
+        setProgress(0);
+      } else if (data.type === "moves") {
+        // batch of robot move events: the last one is the move in progress (2 characters per move)
+        if (data.events.length > 0) {
+          setCurrentStepIndex(2 * data.events[data.events.length - 1].index);
+        }
+        setProgress(data.progress);
+      } else if (data.type === "snapshot") {
+        // compacted state of the current cycle, sent on join (images follow as binary frames)
+        if (data.status) setRobotState(data.status.robot_state);
+        if (data.solution) {
+          setSolution(data.solution.solution);
+          setSolutionArray(data.solution.solution.split(""));
+        }
+        setCurrentStepIndex(data.progress.index >= 0 ? 2 * data.progress.index : -1);
+        setProgress(data.progress.progress);
       } else if (data.type === "status") {
         setRobotState(data.robot_state);
 
@@ -37,6 +87,7 @@ function App() {
           setSolution("");
           setSolutionArray([]);
           setCurrentStepIndex(-1);
+          setProgress(0);
           setCubeFaces({});
         } 
       }
@@ -83,10 +134,10 @@ return (
             </div>
 	
       <div className="section current-command-box">
-        <h2>Current Command</h2>
+        <h2>Current Command {solutionArray.length > 0 && `(${progress}%)`}</h2>
         <div className="command-container">
           {solutionArray.map((char, index) => (
-            <span key={index} className={index === currentStepIndex ? "highlight-red" : ""}>
+            <span key={index} className={currentStepIndex >= 0 && (index === currentStepIndex || index === currentStepIndex + 1) ? "highlight-red" : ""}>
               {char}
             </span>
           ))}
@@ -40,7 +40,8 @@ version = '7.4 (31 May 2024)'
 ################  setting argparser for robot remote usage, and other settings  #################
 import argparse
 #from mqtt_publisher import send_solution, send_command, send_image,send_face_image
-from mqtt_publisher_class import mqtt_publisher
+from mqtt_publisher import mqtt_publisher
+from face_image_publisher import face_images
 
 # argument parser object creation
 parser = argparse.ArgumentParser(description='CLI arguments for Cubotino_T.py')
@@ -181,7 +182,7 @@ def import_libraries():
         These librries are imported after those needed for the display management.
         Kociemba solver is tentatively imported considering three installation/copy methods."""
     
-    global servo, rm, Popen, PIPE, camera, GPIO, median, dt, sv, cubie
+    global servo, rm, sim, Popen, PIPE, camera, GPIO, median, dt, sv, cubie
     global np, math, time, cv2, os, pathlib
 
     
@@ -189,6 +190,7 @@ def import_libraries():
     from Cubotino_T_settings_manager import settings as settings   # custom library managing the settings from<>to the settings files
     import Cubotino_T_servos as servo                     # custom library controlling Cubotino servos and led module
     import Cubotino_T_moves as rm                         # custom library, traslates the cuber solution string in robot movements string
+    import Cubotino_T_cube_sim as sim                     # custom library, virtual cube manipulated by the robot movements
 
     # import non-custom libraries
     from statistics import median                         # median is used as sanity check while evaluating facelets contours
@@ -2652,7 +2654,7 @@ def decoration(deco_info):
     if debug:                                            # case debug variable is set True
         print('Unfolded cube status image is saved : ', fname) # feedback is printed to the terminal
     status=cv2.imwrite(fname, collage)                   # cube sketch with detected and interpred colors is saved as image
-    mqtt_publisher.send_image(fname)
+    mqtt_publisher.send_image(fname, collage.shape[1], collage.shape[0])   # collage is published, as binary image
     
     if screen and not robot_stop:                        # case screen variable is set True
         cv2.namedWindow('cube_collage')                  # create the collage window
@@ -4263,49 +4265,6 @@ def tune_image_setup(expo_shift, display, gui_debug):
 
 
 
-def cube_facelets_permutation(cube_status, move_type, direction):
-    """Function that updates the cube status, according to the move type the robot does
-       The 'ref' tuples provide the facelet current reference position to be used on the updated position.
-       As example, in case of flip, the resulting facelet 0 is the one currently in position 53 (ref[0])."""
-    
-    if move_type == 'F':         # case the robot move is a cube flip (complete cube rotation around L-R horizontal axis) 
-        ref=(53,52,51,50,49,48,47,46,45,11,14,17,10,13,16,9,12,15,0,1,2,3,4,5,6,7,8,\
-             18,19,20,21,22,23,24,25,26,42,39,36,43,40,37,44,41,38,35,34,33,32,31,30,29,28,27)
-    
-    elif move_type == 'S':       # case the robot move is a spin (complete cube rotation around vertical axis)
-        if direction == '0' or direction == '4':     # case spin is 180deg
-            ref=(8,7,6,5,4,3,2,1,0,36,37,38,39,40,41,42,43,44,45,46,47,48,49,50,51,52,53,\
-                 35,34,33,32,31,30,29,28,27,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26)
-        elif direction == '1':   # case spin is CW
-            ref=(2,5,8,1,4,7,0,3,6,18,19,20,21,22,23,24,25,26,36,37,38,39,40,41,42,43,44,\
-                 33,30,27,34,31,28,35,32,29,45,46,47,48,49,50,51,52,53,9,10,11,12,13,14,15,16,17)
-        elif direction == '3':   # case spin is CCW
-            ref=(6,3,0,7,4,1,8,5,2,45,46,47,48,49,50,51,52,53,9,10,11,12,13,14,15,16,17,\
-                 29,32,35,28,31,34,27,30,33,18,19,20,21,22,23,24,25,26,36,37,38,39,40,41,42,43,44)
-   
-    elif move_type == 'R':       # case the robot move is a rotation (lowest layer rotation versus mid and top ones) 
-        if direction == '0' or direction == '4':     # case 1st layer rotation is 180deg
-            ref=(0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,42,43,44,18,19,20,21,22,23,51,52,53,\
-                 35,34,33,32,31,30,29,28,27,36,37,38,39,40,41,15,16,17,45,46,47,48,49,50,24,25,26)
-        elif direction == '1':   # case 1st layer rotation is CW
-            ref=(0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,24,25,26,18,19,20,21,22,23,42,43,44,\
-                 33,30,27,34,31,28,35,32,29,36,37,38,39,40,41,51,52,53,45,46,47,48,49,50,15,16,17)
-        elif direction == '3':   # case 1st layer rotation is CCW
-            ref=(0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,51,52,53,18,19,20,21,22,23,15,16,17,\
-                 29,32,35,28,31,34,27,30,33,36,37,38,39,40,41,24,25,26,45,46,47,48,49,50,42,43,44)
-    
-    new_status = ""              # empty string to generate the cube status, updated according to move_type and direction
-    for i in range(54):          # iteration over the 54 facelets
-        new_status+=str(cube_status[ref[i]])  # updated cube status takes the facelet from previous status at ref location
-    
-    return new_status            # updated cube status is returneddef cube_facelets_permutation(cube_status, move_type, direction):
-
-
-
-
-
-
-
 def plot_animation(wait, colors_a, cube_status, startup=False, kill=False):
     """ Based on the detected cube status, a sketch of the cube is plot with bright colors on the pictures collage."""
 
@@ -4362,29 +4321,11 @@ def animation(screen, colors_a, cube_status_string, robot_moves):
     """Plots to screen the facelets animation on a cube sketch.
         Detected colors are used to identify the different facelets."""
 
-    cube_status_a = cube_status_string              # cube_status_string is assigned to a local and shorter variable
-    
     # changing the URF oriented cube status to the cube orientation after the scanning 
-    cube_status_a = cube_facelets_permutation(cube_status_a, 'S', '3')  # facelets permutation assigned to updated cube_status_a
-    cube_status_a = cube_facelets_permutation(cube_status_a, 'F', '1')  # facelets permutation assigned to updated cube_status_a
-    
-    idx = 1                                         # idx variale used for the dict key
-    csa = {}                                        # dict to store the cube status from the start until solution
-    csa[0] = cube_status_a                          # first csa value is the cube status after scanning
-    for i in range(0, len(robot_moves),2):          # iteration over the "in-between" robot movements
-        move_type = robot_moves[i:i+1]              # robot move type is retrieved from robot_moves string
-        direction = robot_moves[i+1:i+2]            # robot move direction/repeats is retrieved from robot_moves string
-        if move_type == 'F':                        # case the robot move is F (flip)
-            for k in range(int(direction)):         # iteration over the quantity of flips
-                # facelets permutation assigned to pdated cube_status_a
-                cube_status_a = cube_facelets_permutation(cube_status_a, move_type, direction)
-                csa[idx] = cube_status_a            # csa gets cube_status_a as new value for the idx index
-                idx+=1                              # idx index is incremented
-        else:                                       # case the robot move is not F (not flip means spin or rotate)
-            # facelets permutation assigned to pdated cube_status_a
-            cube_status_a = cube_facelets_permutation(cube_status_a, move_type, direction)
-            csa[idx] = cube_status_a                # csa gets cube_status_a as new value for the idx index
-            idx+=1                                  # idx index is incremented
+    cube_status_a = sim.apply(cube_status_string, sim.urf_to_scan)  # facelets permutation assigned to cube_status_a
+    
+    # dict to store the cube status from the start until solution, one frame per robot movement
+    csa = dict(enumerate(sim.frames(cube_status_a, robot_moves)))
         
     frames = len(csa)                               # len(csa) defines the frames quantity
     
@@ -4636,8 +4577,8 @@ def cubeAF():
         plot_to_display(side)                       # feedback is printed to the display
         frame, w, h = read_camera()                 # video stream and frame dimensions
 
-        _, buffer = cv2.imencode('.jpg', frame)
-        mqtt_publisher.send_face_image(side,buffer)
+        clean_frame = frame.copy()                  # copy of the frame, before contours and facelets are drawn on it
+        face_images.offer(side, clean_frame)        # latest clean frame is handed to the face images publisher (thumbnail)
 
         if screen:                                  # case screen variable is set True
             cv2.namedWindow('cube')                 # create the cube window
@@ -4732,6 +4673,7 @@ def cubeAF():
                     URFDLB_facelets_BGR_mean = URFDLB_facelets_order(BGR_mean)  # faces and facelets are ordered as per URFDLB order
                     plot_to_display(side, URFDLB_facelets_BGR_mean)    # detected colour are plot to the display
                     faces = face_image(frame, facelets, side, faces)   # image of the cube side is taken for later reference
+                    face_images.accept(side, clean_frame)        # detected side clean image is published at full resolution
                     
                     
                     # when cv_wow is set True
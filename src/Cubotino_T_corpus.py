@@ -0,0 +1,200 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+# Corpus of cube status for reproducible benchmarks: Same corpus file, same cubes and same solutions.
+#
+# The corpus has N random cube status, generated from a seed, plus some curated sets:
+#  - solved: the solved cube
+#  - superflip: all the edges flipped in place
+#  - single: the 18 cube status one move away from the solved one
+#  - maxdepth: the cube status having the deepest solution, out of a pool of random cube status
+#  - examples: the cube status solved by the example solutions in Cubotino_T_moves.py
+# The Kociemba solutions are precomputed, and stored together with the cube status in a compressed npz file.
+#
+# Reproducibility: only the corpus FILE is reproducible across machines, not the seed. The random, solved,
+# superflip, single and examples sets only depend on the seed, while the solutions (and so the maxdepth set,
+# selected on the solutions length) depend on the solver timing (max_time), therefore on the machine.
+# For like for like benchmarks across machines, generate the corpus once and share the file.
+#
+# Example: python Cubotino_T_corpus.py -n 10000 --seed 1 -o corpus_seed1.npz
+#
+#############################################################################################################
+"""
+
+
+import os, random                             # random generator, as used by the Kociemba solver
+import numpy as np                            # arrays
+import Cubotino_T_moves as rm                 # custom library, with the example solutions
+
+
+solved = 'UUUUUUUUURRRRRRRRRFFFFFFFFFDDDDDDDDDLLLLLLLLLBBBBBBBBB'   # solved cube status, URFDLB order
+set_names = ('random', 'solved', 'superflip', 'single', 'maxdepth', 'examples')       # corpus sets
+version = 1                                   # corpus file format version
+
+_loaded = {}                                  # corpora already loaded, keyed by file name
+
+
+
+
+def import_solver():
+    """Importing Kociemba solver, copied in the active folder, in the twophase sub-folder or installed in venv."""
+
+    global sv, cubie
+    try:                                      # attempt
+        import solver as sv                   # import Kociemba solver copied in /home/pi/cubotino/src
+        import cubie as cubie                 # import cubie Kociemba solver library part
+    except:                                   # exception is raised if no library in folder or other issues
+        import twophase.solver as sv          # import Kociemba solver copied in twophase sub-folder, or installed
+        import twophase.cubie as cubie        # import cubie Kociemba solver library part
+
+
+
+
+def scramble(rnd):
+    """Random cube generator, from Kociemba solver library, based on the random generator in argument. """
+
+    random.setstate(rnd.getstate())           # the solver uses the random module
+    cc = cubie.CubieCube()                    # cube in cubie reppresentation
+    cc.randomize()                            # randomized cube in cubie reppresentation
+    rnd.setstate(random.getstate())           # random generator state is updated
+    return str(cc.to_facelet_cube())          # returns a randomized cube in facelets string reppresentation
+
+
+
+
+def solve(cube_status, max_moves=20, max_time=2):
+    """ Returns the Kociemba solution (i.e. 'U2 R1 F3') for the cube status, or the solver error string."""
+
+    s = sv.solve(cube_status, max_moves, max_time)   # solver is called
+    if s[:5] == 'Error':                      # case the solver returned an error
+        return s
+    return s[:s.find('(')].strip()            # solution, without the moves amount
+
+
+
+
+def from_moves(moves):
+    """ Returns the cube status after applying the solver notation moves (i.e. 'U2 R1 F3') to the solved cube."""
+
+    cc = cubie.CubieCube()                    # solved cube in cubie reppresentation
+    moves = moves.replace(" ", "")            # eventual empty spaces are removed from the string
+    for i in range(0, len(moves), 2):         # iteration over the moves
+        cc.multiply(cubie.moveCube[3*'URFDLB'.index(moves[i]) + int(moves[i+1]) - 1])
+    return str(cc.to_facelet_cube())
+
+
+
+
+def inverse(moves):
+    """ Returns the inverse of the solver notation moves (i.e. 'U2 R1 F3' returns 'F1 R3 U2')."""
+
+    moves = moves.split()
+    return ' '.join(m[0] + str(4 - int(m[1])) for m in reversed(moves))
+
+
+
+
+def curated_sets(pool, maxdepth_count, seed, solve_map=map):
+    """ Returns a list of (set name, cube status) of the curated sets.
+        The maxdepth set is searched on a pool of random cube status, generated from a different seed;
+        The pool is seeded, yet the maxdepth selection depends on the solver timing (not reproducible from the seed);
+        solve_map is the map function used to solve the pool (i.e. the map of a multiprocessing Pool)."""
+
+    cubes = [('solved', solved)]
+    cc = cubie.CubieCube(eo=[1]*12)           # all the edges flipped in place
+    cubes.append(('superflip', str(cc.to_facelet_cube())))
+    for face in 'URFDLB':                     # iteration over the faces
+        for turns in '123':                   # iteration over the face turns
+            cubes.append(('single', from_moves(face + turns)))
+
+    rnd = random.Random(f'{seed}-maxdepth')   # random generator for the pool
+    states = [scramble(rnd) for i in range(pool)]
+    depths = [(len(s.split()), cube_status) for s, cube_status in zip(solve_map(solve, states), states)]
+    depths.sort(key=lambda d: -d[0])          # deepest solutions first (stable sort keeps the pool order)
+    cubes += [('maxdepth', cube_status) for depth, cube_status in depths[:maxdepth_count]]
+
+    for solution in rm.example_solutions:     # iteration over the example solutions
+        cubes.append(('examples', from_moves(inverse(solution))))
+    return cubes
+
+
+
+
+def generate(n, seed, pool=1000, maxdepth_count=20, workers=1):
+    """ Returns the corpus dict, with n random cube status from the seed, the curated sets and the solutions.
+        The solutions are searched on workers processes."""
+
+    import multiprocessing as mp              # parallel processes
+    import_solver()                           # Kociemba solver
+    rnd = random.Random(f'{seed}-random')     # random generator for the random set
+    cubes = [('random', scramble(rnd)) for i in range(n)]
+    with mp.Pool(workers, initializer=import_solver) as p:
+        cubes += curated_sets(pool, maxdepth_count, seed, p.map)
+        states = [cube_status for name, cube_status in cubes]
+        solutions = p.map(solve, states, chunksize=100)
+    return {'states': states, 'solutions': solutions, 'sets': [name for name, cube_status in cubes], 'seed': seed}
+
+
+
+
+def save(fname, corpus):
+    """ Saves the corpus to a compressed npz file: cube status as (N, 54) uint8 array, solutions as bytes array."""
+
+    np.savez_compressed(fname, version=version, seed=corpus['seed'],
+                        states=np.frombuffer(''.join(corpus['states']).encode('ascii'), dtype=np.uint8).reshape(-1, 54),
+                        solutions=np.array([s.encode('ascii') for s in corpus['solutions']]),
+                        sets=np.array([set_names.index(name) for name in corpus['sets']], dtype=np.uint8),
+                        set_names=np.array(set_names))
+
+
+
+
+def load(fname, sets=()):
+    """ Returns the corpus dict from the npz file; When sets is not empty, only the cubes of those sets are returned.
+        Loaded corpora are cached, per file name."""
+
+    if fname not in _loaded:                  # case the corpus file has not been loaded yet
+        with np.load(fname) as data:
+            if int(data['version']) != version:
+                raise ValueError(f'Corpus {fname} has version {int(data["version"])}, expected {version}')
+            names = [str(name) for name in data['set_names']]
+            _loaded[fname] = {'states': [row.tobytes().decode('ascii') for row in data['states']],
+                              'solutions': [s.decode('ascii') for s in data['solutions']],
+                              'sets': [names[i] for i in data['sets']], 'seed': int(data['seed'])}
+    corpus = _loaded[fname]
+    if not sets:                              # case all the sets are requested
+        return corpus
+    idx = [i for i, name in enumerate(corpus['sets']) if name in sets]
+    return {key: [corpus[key][i] for i in idx] if key != 'seed' else corpus[key] for key in corpus}
+
+
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    # argument parser object creation
+    parser = argparse.ArgumentParser(description='Generates a corpus of cube status, with their solutions')
+    parser.add_argument("-n", "--number", type=int, default=10000,
+                        help="Number of random cube status")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed for the random cube status")
+    parser.add_argument("--pool", type=int, default=1000,
+                        help="Number of random cube status to search the max depth set on")
+    parser.add_argument("--maxdepth", type=int, default=20,
+                        help="Number of cube status in the max depth set")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="Number of worker processes for the solutions (default all the cores)")
+    parser.add_argument("-o", "--out", type=str, default='',
+                        help="Corpus file name (default corpus_seed<seed>_<number>.npz)")
+    args = parser.parse_args()
+
+    fname = args.out if args.out != '' else f'corpus_seed{args.seed}_{args.number}.npz'
+    corpus = generate(args.number, args.seed, args.pool, args.maxdepth, args.workers)
+    save(fname, corpus)
+    for name in set_names:                    # iteration over the corpus sets
+        print(f"{name:>10}: {corpus['sets'].count(name):,d} cube status")
+    print(f"Corpus saved at: {fname}")
@@ -0,0 +1,205 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+# Virtual cube, manipulated by the CUBOTino robot moves (Flip, Spin and Rotate)
+#
+# The cube status is a string of 54 facelets, as per URFDLB order (i.e. the Kociemba solver notation).
+# Each robot move is a permutation of the 54 facelets, stored as an uint8 array of indexes:
+# As example, in case of flip, the resulting facelet 0 is the one currently in position 53 (ref[0]).
+#
+# Robot moves with repeats (F2, F3) or 180deg (S0, S4, R0, R4) are pre-composed into a single permutation.
+# A whole robot moves string can be compiled into a single permutation, applied at once.
+# The batch functions apply the permutations to an (N, 54) array of cube status at once.
+#
+#############################################################################################################
+"""
+
+
+import numpy as np                            # arrays
+import Cubotino_T_moves as rm                 # custom library, with the parsed robot moves (RobotOps)
+
+
+
+##################    facelets permutations of the base robot moves    ##############################
+# cube flip (complete cube rotation around L-R horizontal axis)
+F_ref = (53,52,51,50,49,48,47,46,45,11,14,17,10,13,16,9,12,15,0,1,2,3,4,5,6,7,8,\
+         18,19,20,21,22,23,24,25,26,42,39,36,43,40,37,44,41,38,35,34,33,32,31,30,29,28,27)
+
+# cube spin CW (complete cube rotation around vertical axis)
+S1_ref = (2,5,8,1,4,7,0,3,6,18,19,20,21,22,23,24,25,26,36,37,38,39,40,41,42,43,44,\
+          33,30,27,34,31,28,35,32,29,45,46,47,48,49,50,51,52,53,9,10,11,12,13,14,15,16,17)
+
+# cube spin CCW (complete cube rotation around vertical axis)
+S3_ref = (6,3,0,7,4,1,8,5,2,45,46,47,48,49,50,51,52,53,9,10,11,12,13,14,15,16,17,\
+          29,32,35,28,31,34,27,30,33,18,19,20,21,22,23,24,25,26,36,37,38,39,40,41,42,43,44)
+
+# 1st layer rotation CW (lowest layer rotation versus mid and top ones)
+R1_ref = (0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,24,25,26,18,19,20,21,22,23,42,43,44,\
+          33,30,27,34,31,28,35,32,29,36,37,38,39,40,41,51,52,53,45,46,47,48,49,50,15,16,17)
+
+# 1st layer rotation CCW (lowest layer rotation versus mid and top ones)
+R3_ref = (0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,51,52,53,18,19,20,21,22,23,15,16,17,\
+          29,32,35,28,31,34,27,30,33,36,37,38,39,40,41,24,25,26,45,46,47,48,49,50,42,43,44)
+# ###################################################################################################
+
+
+
+
+def compose(*perms):
+    """ Composes the permutations in argument into a single one, applied from the first to the last."""
+
+    result = np.arange(54, dtype=np.uint8)    # identity permutation
+    for perm in perms:                        # iteration over the permutations
+        result = result[perm]                 # the facelet at i comes from the one at perm[i] of the previous status
+    return result
+
+
+
+
+# identity permutation (no robot moves)
+identity = np.arange(54, dtype=np.uint8)
+
+# base permutations as uint8 arrays
+F = np.array(F_ref, dtype=np.uint8)
+S1 = np.array(S1_ref, dtype=np.uint8)
+S3 = np.array(S3_ref, dtype=np.uint8)
+R1 = np.array(R1_ref, dtype=np.uint8)
+R3 = np.array(R3_ref, dtype=np.uint8)
+
+# pre-composed permutation per robot move, keyed by (op code, argument) as in RobotOps
+op_perm = {(rm.OP_F, 1): F,              (rm.OP_F, 2): compose(F, F),   (rm.OP_F, 3): compose(F, F, F),
+           (rm.OP_S, 1): S1,             (rm.OP_S, 3): S3,
+           (rm.OP_S, 0): compose(S1, S1), (rm.OP_S, 4): compose(S3, S3),
+           (rm.OP_R, 1): R1,             (rm.OP_R, 3): R3,
+           (rm.OP_R, 0): compose(R1, R1), (rm.OP_R, 4): compose(R3, R3)}
+for perm in op_perm.values():            # the permutations are made read only, as shared
+    perm.flags.writeable = False
+
+# cube orientation change from URF (as per the solver) to the one the robot has after the scanning
+urf_to_scan = compose(S3, F)
+
+_compiled = {}                           # cache of compiled robot moves, keyed by the robot moves string
+_compiled_max = 10000                    # max entries in the cache, as random cubes rarely repeat the moves
+
+
+
+
+def compile_moves(moves):
+    """ Compiles the robot moves (string or RobotOps) into a single permutation, cached per moves string."""
+
+    key = str(moves)                          # robot moves string is used as key
+    perm = _compiled.get(key)                 # compiled permutation is retrieved, if any
+    if perm is None:                          # case the robot moves have not been compiled yet
+        ops = rm.robot_ops(moves)             # robot moves, parsed as RobotOps
+        perm = compose(*[op_perm[(op, arg)] for op, arg in zip(ops.ops, ops.args)])
+        perm.flags.writeable = False          # the permutation is made read only, as shared
+        if len(_compiled) >= _compiled_max:   # case the cache is full
+            _compiled.clear()                 # cache is emptied
+        _compiled[key] = perm                 # compiled permutation is cached
+    return perm
+
+
+
+
+def to_array(cube_status):
+    """ Converts the cube status string (54 facelets) to an uint8 array."""
+    return np.frombuffer(cube_status.encode('ascii'), dtype=np.uint8)
+
+
+
+
+def to_string(cube_array):
+    """ Converts the cube status uint8 array (54 facelets) to string."""
+    return cube_array.tobytes().decode('ascii')
+
+
+
+
+def apply(cube_status, moves):
+    """ Returns the cube status string after the robot moves (string, RobotOps or a permutation array)."""
+
+    perm = moves if isinstance(moves, np.ndarray) else compile_moves(moves)
+    return to_string(to_array(cube_status)[perm])
+
+
+
+
+def frames(cube_status, moves):
+    """ Returns a list with the cube status string at the start and after each robot movement.
+        Each flip is a frame, while spins and rotations are a frame each (also when 180deg)."""
+
+    ops = rm.robot_ops(moves)                 # robot moves, parsed as RobotOps
+    cube_array = to_array(cube_status)        # cube status as array
+    cube_frames = [cube_status]               # list of cube status, starting from the initial one
+    for op, arg in zip(ops.ops, ops.args):    # iteration over the robot moves
+        if op == rm.OP_F:                     # case the robot move is F (flip)
+            for k in range(arg):              # iteration over the quantity of flips
+                cube_array = cube_array[F]    # cube status after one flip
+                cube_frames.append(to_string(cube_array))
+        else:                                 # case the robot move is not F (not flip means spin or rotate)
+            cube_array = cube_array[op_perm[(op, arg)]]   # cube status after the spin or rotation
+            cube_frames.append(to_string(cube_array))
+    return cube_frames
+
+
+
+
+def to_batch(cube_status_list):
+    """ Converts a list of cube status strings into an (N, 54) uint8 array."""
+
+    data = ''.join(cube_status_list).encode('ascii')   # all the cube status, as a single bytes object
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, 54)
+
+
+
+
+def apply_batch(cube_arrays, moves):
+    """ Applies the robot moves to an (N, 54) array of cube status, and returns the new (N, 54) array.
+        The moves argument is a single robot moves (string or RobotOps), applied to all the cubes,
+        or a sequence of N robot moves, one per cube."""
+
+    cube_arrays = np.asarray(cube_arrays, dtype=np.uint8)
+    if isinstance(moves, str):                # case of a single robot moves, for all the cubes
+        return cube_arrays[:, compile_moves(moves)]
+    perms = np.stack([compile_moves(m) for m in moves])    # (N, 54) array of compiled permutations
+    return np.take_along_axis(cube_arrays, perms.astype(np.intp), axis=1)
+
+
+
+
+def is_solved_batch(cube_arrays):
+    """ Returns a boolean array, True for the (N, 54) cube status resembling a solved cube."""
+
+    faces = np.asarray(cube_arrays, dtype=np.uint8).reshape(-1, 6, 9)   # facelets by face: U R F D L B
+    return np.all(faces == faces[:, :, :1], axis=(1, 2))
+
+
+
+
+def is_solved(cube_status):
+    """ Returns True when the cube status string resembles a solved cube."""
+
+    if len(cube_status) != 54:                # case the cube status is not complete (54 facelets)
+        return False
+    return bool(is_solved_batch(to_array(cube_status))[0])
+
+
+
+
+if __name__ == "__main__":
+    """ Applies the robot moves of a solution to a batch of cubes, and prints the elapsed time."""
+
+    import time
+
+    solved = 'UUUUUUUUURRRRRRRRRFFFFFFFFFDDDDDDDDDLLLLLLLLLBBBBBBBBB'
+    solution = 'U2 D2 R2 L2 F2 B2'                             # solution as from the solver
+    robot, moves, robot_tot_moves, opt = rm.robot_required_moves(solution, '', simulation=True)
+    print(f'\nrobot moves: {moves}')
+
+    batch = np.repeat(to_batch([solved]), 10000, axis=0)  # batch of solved cubes
+    start = time.time()
+    batch = apply_batch(batch, moves)                     # robot moves applied to the batch
+    print(f'applied {len(batch)} cubes in {round(1000*(time.time()-start),2)} ms')
+    print(f'frames: {len(frames(solved, moves))}')
@@ -55,6 +55,9 @@ by knowing 5 faces, the 6th (B face) is also known ;-)
 """ 
 
 
+import os, json                  # python libraries, for the robot time model file
+
+
 # Global variable
 # Below dict has all the possible robot movements, related to the cube solver string
 # Original moves with spins and rotates only 90 degrees
@@ -90,6 +93,280 @@ moves_dict_ccw =  {'U1':'F2R1',     'U2':'F2R0',     'U3':'F2S1R3',
                    'R1':'S1F3R1',   'R2':'S1F3S3R0', 'R3':'S1F3R3'}
 
 
+# Robot op codes, as stored in the RobotOps.ops bytes (ASCII value of the move letter)
+OP_F = ord('F')                  # cube Flip
+OP_S = ord('S')                  # cube Spin
+OP_R = ord('R')                  # bottom layer Rotation
+
+# Cube_holder angle variation per Spin/Rotation argument (0 = CW 180deg, 1 = CW 90deg, 3 = CCW 90deg, 4 = CCW 180deg)
+op_angle = {0:180, 1:90, 3:-90, 4:-180}
+
+# Servos transitions counted by RobotOps.time_counts(), each one with its time cost in the robot time estimate
+#  - lift_from_close / lift_from_open: top cover lifts the cube (flip), from close or from open/read positions
+#  - flip_to_read / to_open: top cover from flip to read, and from flip or read to open positions
+#  - flip_to_close1 / flip_to_close2: top cover from flip to close (and release), in one or two steps
+#  - open / close: top cover from close to open, and to close (and release) positions
+#  - spin / spin180 / rotate / rotate180: Cube_holder spins and layer rotations (rotations include the release)
+#  - overhead: fixed time per robot solving sequence
+time_features = ('lift_from_close', 'lift_from_open', 'flip_to_read', 'to_open', 'flip_to_close1', 'flip_to_close2',
+                 'open', 'close', 'spin', 'spin180', 'rotate', 'rotate180', 'overhead')
+
+# robot time model file, fitted on the real robot solving times by Cubotino_T_time_calibration.py
+time_model_fname = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Cubotino_T_time_model.json')
+_time_models = {}                # robot time models already loaded, keyed by file name
+
+
+
+
+class RobotOps(str):
+    """ Robot moves string (i.e. 'F1R1S3'), parsed once into an immutable array of (op, arg) bytes.
+        The class is a str subclass, therefore it can be used wherever the robot moves string was used.
+
+        Parsed data, computed in a single pass at creation:
+         - ops: bytes with the op code per robot move (OP_F, OP_S, OP_R)
+         - args: bytes with the argument per robot move (flips amount, or Spin/Rotation direction)
+         - angles: tuple with the Cube_holder angle after each robot move
+         - angle_ok: boolean, True when the Cube_holder angle stays within -90 and +90 deg
+         - tot_moves: total amount of robot movements (each flip counts as one)
+         - progress: tuple with the solving percentage associated to each robot move
+        The time estimate is cached per servos timers, as it depends on the robot settings."""
+
+    def __new__(cls, moves):
+        self = super().__new__(cls, moves)        # the string part is the robot moves string
+        ops = bytearray()                         # op code per robot move
+        args = bytearray()                        # argument per robot move
+        angles = []                               # Cube_holder angle after each robot move
+        weights = []                              # amount of robot movements per robot move
+        angle = 0                                 # Cube_holder angle at the start is zero (home)
+        angle_ok = True                           # boolean to track the Cube_holder angle within range
+
+        for i in range(0, len(moves)-1, 2):       # iteration over the moves string, in steps of 2
+            op = ord(moves[i])                    # op code of the robot move
+            arg = int(moves[i+1])                 # argument of the robot move
+            ops.append(op)                        # op code is appended
+            args.append(arg)                      # argument is appended
+            if op == OP_F:                        # case of cube flip(s)
+                weights.append(arg)               # each flip is one robot movement
+            else:                                 # case of cube spin or layer rotation
+                angle += op_angle.get(arg, 0)     # Cube_holder angle is updated
+                weights.append(1)                 # spin and rotation are one robot movement
+                if not -90 <= angle <= 90:        # case the Cube_holder angle is out of range
+                    angle_ok = False              # angle_ok is set False
+            angles.append(angle)                  # Cube_holder angle after this robot move is appended
+
+        tot_moves = sum(weights)                  # total amount of robot movements
+        progress = []                             # solving percentage associated to each robot move
+        left_moves = tot_moves                    # initial remaining moves are all the moves
+        for w in weights:                         # iteration over the robot moves
+            left_moves -= w                       # remaining moves are decreased by the robot move weight
+            progress.append(int(100*(1-left_moves/tot_moves)))  # solving percentage after this robot move
+
+        self.ops = bytes(ops)                     # bytes are immutable
+        self.args = bytes(args)                   # bytes are immutable
+        self.angles = tuple(angles)               # tuple is immutable
+        self.angle_ok = angle_ok                  # Cube_holder angle check result
+        self.tot_moves = tot_moves                # total amount of robot movements
+        self.progress = tuple(progress)           # tuple is immutable
+        self._est_time = {}                       # cache for the time estimates, per servos timers
+        self._counts = {}                         # cache for the servos transitions counts, per flip to close steps
+        self._trace = {}                          # cache for the servos transitions sequence, per flip to close steps
+        return self
+
+
+
+
+    def estimate_time(self, timer, slow_time=0, flip_to_close_one_step=False, model=None):
+        """ Estimates the robot solving time, based on the servos timers (dict), or on the robot time model
+            when given (see load_time_model).
+            The estimate is cached, per timers values, slow_time, flip_to_close_one_step and model.
+            Estimated time is indicative when based on the servos sleep times."""
+
+        key = (tuple(sorted(timer.items())), slow_time, flip_to_close_one_step, id(model))  # cache key
+        if key not in self._est_time:             # case the estimate is not cached yet
+            self._est_time[key] = self._estimate_time(timer, slow_time, flip_to_close_one_step, model)
+        return self._est_time[key]                # cached estimate is returned
+
+
+
+
+    def _estimate_time(self, timer, slow_time, flip_to_close_one_step, model):
+        """ Sum of the servos transitions time costs."""
+
+        if model is not None:                      # case of time model, fitted on the real robot solving times
+            counts = self.time_counts(flip_to_close_one_step)   # servos transitions, as per time_features
+            tot_time = sum(c*model['costs'][f] for f, c in zip(time_features, counts) if c)
+            tot_time += slow_time*(sum(counts) - counts[-1])   # slow_time is added to each servos transition
+            return round(tot_time, 1)
+
+        # servos timers costs are added one transition at the time, in the robot moves order:
+        # a different summation order changes the float rounding, and so the estimate
+        costs = timer_costs(timer)                 # time cost per servos transition
+        tot_time = 0                               # counter for the total time
+        for f in self.time_trace(flip_to_close_one_step):   # iteration over the servos transitions
+            if f == 'flip_to_close2':              # case of flip to close in two steps (via read)
+                tot_time += 2*timer['t_flip_to_close_time']   # time for the servo to reach the read position
+                f = 'flip_to_close1'               # then as the flip to close in one step
+            tot_time += (costs[f] + slow_time)     # time for the servos transition
+
+        # time estimation is based on sleep time for servos movements, therefore it is not accurate
+        k = 1.08                                   # correction coefficient
+        return round(tot_time*k, 1)
+
+
+
+
+    def time_counts(self, flip_to_close_one_step=False):
+        """ Returns a tuple with the amount of each servos transition (as per time_features), cached."""
+
+        if flip_to_close_one_step not in self._counts: # case the counts are not cached yet
+            trace = self.time_trace(flip_to_close_one_step)   # servos transitions, in the robot moves order
+            counts = [trace.count(f) for f in time_features]  # amount of each servos transition
+            counts[-1] = 1                         # overhead: one robot solving sequence
+            self._counts[flip_to_close_one_step] = tuple(counts)   # counts are cached, as per time_features order
+        return self._counts[flip_to_close_one_step]
+
+
+
+
+    def time_trace(self, flip_to_close_one_step=False):
+        """ Returns a tuple with the servos transitions (time_features names) in the robot moves order, cached.
+            Single pass over the robot moves, tracking the top cover position."""
+
+        if flip_to_close_one_step in self._trace:  # case the transitions are cached
+            return self._trace[flip_to_close_one_step]
+
+        trace = []                                 # list of the servos transitions
+        ops = self.ops                             # op codes of the robot moves
+        n_ops = len(ops)                           # number of robot moves
+        t_top_cover = 'read'                       # variable to track the top cover/lifter position
+
+        if n_ops > 0:                              # case there are robot moves
+            if ops[0] == OP_S:                     # case the first move requires a cube spin
+                trace.append('to_open')            # top servo to reach the open top cover position
+                t_top_cover = 'open'               # variable to track the top cover/lifter position
+            elif ops[0] == OP_R:                   # case the first move requires a cube layer rotation
+                trace.append('close')              # top servo to reach the close position
+                t_top_cover = 'close'              # top cover position is initially set to close
+
+        for n, (op, arg) in enumerate(zip(ops, self.args)):   # iteration over the robot moves
+            if op == OP_F:                         # case there is a flip
+                for f in range(arg):               # iterates over the number of requested flips
+                    if t_top_cover == 'close':     # cover/lifter position variable set to close
+                        trace.append('lift_from_close') # top servo to reach the flipping position
+                    elif t_top_cover == 'open' or t_top_cover == 'read':  # cover/lifter at open or read positions
+                        trace.append('lift_from_open')  # top servo to reach the flipping position
+                    t_top_cover = 'flip'           # cover/lifter position variable set to flip
+
+                    if f < (arg-1):                # case there are further flippings to do
+                        trace.append('flip_to_read')   # top servo to reach the read position
+                        t_top_cover = 'read'       # variable to track the top cover/lifter position
+
+                    if f == (arg-1) and n+1 < n_ops:   # case it's the last flip and there is a following robot move
+                        if ops[n+1] == OP_R:       # case the next action is a 1st layer cube rotation
+                            if flip_to_close_one_step:   # case the flip to close is set to one step
+                                trace.append('flip_to_close1') # top servo to reach the close position
+                            else:                  # case the flip to close is set to two steps
+                                trace.append('flip_to_close2') # top servo to reach the close position, via read
+                            t_top_cover = 'close'  # cover/lifter position variable set to close
+                        elif ops[n+1] == OP_S:     # case the next action is a cube spin
+                            trace.append('to_open')   # top servo to reach the open position
+                            t_top_cover = 'open'   # variable to track the top cover/lifter position
+
+            elif op == OP_S:                       # case there is a cube spin
+                if t_top_cover != 'open':          # case the top cover is not in open position
+                    trace.append('open')           # top servo to reach the open position
+                if arg == 0 or arg == 4:           # case of 180deg spin
+                    trace.append('spin180')        # bottom servo to spin 180deg
+                else:                              # case of 90deg spin
+                    trace.append('spin')           # bottom servo to spin 90deg
+                t_top_cover = 'open'               # cover/lifter position variable set to open
+
+            elif op == OP_R:                       # case there is a cube 1st layer rotation
+                if t_top_cover != 'close':         # case the top cover is not in close position
+                    trace.append('close')          # top servo to reach the close position
+                if arg == 0 or arg == 4:           # case of 180deg rotation
+                    trace.append('rotate180')      # bottom servo to rotate 180deg
+                else:                              # case of 90deg rotation
+                    trace.append('rotate')         # bottom servo to rotate 90deg
+                t_top_cover = 'close'              # cover/lifter position variable set to close
+
+        self._trace[flip_to_close_one_step] = tuple(trace)   # transitions are cached
+        return self._trace[flip_to_close_one_step]
+
+
+
+
+def timer_costs(timer):
+    """ Returns a dict with the time cost of each servos transition (as per time_features), from the servos timers."""
+
+    return {'lift_from_close': timer['t_close_to_flip_time'],
+            'lift_from_open': timer['t_flip_open_time'],
+            'flip_to_read': timer['t_flip_open_time'],
+            'to_open': timer['t_flip_open_time'],
+            'flip_to_close1': timer['t_flip_to_close_time'] + timer['t_rel_time'],
+            'flip_to_close2': 3*timer['t_flip_to_close_time'] + timer['t_rel_time'],   # via read, with 3 timers
+            'open': timer['t_open_close_time'],
+            'close': timer['t_open_close_time'] + timer['t_rel_time'],
+            'spin': timer['b_spin_time'],
+            'spin180': 2.1*timer['b_spin_time'],
+            'rotate': timer['b_rotate_time'] + timer['b_rel_time'],
+            'rotate180': 2.1*timer['b_rotate_time'] + timer['b_rel_time'],
+            'overhead': 0}
+
+
+
+
+def load_time_model(fname=time_model_fname):
+    """ Returns the robot time model dict (fitted by Cubotino_T_time_calibration.py), or None when the file does not exist.
+        The model has the servos timers it has been fitted with ('timer'), and the time cost per servos transition ('costs').
+        Loaded models are cached, per file name."""
+
+    if fname not in _time_models:                  # case the model file has not been loaded yet
+        if not os.path.exists(fname):              # case the model file does not exist
+            return None
+        with open(fname, "r") as f:                # model file is opened in reading mode
+            model = json.load(f)                   # json file is parsed to a dict
+        if set(model['costs']) != set(time_features):   # case the model has different servos transitions
+            print(f'Robot time model {fname} does not match the servos transitions, not used')
+            return None
+        _time_models[fname] = model                # model is cached
+    return _time_models[fname]
+
+
+
+
+def time_model_for(timer, fname=time_model_fname):
+    """ Returns the robot time model when fitted with the same servos timers in argument, otherwise None.
+        A model fitted with different servos timers is not valid anymore, as the servos sleep times differ."""
+
+    model = load_time_model(fname)                 # robot time model, if any
+    if model is None or model['timer'] != timer:   # case of no model, or model fitted with other servos timers
+        return None
+    return model
+
+
+
+
+def robot_ops(moves):
+    """ Returns the RobotOps for the moves in argument; When moves is already a RobotOps it is returned as it is."""
+
+    if isinstance(moves, RobotOps):                # case moves has already been parsed
+        return moves                               # the parsed moves are returned
+    return RobotOps(moves)                         # moves string is parsed
+
+
+
+
+# robot movement sequences of the dicts are parsed once, at module import
+for moves_dict in (moves_dict_home, moves_dict_cw, moves_dict_ccw):
+    for key in moves_dict:
+        moves_dict[key] = RobotOps(moves_dict[key])
+
+
+
+
+
+
 def starting_cube_orientation(simulation=False):
     """ Cube orientation at the start, later updated after every cube movement on the robot
         Dict key is the the "stationary" side, while the dict value is the cube side
@@ -328,69 +605,53 @@ def optim_moves2(moves, informative):
         Under these conditions, the second-last flip (F3) can be changed (to F1)."""
     
     opt2 = 0                             # zero is assigned to opt2 (a counter for optimizaion type2 effectiveness)
-    str_length = len(moves)              # length of the robot move string
-    F_list = []                          # empty lit collecting all the Flips
-    F_count = 0                          # variable F_count (counter) is set to zero
-    for i in range(str_length-2,-2,-2):  # iteration over the moves string, from the end, in steps of 2
-        if moves[i] == 'F':              # case there is a F (flip) into the moves string
-            to_add = 'F' + moves[i+1]    # type of flip (cases are 'F1', 'F2'and 'F3')
-            F_list.append(to_add)        # F_list is populates with the related flip (cases are 'F1', 'F2'and 'F3')
-            F_count += 1                 # variable F_count (counter) is increased by one
-            if F_count == 2:             # case F_count (counter) equals 2
+    moves = robot_ops(moves)             # robot moves, parsed as RobotOps
+    ops, args = moves.ops, moves.args    # op codes and arguments of the robot moves
+    n_ops = len(ops)                     # number of robot moves
+    F_list = []                          # empty lit collecting the robot move index of the last two Flips
+    for n in range(n_ops-1, -1, -1):     # iteration over the robot moves, from the end
+        if ops[n] == OP_F:               # case there is a F (flip) into the robot moves
+            F_list.append(n)             # F_list is populated with the robot move index of the flip
+            if len(F_list) == 2:         # case the last two flips are found
                 break                    # for loop is interrupted
 
-    if F_count < 2:                      # case there are less than two Flip cases in moves string
+    if len(F_list) < 2:                  # case there are less than two Flip cases in moves string
         return moves, opt2               # moves in argument are returned
     
-    else:                                # case there are at least two Flip cases in moves
-        if not (F_list[-1] == 'F3' and F_list[-2] == 'F2'):  # case second-last flip is not 'F3' and last flip is not 'F2'
-            # the first condition to remove 2 flips is not met
+    F2_n, F3_n = F_list                  # robot move index of the last (F2) and second-last (F3) flips
+    if not (args[F3_n] == 3 and args[F2_n] == 2):  # case second-last flip is not 'F3' and last flip is not 'F2'
+        # the first condition to remove 2 flips is not met
+        return moves, opt2               # moves in argument are returned
+    
+    # the first condition to remove 2 flips is met
+    k = F2_n - F3_n - 1                  # robot moves quantity in betwween F3 and F2
+    k2 = n_ops - F2_n - 1                # robot moves quantity after F2
+    if k != k2:                          # case the robot moves between F3 and F2 differ from those after F2
+        if OP_R in ops[F2_n+k+1:]:       # case the moves after F2 have an extra Rotation not present after F3
+            # the second condition to remove 2 flips is not met
             return moves, opt2           # moves in argument are returned
-        
-        else:                                # case the second-last flip is 'F3' and last flip is 'F2'
-            # the first condition to remove 2 flips is met
-            for i in range(str_length-2,-2,-2):  # iteration over the moves string, from the end,  in steps of 2
-                if moves[i:i+2] == 'F2':     # case the moves string has 'F2' (by iterating from the string end...)
-                    F2_idx = i               # moves string index for F (of the F2) character
-                elif moves[i:i+2] == 'F3':   # case the moves string has 'F3' (by iterating from the string end...)
-                    F3_idx = i               # moves string index for F (of the F3) character
-                    break                    # for loop is interrupted
-        
-            chrs = F2_idx-F3_idx -2          # moves characters quantity in betwween F3 and F2
-            chrs2 = str_length - F2_idx -2   # moves characters quantity after F2
-            if chrs != chrs2:                # case the moves characters between F3 and F2 differ from those after F2
-                if 'R' in moves[F2_idx+chrs+2:]:   # case the moves after F2 have an extra Rotation not present after F3
-                    # the second condition to remove 2 flips is not met
-#                     print("Robot moves string: not optimization type 2 needed")
-                    return moves, opt2       # moves in argument are returned
-            
-            move1 = moves[F3_idx+2: F3_idx+chrs+2]  # moves after thr F3
-            move2 = moves[F2_idx+2: F2_idx+chrs+2]  # moves after the F2
-            if move1 != move2 :              # case moves in between F3 and F2 differ from those after F2
-                if 'R0' in move1 and move2 == 'R4': # case there is a R0 after F3 and moves after F2 is R4
-                    pass                     # do nothing (just prevent the else case)
-                elif 'R4' in move1 and move2 == 'R0':  # case there is a R4 after F3 and moves after F2 is R0
-                    pass                     # do nothing (just prevent the else case)
-                else:                        # case move1 and move2 differ, and not falling into previous if cases
-                    # the second condition to remove 2 flips is not met
-#                     print("Robot moves string: not optimization type 2 needed")
-                    return moves, opt2       # moves in argument are returned
-            
-            
-            # what follow implies the second condition to remove 2 flips is also met
-            new_moves=''                 # new_moves empty string to be populated with the new moves
-            for i in range(str_length):  # iteration over the moves string
-                if i == F3_idx+1:        # moves index where to apply the change, from 3 (F3) to 1 (F1)
-                    new_moves += '1'     # character 1 is added to the new_moves string
-                else:                    # moves index to keep the original moves
-                    new_moves += moves[i]  # original moves charactes are appended to new_moves string
-            
-            if informative:
-                print("Robot moves string: applied optimization type 2")
-#                     print("new_moves at opt2: ", new_moves)
-#                     print("len new_moves at opt2:", len(new_moves))
-            opt2 = 1                     # opt2 is increased to 1
-            return new_moves, opt2       # the new string of robot moves is returned
+    
+    move1 = (ops[F3_n+1: F3_n+k+1], args[F3_n+1: F3_n+k+1])  # moves after the F3
+    move2 = (ops[F2_n+1: F2_n+k+1], args[F2_n+1: F2_n+k+1])  # moves after the F2
+    if move1 != move2 :                  # case moves in between F3 and F2 differ from those after F2
+        R0_in_move1 = any(op == OP_R and arg == 0 for op, arg in zip(*move1))  # case there is a R0 after F3
+        R4_in_move1 = any(op == OP_R and arg == 4 for op, arg in zip(*move1))  # case there is a R4 after F3
+        if R0_in_move1 and move2 == (bytes((OP_R,)), bytes((4,))):    # moves after F2 is R4
+            pass                         # do nothing (just prevent the else case)
+        elif R4_in_move1 and move2 == (bytes((OP_R,)), bytes((0,))):  # moves after F2 is R0
+            pass                         # do nothing (just prevent the else case)
+        else:                            # case move1 and move2 differ, and not falling into previous if cases
+            # the second condition to remove 2 flips is not met
+            return moves, opt2           # moves in argument are returned
+    
+    # what follow implies the second condition to remove 2 flips is also met
+    idx = 2*F3_n + 1                     # moves string index where to apply the change, from 3 (F3) to 1 (F1)
+    new_moves = robot_ops(moves[:idx] + '1' + moves[idx+1:])  # new robot moves
+    
+    if informative:
+        print("Robot moves string: applied optimization type 2")
+    opt2 = 1                             # opt2 is increased to 1
+    return new_moves, opt2               # the new string of robot moves is returned
 
 
 
@@ -400,19 +661,7 @@ def optim_moves2(moves, informative):
 def count_moves(moves):
     """Counts the total amount of robot movements."""
 
-    robot_tot_moves = 0               # counter for all the robot movements
-    for i in range(len(moves)):       # iterates over the string of robot movements
-        if moves[i] == 'F':           # case there is a cube flip on robot movements
-            flips=int(moves[i+1])     # retrieves how many flips
-            robot_tot_moves+=flips    # increases the total amount of robot movements
-
-        elif moves[i] == 'R':         # case there is a layer rotation on robot movements
-            robot_tot_moves+=1        # increases by 1 (cannot be more) the total amount of robot movements
-        
-        elif moves[i] == 'S':         # case there is a cube spin on robot movements
-            robot_tot_moves+=1        # increases by 1 (cannot be more) the total amount of robot movements
-    
-    return robot_tot_moves            # total amount of robot moves is returned
+    return robot_ops(moves).tot_moves    # total amount of robot moves is returned
 
 
 
@@ -423,18 +672,9 @@ def get_new_cube_angle(initial_angle, sequence):
     """Function monitoring the Cube_holder angle.
     Expected angle is between -90 and +90."""
 
-    str_length=len(sequence)             # length of the robot move string
     new_angle = initial_angle
-    for i in range(0,str_length,2):      # for loop of with steps = 2
-        if sequence[i] == 'S' or sequence[i] == 'R':
-            if sequence[i+1] == '0':     # CW 180 deg spin
-                new_angle += 180
-            elif sequence[i+1] == '1':   # CW 90 deg spin
-                new_angle += 90
-            elif sequence[i+1] == '3':   # CCW 90 deg spin
-                new_angle -= 90
-            elif sequence[i+1] == '4':   # CCW 180 deg spin
-                new_angle -= 180
+    for angle in robot_ops(sequence).angles:   # Cube_holder angle variation after each robot move of the sequence
+        new_angle = initial_angle + angle
         if not -90 <= new_angle <= 90:   # Check angle is coherent
             print("Angle error: %d" % new_angle)
 
@@ -445,10 +685,11 @@ def get_new_cube_angle(initial_angle, sequence):
 
 
 
-def robot_required_moves(solution, solution_Text, simulation, informative=False):
+def robot_required_moves(solution, solution_Text, simulation, informative=False, optimize=True):
     """ This function splits the cube manouvre from Kociemba solver string, and generates a dict with all the robot movements.
         Based on the dict with all the robot moves, a string with all the movements is generated.
-        The string with the robot movements might differ from the dict, when optimizing is possible."""
+        The string with the robot movements might differ from the dict, when optimizing is possible.
+        When optimize is set False the optimizations are not applied (used to measure their effectiveness)."""
     
     global h_faces,v_faces
     
@@ -492,13 +733,15 @@ def robot_required_moves(solution, solution_Text, simulation, informative=False)
         # optimization type1 is not anymore useful with the 180deg rotations (since 1st April 2024)
         # moves, opt1 = optim_moves1(moves, informative)  # removes eventual unnecessary moves (that would cancel each other out)
         
-        moves, opt2 = optim_moves2(moves, informative)  # removes eventual unnecessary flips
+        moves = robot_ops(moves)                  # robot moves string is parsed once, to be used by the other modules
+        if optimize:                              # case the optimizations are requested (default)
+            moves, opt2 = optim_moves2(moves, informative)  # removes eventual unnecessary flips
         opt = (opt1, opt2)                        # tuple with the optimizations type1 and type2
-        robot_tot_moves = count_moves(moves)      # counter for the total amount of robot movements
+        robot_tot_moves = moves.tot_moves         # counter for the total amount of robot movements
 
     # info:
     # "robot" variable (dict type) has all the robot movements prio the optimization analysis
-    # "moves" variable (string typ) likely differs from the dict content due to optimized moves
+    # "moves" variable (RobotOps, a parsed string type) likely differs from the dict content due to optimized moves
     # "opt" tuple indicates if the optimezers (and positonally which one) could reduce the robot moves
     return robot, moves, robot_tot_moves, opt  # returns a dict with all the robot moves, string with all the moves and total robot movements
 
@@ -507,6 +750,18 @@ def robot_required_moves(solution, solution_Text, simulation, informative=False)
 
 
 
+# example solutions of the __main__ block, also used by the curated corpus (Cubotino_T_corpus.py)
+example_solutions = ('U2 L1 R1 D2 B2 R1 D2 B2 D2 L3 B3 R3 F2 D3 L1 U2 F2 D3 B3 D1',  # allows type 1 optimization
+                     'U2 D2 R2 L2 F2 B2',                                            # allows type 2 optimization
+                     'R2 L1 D3 F2 L2 B1 L1 U3 R1 F1 L2 D3 F2 D1 F2 B2 D2',          # allows type 1 optimization
+                     'L1 D2 L1 D2 R2 F2 D2 R1 F3 R1 U1 R2 B3 L3 D1 R1 D2 B2 F3',    # only 1st criteria for type2 optimization
+                     'F3 U1 D2 R2 L2 U2 D2 R1 L2')                                   # only 1st criteria for type2 optimization
+
+
+
+
+
+
 if __name__ == "__main__":
     """ This function convert the cube solution string 'U2 L1 R1 D2 B2 R1 D2 B2 D2 L3 B3 R3 F2 D3 L1 U2 F2 D3 B3 D1' in robot moves
         Robot moves are printed on the REPL
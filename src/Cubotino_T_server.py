@@ -39,15 +39,28 @@ version = '7.4 (31 May 2024)'
 
 ################  setting argparser for robot remote usage, and other settings  #################
 import argparse
-import threading
 import asyncio 
+import json
+from typing import Optional
 #from mqtt_publisher import send_solution, send_command, send_image,send_face_image
-from fastapi import FastAPI
+from http import HTTPStatus
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from mqtt_publisher_class import mqtt_publisher
+from mqtt_publisher import mqtt_publisher
+from face_image_publisher import face_images
+from robot_events import robot_events
+from robot_jobs import JobQueue
 app = FastAPI()
 robot_api_status = "idle"
-status_lock = threading.Lock()
+mqtt_publisher.add_listener(robot_events.on_message)   # the published messages update the robot events state
+
+
+def set_api_status(status, **changes):
+    """ Sets the API status, and pushes it (with the other state changes) to the status and events clients."""
+    global robot_api_status
+    robot_api_status = status
+    robot_events.update(status=status, **changes)
 
 # argument parser object creation
 parser = argparse.ArgumentParser(description='CLI arguments for Cubotino_T.py')
@@ -188,7 +201,7 @@ def import_libraries():
         These librries are imported after those needed for the display management.
         Kociemba solver is tentatively imported considering three installation/copy methods."""
     
-    global servo, rm, Popen, PIPE, camera, GPIO, median, dt, sv, cubie
+    global servo, rm, sim, Popen, PIPE, camera, GPIO, median, dt, sv, cubie
     global np, math, time, cv2, os, pathlib
 
     
@@ -196,6 +209,7 @@ def import_libraries():
     from Cubotino_T_settings_manager import settings as settings   # custom library managing the settings from<>to the settings files
     import Cubotino_T_servos as servo                     # custom library controlling Cubotino servos and led module
     import Cubotino_T_moves as rm                         # custom library, traslates the cuber solution string in robot movements string
+    import Cubotino_T_cube_sim as sim                     # custom library, virtual cube manipulated by the robot movements
 
     # import non-custom libraries
     from statistics import median                         # median is used as sanity check while evaluating facelets contours
@@ -2659,7 +2673,7 @@ def decoration(deco_info):
     if debug:                                            # case debug variable is set True
         print('Unfolded cube status image is saved : ', fname) # feedback is printed to the terminal
     status=cv2.imwrite(fname, collage)                   # cube sketch with detected and interpred colors is saved as image
-    mqtt_publisher.send_image(fname)
+    mqtt_publisher.send_image(fname, collage.shape[1], collage.shape[0])   # collage is published, as binary image
     
     if screen and not robot_stop:                        # case screen variable is set True
         cv2.namedWindow('cube_collage')                  # create the collage window
@@ -3265,6 +3279,14 @@ def robot_solve_cube(fixWindPos, screen, frame, faces, cube_status, cube_color_s
         log_data(timestamp, facelets_data, cube_status_string, solution, color_detection_winner, tot_robot_time, \
                  start_time, camera_ready_time, cube_detect_time, cube_solution_time, robot_solving_time, os_version)
         
+        # cycle summary is published, for the backend cycles store (phase times in secs)
+        phases = {'camera': camera_ready_time-start_time,         # time to get the camera gains stable
+                  'detection': cube_detect_time-camera_ready_time,  # time to read the 6 cube faces
+                  'solver': cube_solution_time-cube_detect_time,    # time to get the cube solution from the solver
+                  'robot': robot_solving_time,                      # time to manoeuvre the cube to solve it
+                  'total': tot_robot_time}                          # total time from camera warmup to cube solved
+        mqtt_publisher.send_cycle(None if solution_Text == 'Error' else color_detection_winner, phases, solved)
+        
         
     else:                          # case there is a request to stop the robot
         tot_time_sec = 0           # robot solution time is forced to zero when the solving is interrupted by the stop button
@@ -3745,6 +3767,7 @@ def start_scrambling(scramb_cycle):
     if not robot_stop:          # case the robot has not been stopped
         print(f'\n######################    END  SCRAMBLING CYCLE  {scramb_cycle}   ########################')
         mqtt_publisher.send_status("Scramble finished")
+        result = 'Cube_scrambled'   # cycle result, returned to the jobs queue
     
     elif robot_stop:            # case the robot has been stopped
         stop_or_quit()          # check if the intention is to stop the cycle or quit (shut Rpi off)
@@ -3752,8 +3775,10 @@ def start_scrambling(scramb_cycle):
         robot_stop = False      # flag used to stop or allow robot movements
         robot_idle = True       # robot is idling
         print(f'\n####################    STOPPED  SCRAMBLING CYCLE  {scramb_cycle}   ######################')
+        result = 'Robot_stopped'    # cycle result, returned to the jobs queue
 
-    robot_api_status = "idle" 
+    set_api_status("idle", phase="idle", side=None)
+    return result
    
 
 
@@ -3780,17 +3805,23 @@ def start_solving(solv_cycle):
     if robot_stop:              # case the robot has been stopped 
         stop_or_quit()          # check if the intention is to stop the cycle or quit (shut Rpi off)
         print('#'*23, '  STOPPED  SOLVING CYCLE  ', str(solv_cycle).zfill(2), '  ', '#'*23)       
+        result = 'Robot_stopped'    # cycle result, returned to the jobs queue
 
     elif timeout:               # case the cube status detection has reached the timeout
         print('#'*23, '  DETECTION TIMEOUT CYCLE ', str(solv_cycle).zfill(2), '  ', '#'*23)       
+        robot_events.update(error='Cube status detection timeout')
+        mqtt_publisher.send_status("Timeout")  # the cycle ends by timeout
+        result = 'Detection_timeout'   # cycle result, returned to the jobs queue
 
     elif not (robot_stop or timeout): # case the robot has not been stopped, or it has reach the timeout
         disp.set_backlight(1)   # display backlight is turned on, in case it wasn't
         cpu_temp(side, delay=2) # cpu temperature is verified, printed at terminal and show at display for delay time
         print('#'*23, '    END  SOLVING CYCLE  ', str(solv_cycle).zfill(2), '    ', '#'*23)
         mqtt_publisher.send_status("Idle")
-    robot_api_status = "idle"
+        result = 'Cube_solved'      # cycle result, returned to the jobs queue
+    set_api_status("idle", phase="idle", side=None)
     start_up(first_cycle = False)  # sets the initial variables, to use the camera in manual mode
+    return result
     
 
 
@@ -4279,49 +4310,6 @@ def tune_image_setup(expo_shift, display, gui_debug):
 
 
 
-def cube_facelets_permutation(cube_status, move_type, direction):
-    """Function that updates the cube status, according to the move type the robot does
-       The 'ref' tuples provide the facelet current reference position to be used on the updated position.
-       As example, in case of flip, the resulting facelet 0 is the one currently in position 53 (ref[0])."""
-    
-    if move_type == 'F':         # case the robot move is a cube flip (complete cube rotation around L-R horizontal axis) 
-        ref=(53,52,51,50,49,48,47,46,45,11,14,17,10,13,16,9,12,15,0,1,2,3,4,5,6,7,8,\
-             18,19,20,21,22,23,24,25,26,42,39,36,43,40,37,44,41,38,35,34,33,32,31,30,29,28,27)
-    
-    elif move_type == 'S':       # case the robot move is a spin (complete cube rotation around vertical axis)
-        if direction == '0' or direction == '4':     # case spin is 180deg
-            ref=(8,7,6,5,4,3,2,1,0,36,37,38,39,40,41,42,43,44,45,46,47,48,49,50,51,52,53,\
-                 35,34,33,32,31,30,29,28,27,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26)
-        elif direction == '1':   # case spin is CW
-            ref=(2,5,8,1,4,7,0,3,6,18,19,20,21,22,23,24,25,26,36,37,38,39,40,41,42,43,44,\
-                 33,30,27,34,31,28,35,32,29,45,46,47,48,49,50,51,52,53,9,10,11,12,13,14,15,16,17)
-        elif direction == '3':   # case spin is CCW
-            ref=(6,3,0,7,4,1,8,5,2,45,46,47,48,49,50,51,52,53,9,10,11,12,13,14,15,16,17,\
-                 29,32,35,28,31,34,27,30,33,18,19,20,21,22,23,24,25,26,36,37,38,39,40,41,42,43,44)
-   
-    elif move_type == 'R':       # case the robot move is a rotation (lowest layer rotation versus mid and top ones) 
-        if direction == '0' or direction == '4':     # case 1st layer rotation is 180deg
-            ref=(0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,42,43,44,18,19,20,21,22,23,51,52,53,\
-                 35,34,33,32,31,30,29,28,27,36,37,38,39,40,41,15,16,17,45,46,47,48,49,50,24,25,26)
-        elif direction == '1':   # case 1st layer rotation is CW
-            ref=(0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,24,25,26,18,19,20,21,22,23,42,43,44,\
-                 33,30,27,34,31,28,35,32,29,36,37,38,39,40,41,51,52,53,45,46,47,48,49,50,15,16,17)
-        elif direction == '3':   # case 1st layer rotation is CCW
-            ref=(0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,51,52,53,18,19,20,21,22,23,15,16,17,\
-                 29,32,35,28,31,34,27,30,33,36,37,38,39,40,41,24,25,26,45,46,47,48,49,50,42,43,44)
-    
-    new_status = ""              # empty string to generate the cube status, updated according to move_type and direction
-    for i in range(54):          # iteration over the 54 facelets
-        new_status+=str(cube_status[ref[i]])  # updated cube status takes the facelet from previous status at ref location
-    
-    return new_status            # updated cube status is returneddef cube_facelets_permutation(cube_status, move_type, direction):
-
-
-
-
-
-
-
 def plot_animation(wait, colors_a, cube_status, startup=False, kill=False):
     """ Based on the detected cube status, a sketch of the cube is plot with bright colors on the pictures collage."""
 
@@ -4378,29 +4366,11 @@ def animation(screen, colors_a, cube_status_string, robot_moves):
     """Plots to screen the facelets animation on a cube sketch.
         Detected colors are used to identify the different facelets."""
 
-    cube_status_a = cube_status_string              # cube_status_string is assigned to a local and shorter variable
-    
     # changing the URF oriented cube status to the cube orientation after the scanning 
-    cube_status_a = cube_facelets_permutation(cube_status_a, 'S', '3')  # facelets permutation assigned to updated cube_status_a
-    cube_status_a = cube_facelets_permutation(cube_status_a, 'F', '1')  # facelets permutation assigned to updated cube_status_a
-    
-    idx = 1                                         # idx variale used for the dict key
-    csa = {}                                        # dict to store the cube status from the start until solution
-    csa[0] = cube_status_a                          # first csa value is the cube status after scanning
-    for i in range(0, len(robot_moves),2):          # iteration over the "in-between" robot movements
-        move_type = robot_moves[i:i+1]              # robot move type is retrieved from robot_moves string
-        direction = robot_moves[i+1:i+2]            # robot move direction/repeats is retrieved from robot_moves string
-        if move_type == 'F':                        # case the robot move is F (flip)
-            for k in range(int(direction)):         # iteration over the quantity of flips
-                # facelets permutation assigned to pdated cube_status_a
-                cube_status_a = cube_facelets_permutation(cube_status_a, move_type, direction)
-                csa[idx] = cube_status_a            # csa gets cube_status_a as new value for the idx index
-                idx+=1                              # idx index is incremented
-        else:                                       # case the robot move is not F (not flip means spin or rotate)
-            # facelets permutation assigned to pdated cube_status_a
-            cube_status_a = cube_facelets_permutation(cube_status_a, move_type, direction)
-            csa[idx] = cube_status_a                # csa gets cube_status_a as new value for the idx index
-            idx+=1                                  # idx index is incremented
+    cube_status_a = sim.apply(cube_status_string, sim.urf_to_scan)  # facelets permutation assigned to cube_status_a
+    
+    # dict to store the cube status from the start until solution, one frame per robot movement
+    csa = dict(enumerate(sim.frames(cube_status_a, robot_moves)))
         
     frames = len(csa)                               # len(csa) defines the frames quantity
     
@@ -4650,10 +4620,11 @@ def cubeAF():
             break                                   # while loop is interrupted
         
         plot_to_display(side)                       # feedback is printed to the display
+        robot_events.update(phase='scanning', side=side)   # side being scanned is pushed to the events clients (on change)
         frame, w, h = read_camera()                 # video stream and frame dimensions
 
-        _, buffer = cv2.imencode('.jpg', frame)
-        mqtt_publisher.send_face_image(side,buffer)
+        clean_frame = frame.copy()                  # copy of the frame, before contours and facelets are drawn on it
+        face_images.offer(side, clean_frame)        # latest clean frame is handed to the face images publisher (thumbnail)
 
         if screen:                                  # case screen variable is set True
             cv2.namedWindow('cube')                 # create the cube window
@@ -4748,6 +4719,7 @@ def cubeAF():
                     URFDLB_facelets_BGR_mean = URFDLB_facelets_order(BGR_mean)  # faces and facelets are ordered as per URFDLB order
                     plot_to_display(side, URFDLB_facelets_BGR_mean)    # detected colour are plot to the display
                     faces = face_image(frame, facelets, side, faces)   # image of the cube side is taken for later reference
+                    face_images.accept(side, clean_frame)        # detected side clean image is published at full resolution
                     
                     
                     # when cv_wow is set True
@@ -4871,53 +4843,148 @@ def cubeAF():
         quit_func(quit_script=False)                 # quit function is called, withou forcing the script quitting
         return                                       # cubeAF function is terminated
 
+def run_job(job):
+    """ Runs a robot job (robot_jobs worker thread); returns the job result."""
+    try:
+        if job['kind'] == 'scramble':
+            set_api_status("scrambling", side=None, progress=0, solution=None, error=None, job=job['id'])
+            return start_scrambling(job['cycle'])
+        set_api_status("solving", side=None, progress=0, solution=None, error=None, job=job['id'])
+        return start_solving(job['cycle'])
+    except Exception as e:
+        set_api_status("idle", phase="idle", side=None, error=str(e))
+        raise
+
+def jobs_changed(stats):
+    """ Queue changes are pushed to the status and events clients.
+        A stopped job is over once the queue has recorded it: the stopping status is then set back to idle."""
+    if stats["running_job"] is None and robot_api_status == "stopping":   # case the stopped job has been recorded
+        set_api_status("idle", phase="idle", side=None, **stats)
+    else:
+        robot_events.update(**stats)
+
+robot_jobs = JobQueue(run_job, lambda job_id: cancel_job(job_id), listener=jobs_changed)   # robot jobs, run one at a time
+
 class ScrambleRequest(BaseModel):
     scramb_cycle: int = 1
+    priority: int = 0
 
 @app.post("/scramble")
-async def scramble_cube(req: ScrambleRequest):  # Make the route async
-    global robot_api_status
-    scramb_cycle = req.scramb_cycle
-    with status_lock:
-        if robot_api_status != "idle":
-            raise HTTPException(
-                status_code=HTTPStatus.CONFLICT,
-                detail=f"Robot is currently {robot_status}. Please wait until idle.",
-            )
-        robot_api_status = "scrambling" 
-        # Run the synchronous start_scrambling in a separate thread
-        #try: 
-        asyncio.create_task(asyncio.to_thread(start_scrambling, scramb_cycle))
-        #finally:
-        #    robot_api_status = "idle" 
-        return {"status": "success", "message": "Scramble Initiated."}
+async def scramble_cube(req: ScrambleRequest):
+    """ Queues a scrambling cycle; it runs as soon as the robot is free."""
+    job = robot_jobs.submit("scramble", req.scramb_cycle, req.priority)
+    return {"status": "success", "message": "Scramble queued.", "job": job}
 
 class SolveRequest(BaseModel):
     solv_cycle: int = 1
+    priority: int = 0
 
 @app.post("/solve")
-async def solve_cube(req: SolveRequest):  # Make the route async
-    global robot_api_status
-    solv_cycle = req.solv_cycle
-    with status_lock:
-        if robot_api_status != "idle":
-            raise HTTPException(
-                status_code=HTTPStatus.CONFLICT,
-                detail=f"Robot is currently {robot_status}. Please wait until idle.",
-            )
-        # Run the synchronous start_solving in a separate thread
-        robot_api_status = "solving" 
-        #try:
-        asyncio.create_task(asyncio.to_thread(start_solving, solv_cycle))
-        #finally:
-        #  robot_api_status = "idle"
-        #start_up(first_cycle = False)  # sets the initial variables, to use the camera in manual mode
-        return {"status": "success", "message": "Solve initiated."}
+async def solve_cube(req: SolveRequest):
+    """ Queues a solving cycle; it runs as soon as the robot is free."""
+    job = robot_jobs.submit("solve", req.solv_cycle, req.priority)
+    return {"status": "success", "message": "Solve queued.", "job": job}
+
+class BatchRequest(BaseModel):
+    cycles: int = 1
+    start_cycle: int = 1
+    priority: int = 0
+
+@app.post("/jobs/batch")
+async def queue_batch(req: BatchRequest):
+    """ Queues N scramble + solve cycles, in order."""
+    if not 1 <= req.cycles <= 1000:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="cycles must be from 1 to 1000")
+    cycles = range(req.start_cycle, req.start_cycle + req.cycles)
+    jobs = robot_jobs.submit_batch([(kind, cycle) for cycle in cycles for kind in ("scramble", "solve")], req.priority)
+    return {"status": "success", "message": f"{len(jobs)} jobs queued.", "jobs": jobs}
+
+@app.get("/jobs")
+async def list_jobs():
+    """ Running, queued (in run order) and finished jobs."""
+    return robot_jobs.list()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int):
+    job = robot_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Job {job_id} not found")
+    return job
+
+@app.delete("/jobs/{job_id}")
+async def cancel_queued_job(job_id: int):
+    """ Cancels a queued job, or stops the running one."""
+    job = await asyncio.to_thread(robot_jobs.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Job {job_id} not found")
+    return job
+
+@app.delete("/jobs")
+async def cancel_queued_jobs():
+    """ Cancels all the queued jobs (the running one is left running)."""
+    return {"status": "success", "cancelled": robot_jobs.cancel_queued()}
 
 @app.get("/status")
-async def get_status():  # Make the status route async as well
-    global robot_api_status
-    return {"status": robot_api_status}
+async def get_status(wait_for_change: Optional[int] = None, timeout: float = 30):
+    """ Robot state, with its version. With wait_for_change=<version>, the response is held until the state
+        version differs from it (long-poll), or until timeout secs (max 60) with the unchanged state."""
+    if wait_for_change is None:
+        return robot_events.snapshot()
+    return await robot_events.wait(wait_for_change, min(timeout, 60))
+
+@app.get("/events")
+async def get_events(request: Request, keepalive: float = 15):
+    """ Server-Sent Events stream of the robot state transitions (event "state", id is the state version).
+        The current state is sent first (or the states after the Last-Event-ID, on reconnection)."""
+    last_id = request.headers.get("last-event-id")
+    version = int(last_id) if last_id and last_id.isdigit() else -1
+
+    async def stream():
+        nonlocal version
+        while not await request.is_disconnected():
+            states = robot_events.since(version) if version >= 0 else None
+            if states is None:                   # first event, or transitions no longer in the history
+                states = [robot_events.snapshot()]
+            if not states:                       # case no transitions since version
+                await robot_events.wait(version, keepalive)
+                if robot_events.version == version:
+                    yield ": keepalive\n\n"
+                continue
+            for state in states:
+                yield f"id: {state['version']}\nevent: state\ndata: {json.dumps(state)}\n\n"
+            version = states[-1]["version"]
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def cancel_job(job_id):
+    """ Stops the running job job_id (solving or scrambling cycle), as the stop button does; returns True when stopped.
+        The jobs queue lock is held, therefore the job cannot end (and the next one start) meanwhile;
+        The servos timers wait on the stop event, therefore the servos sequence is interrupted immediately;
+        The job thread then ends the cycle, and sets the API status back to idle."""
+    global robot_stop
+    with robot_jobs.cond:                            # jobs queue lock (reentrant)
+        if robot_jobs.running is None or robot_jobs.running["id"] != job_id:  # case the job is no longer running
+            return False
+        if robot_stop:                               # case the robot is already stopping
+            return False
+        robot_stop = True                            # global flag to immediatly interrup the robot movements is set
+        set_api_status("stopping")                   # API status, set back to idle once the queue records the job end
+        if not silent:                               # case silent variable is set False
+            servo.stopping_servos(print_out=debug)   # servos sequence is woken up and stopped
+        mqtt_publisher.send_status("Stopping")
+        quit_func(quit_script=False)                 # quit function is called, without forcing the script quitting
+        return True
+
+@app.post("/stop")
+async def stop_job():
+    """ Stops the running job, if any (the queued jobs are left queued)."""
+    running = robot_jobs.stats()["running_job"]
+    if running is None:
+        return {"status": "idle", "message": "No job to stop."}
+    job = await asyncio.to_thread(robot_jobs.cancel, running)
+    if job is None or not job.get("stopping"):   # case the job ended before being stopped
+        return {"status": "idle", "message": "Job already ended.", "job": running}
+    return {"status": "stopping", "message": "Stop requested.", "job": running}
 
 @app.post("/scramble_old")
 async def scramble_cube_old(scramb_cycle: int = 1): #added a default scramble cycle
@@ -5231,5 +5298,6 @@ if __name__ == "__main__":
         
     
     # this is essentially the main loop
+    robot_jobs.start()                      # robot jobs worker thread is started
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -32,12 +32,22 @@
 
 ##################    imports standard libraries   #################################
 import time                            # import time library
-import RPi.GPIO as GPIO                # import RPi GPIO library
-GPIO.setmode(GPIO.BCM)                 # setting GPIO pins as "Broadcom SOC channel" number, these are the numbers after "GPIO"
-GPIO.setwarnings(False)                # setting GPIO to don't return allarms
-from gpiozero import Servo, PWMLED     # import modules for the PWM part
+import threading                       # threading library, for the stop event
+import functools                       # functools library, for the stoppable decorator
 # ##################################################################################
-from mqtt_publisher_class import mqtt_publisher
+from mqtt_publisher import mqtt_publisher, move_telemetry
+import Cubotino_T_moves as rm          # custom library, with the parsed robot moves (RobotOps)
+import Cubotino_T_servos_backend as sb # custom library, with the real and the simulated servos/GPIO backends
+
+
+
+##################    servos/GPIO backend and clock   ##############################
+try:                                   # tentative
+    backend = sb.GpioBackend()         # real servos/GPIO backend (RPi.GPIO and gpiozero)
+except ImportError:                    # case the GPIO libraries are not available (i.e. on a PC)
+    backend = None                     # a simulated backend has to be set via set_backend()
+clock = backend.clock if backend is not None else sb.Clock()   # clock used by the servos timers (virtual clock when simulated)
+stop_event = threading.Event()         # stop event: It wakes up the servos timers waiting, when set by stopping_servos()
 
 
 
@@ -55,26 +65,84 @@ stop_servos=True                # boolean to stop the servos during solving proc
 b_servo_operable=False          # variable to block/allow bottom servo operation
 fun_status=False                # boolean to track the robot fun status, it is True after solving the cube :-)
 s_debug=False                   # boolean to print out info when debugging
+directions = {4:'CCW2', 3:'CCW', 0:'CW2', 1:'CW'}  # spin/rotation direction label, per robot move argument
 flip_to_close_one_step = False  # f_to_close steps (steps from flip up to close) is set false (=2 steps)
+# predefined robot movements, used to test the servos settings (test_set_of_movements and Cubotino_T_servos_tuner.py)
+test_moves = 'F1R1S3R1F3S3R1F1S4R0F3S4R0S3F1S3R0S3F3R1F1S4R0F1S3R1F3S4R0F1S4R0S3F1R3F1S1R3S1F1R3F2S1R3S1F1R3S1F1R3S1F3R3F3R1F2R1S3R1F1S3R1F2S4R0'
 led_init_status = False
+servos_settings = {}            # servos settings in use, as loaded by load_servos_parameters
+_stoppable_depth = 0            # nesting level of the movement functions being executed (stoppable decorator)
 # ##################################################################################
 
 
 
 
 
-def init_top_cover_led():
-    global factory
-    from gpiozero.pins.pigpio import PiGPIOFactory    # pigpio library is used, to use hardare timers on PWM (to avoid servo jitter)
-    factory = PiGPIOFactory()                         # pin factory setting to use hardware timers, to avoid servo jitter
+def set_backend(new_backend):
+    """ Sets the servos/GPIO backend (Cubotino_T_servos_backend.GpioBackend or SimBackend), and its clock.
+        With the SimBackend the servos timers advance a virtual clock, instead of sleeping.
+        The servos and led objects are re-created by init_servo."""
+    
+    global backend, clock, robot_init_status, led_init_status
+    
+    backend = new_backend              # servos/GPIO backend
+    clock = new_backend.clock          # clock used by the servos timers (it has the cancellable wait)
+    robot_init_status = False          # servos have to be created on the new backend
+    led_init_status = False            # led has to be created on the new backend
+    return backend
+
+
+
+
+
+class ServosStopped(Exception):
+    """ Raised by wait() when a stop is requested while a servo timer is running."""
+
+
+
+
+
+def wait(secs):
+    """ Cancellable wait, used by all the servos timers: Waits secs seconds on the stop event.
+        A stop request (stopping_servos) wakes it up immediately, and ServosStopped is raised."""
+    
+    if clock.wait(secs, stop_event):   # case the stop event is set before, or while, waiting
+        raise ServosStopped            # servos sequence is interrupted
+
+
+
+
+
+
+
+def stoppable(func):
+    """ Decorator for the servos movement functions: When a servo timer is interrupted by a stop request,
+        the outermost movement function returns None, without sending further commands to the servos."""
     
-    # NOTE: High freq. on the led PWM prevents camera from seeing flickering
-    top_cover_led = PWMLED(top_cover_led_pin,
-                           active_high=True,
-                           initial_value=0,
-                           frequency=5000000,
-                           pin_factory=factory)
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _stoppable_depth
+        _stoppable_depth += 1          # nesting level of the movement functions
+        try:                           # tentative
+            return func(*args, **kwargs)
+        except ServosStopped:          # case the servos sequence has been interrupted
+            if _stoppable_depth > 1:   # case of a nested movement function (i.e. close_cover within rotate_out)
+                raise                  # the calling movement function is interrupted as well
+            return None
+        finally:
+            _stoppable_depth -= 1
+    return wrapper
+
+
+
+
+
+
+
+
+def init_top_cover_led():
     
+    top_cover_led = backend.pwm_led(top_cover_led_pin)  # top cover led object, on the servos/GPIO backend
     led_init_status = True
     return led_init_status, top_cover_led
 
@@ -84,13 +152,12 @@ def init_top_cover_led():
 
 
 
-def load_servos_parameters(print_out):
+def load_servos_parameters(print_out, servo_settings=None):
     """ Parameters are imported from a json file, to make easier to list/document/change the variables
         that are expected to vary on each robot.
         These servo_settings are under a function, instead of root, to don't be executed when this script is used from CLI
-        with arguments; In this other case the aim is to help setting the servo to their mid position."""
-    
-    from Cubotino_T_settings_manager import settings as settings   # custom library managing the settings from<>to the settings files
+        with arguments; In this other case the aim is to help setting the servo to their mid position.
+        When servo_settings (dict) is given, those parameters are used instead of the settings file ones."""
     
     global t_servo, t_min_pulse_width, t_max_pulse_width, t_top_cover                       # top servo, pulse width, status
     global t_servo_close, t_servo_open, t_servo_read, t_servo_flip, t_servo_rel             # top servo related angles and status
@@ -101,12 +168,18 @@ def load_servos_parameters(print_out):
     global b_servo_CCW_rel, b_servo_CW_rel, b_home_from_CCW, b_home_from_CW                 # bottom servo calculated angles
     global b_servo_home, b_servo_stopped, b_servo_CW_pos, b_servo_CCW_pos                   # bottom servo status
     global b_spin_time, b_rotate_time, b_rel_time                                           # bottom servo timers
+    global servos_settings                                                                  # servos settings in use
     
 
-    servo_settings = settings.get_servos_settings(reload=True)  # settings are retrieved from the settings Class
+    if servo_settings is None:                   # case the servo_settings are not given as argument
+        from Cubotino_T_settings_manager import settings as settings   # custom library managing the settings from<>to the settings files
+        servo_settings = settings.get_servos_settings(reload=True)  # settings are retrieved from the settings Class
+        fname = settings.get_servo_settings_fname() # settings filename is retrieved
+    else:                                        # case the servo_settings are given as argument
+        fname = 'argument'                       # settings are not from a file
+    servos_settings = servo_settings             # servos settings in use (i.e. for the motion scheduler)
 
     if print_out:                                # case print_out variable is set true
-        fname = settings.get_servo_settings_fname() # settings filename is retrieved
         print('\nImporting servos settings from the text file:', fname)    # feedback is printed to the terminal
         print('\nImported parameters: ')         # feedback is printed to the terminal
         for param, s in servo_settings.items():  # iteration over the settings dict
@@ -175,8 +248,9 @@ def load_servos_parameters(print_out):
 
 
 
-def init_servo(print_out=s_debug, start_pos=0, f_to_close_mode=False, s_silent=False, init_display=True):
-    """ Function to initialize the robot (servos position) and some global variables, do be called once, at the start."""
+def init_servo(print_out=s_debug, start_pos=0, f_to_close_mode=False, s_silent=False, init_display=True, servo_settings=None):
+    """ Function to initialize the robot (servos position) and some global variables, do be called once, at the start.
+        When servo_settings (dict) is given, those parameters are used instead of the settings file ones."""
     
     global robot_init_status, fun_status, flip_to_close_one_step, led_init_status, top_cover_led
     global flip_to_close_one_step
@@ -186,7 +260,7 @@ def init_servo(print_out=s_debug, start_pos=0, f_to_close_mode=False, s_silent=F
     
     if s_silent and not led_init_status:      # case s_silent is se True
         led_init_status, top_cover_led = init_top_cover_led()  # the GPIO for the led is initialized
-        timer = load_servos_parameters(print_out)  # upload the servos parameters
+        timer = load_servos_parameters(print_out, servo_settings)  # upload the servos parameters
         robot_init_status = True              # robot_init_status is set True
         return robot_init_status, timer       # the function returns initi status and timer
         
@@ -197,12 +271,13 @@ def init_servo(print_out=s_debug, start_pos=0, f_to_close_mode=False, s_silent=F
     
     if not robot_init_status and not s_silent:  # case the inititialization status of the servos false
         
-        from Cubotino_T_pigpiod import pigpiod as pigpiod # start the pigpiod server
+        if not backend.simulated:             # case of real servos
+            from Cubotino_T_pigpiod import pigpiod as pigpiod # start the pigpiod server
         
         if f_to_close_mode:                   # case the init got the f_to_close_mode as true
             flip_to_close_one_step = True     # flip_to_close_one_step is set true
         
-        timer = load_servos_parameters(print_out)  # upload the servos parameters  
+        timer = load_servos_parameters(print_out, servo_settings)  # upload the servos parameters  
         if len(timer) == 0:                   # case the return is an empty dict
             print('Could not find Cubotino_T_servo_settings.txt')  # feedback is printed to the terminal                                  
             return robot_init_status          # return robot_init_status variable, that is False
@@ -243,7 +318,7 @@ def init_servo(print_out=s_debug, start_pos=0, f_to_close_mode=False, s_silent=F
 
 def t_servo_create(t_min_pulse_width, t_max_pulse_width, initial_pos=0):
     """top servo object creation."""
-    global t_servo_pin, factory, t_servo
+    global t_servo_pin, t_servo
     
     try:                          # tentative
         t_servo                   # name of t_servo
@@ -251,14 +326,13 @@ def t_servo_create(t_min_pulse_width, t_max_pulse_width, initial_pos=0):
     except NameError:             # case a name error exception is raised
         pass
     
-    t_servo = Servo(t_servo_pin,                                 # GPIO pin associated to the top servo
-                    initial_value = initial_pos,                 # Top_cover positioned to initial_pos
-                    min_pulse_width = t_min_pulse_width/1000,    # min Pulse Width the top servo reacts to
-                    max_pulse_width = t_max_pulse_width/1000,    # max Pulse Width the top servo reacts to
-                    frame_width=0.020,                           # min pulse width variation aceepted
-                    pin_factory=factory)                         # way to use hardware based timers for the PWM
+    t_servo = backend.servo(t_servo_pin,                         # GPIO pin associated to the top servo
+                            initial_value = initial_pos,         # Top_cover positioned to initial_pos
+                            min_pulse_width = t_min_pulse_width/1000,    # min Pulse Width the top servo reacts to
+                            max_pulse_width = t_max_pulse_width/1000,    # max Pulse Width the top servo reacts to
+                            name = 't_servo')                    # servo name (for the simulated backend log)
     
-    time.sleep(0.7)          # time to let the servo reaching the initial_value angle
+    clock.sleep(0.7)          # time to let the servo reaching the initial_value angle
     return t_servo
 
 
@@ -267,7 +341,7 @@ def t_servo_create(t_min_pulse_width, t_max_pulse_width, initial_pos=0):
 
 def b_servo_create(b_min_pulse_width, b_max_pulse_width, initial_pos=0):
     """bottom servo object creation."""
-    global b_servo_pin, factory, b_servo
+    global b_servo_pin, b_servo
 
     try:                          # tentative
         b_servo                   # name of b_servo
@@ -275,14 +349,13 @@ def b_servo_create(b_min_pulse_width, b_max_pulse_width, initial_pos=0):
     except NameError:             # case a name error exception is raised
         pass
     
-    b_servo = Servo(b_servo_pin,                                # GPIO pin associated to the bottom servo
-                    initial_value = initial_pos,                 # Cube_holder positioned to initial_pos
-                    min_pulse_width = b_min_pulse_width/1000,    # min Pulse Width the bottom servo reacts to
-                    max_pulse_width = b_max_pulse_width/1000,    # max Pulse Width the bottom servo reacts to
-                    frame_width=0.020,                           # min pulse width variation aceepted
-                    pin_factory=factory)                         # way to used hardware based timers for the PWM
+    b_servo = backend.servo(b_servo_pin,                         # GPIO pin associated to the bottom servo
+                            initial_value = initial_pos,         # Cube_holder positioned to initial_pos
+                            min_pulse_width = b_min_pulse_width/1000,    # min Pulse Width the bottom servo reacts to
+                            max_pulse_width = b_max_pulse_width/1000,    # max Pulse Width the bottom servo reacts to
+                            name = 'b_servo')                    # servo name (for the simulated backend log)
     
-    time.sleep(0.7)          # time to let the servo reaching the initial_value angle
+    clock.sleep(0.7)          # time to let the servo reaching the initial_value angle
     return b_servo
 
 
@@ -294,6 +367,10 @@ def b_servo_create(b_min_pulse_width, b_max_pulse_width, initial_pos=0):
 def set_display():
     global s_disp
     
+    if backend.simulated:       # case of simulated servos
+        s_disp = backend.display  # display replacement, doing nothing
+        return
+    
     from Cubotino_T_display import display as s_disp    
     s_disp.set_backlight(0)     # display backlight is set off
     s_disp.show_cubotino()      # show cubotino logo on display, when this script is imported
@@ -312,6 +389,7 @@ def servo_tune_via_gui(debug, start_pos):
     s_debug=debug                  # boolean to print out info when debugging
     robot_init_status = init_servo(s_debug, start_pos)
     stop_servos=False              # boolean to stop the servos during solving proces: It is set true at the start, servos cannot operate
+    stop_event.clear()             # stop event is cleared: servos timers can wait
     b_servo_operable=True          # variable to block/allow bottom servo operation
     return robot_init_status
     
@@ -325,9 +403,8 @@ def servo_tune_via_gui(debug, start_pos):
 def quit_func():
     """ Sets the used GPIO as output, and force them to low. This wants to prevent servos to move after closing the script."""
     
-    GPIO.setup(top_cover_led_pin, GPIO.OUT, initial=GPIO.LOW)   # GPIO top_cover_led_pin (Top_cover_Led) is set as output, and force low
-    GPIO.setup(t_servo_pin, GPIO.OUT, initial=GPIO.LOW)         # GPIO t_servo_pin (Top_cover servo) is set as output, and force low
-    GPIO.setup(b_servo_pin, GPIO.OUT, initial=GPIO.LOW)         # GPIO b_servo_pin (Cube_holder servo) is set as output, and force low
+    # GPIO pins of Top_cover_Led, Top_cover servo and Cube_holder servo are set as output, and force low
+    backend.set_low((top_cover_led_pin, t_servo_pin, b_servo_pin))
 
 
 
@@ -361,11 +438,11 @@ def cam_led_test():
     
     for i in range(0,32,4):            # iterates from 0 to 28 in steps of 4 
         top_cover_led.value = i/100    # top cover led PWM is set iterator %
-        time.sleep(0.02)               # very short time sleep
+        clock.sleep(0.02)               # very short time sleep
     
     for i in range(28,-4,-4):          # iterates from 28 to 0 in steps of -4 
         top_cover_led.value = i/100    # top cover led PWM is set iterator %
-        time.sleep(0.02)               # very short time sleep
+        clock.sleep(0.02)               # very short time sleep
     
     top_cover_led.off()                # top cover led PWM is set to 0
 
@@ -382,17 +459,18 @@ def servo_start_pos(start_pos):
     global stop_servos
     
     stop_servos=False                 # boolean to stop the servos during solving process is set False: servos can be operated
+    stop_event.clear()                # stop event is cleared: servos timers can wait
     b_servo_operable=False            # variable to block/allow bottom servo operation
     
     
     t_servo.value = t_servo_open      # top servo is positioned in open position
-    time.sleep(t_close_to_flip_time)  # time to allow the top_cover/lifter to reach the open postion   
+    clock.sleep(t_close_to_flip_time)  # time to allow the top_cover/lifter to reach the open postion   
     t_top_cover = 'open'              # variable to track the top cover/lifter position
     b_servo_operable=True             # variable to block/allow bottom servo operation
     
     
     b_servo.value = b_home            # bottom servo moves to the home position, releasing then the tensions
-    time.sleep(b_rotate_time)         # time for the servo to release the tensions
+    clock.sleep(b_rotate_time)         # time for the servo to release the tensions
     
     b_servo_stopped = True            # boolean of bottom servo at location the lifter can be operated
     b_servo_home=True                 # boolean of bottom servo at home
@@ -402,7 +480,7 @@ def servo_start_pos(start_pos):
     if start_pos == 'read':           # case the top cover initial position is 'read'
         b_servo_operable=False        # variable to block/allow bottom servo operation
         t_servo.value = t_servo_read  # top servo is positioned in read position at the start
-        time.sleep(t_flip_open_time)  # time to allow the top_cover/lifter to reach the read postion
+        clock.sleep(t_flip_open_time)  # time to allow the top_cover/lifter to reach the read postion
         t_top_cover = 'read'          # variable to track the top cover/lifter position
     
     elif start_pos == 'open':         # case the top cover initial position is 'open'
@@ -436,6 +514,7 @@ def stopping_servos(print_out=s_debug):
     if print_out:                         # case the print_out variable is set true
         print("\nCalled the servos stopping function\n")   # feedback is printed to the terminal
     stop_servos=True                      # boolean to stop the servos during solving process, is set true: Servos are stopped
+    stop_event.set()                      # stop event is set: The servos timer eventually waiting is woken up
 
 
 
@@ -451,6 +530,7 @@ def stop_release(print_out=s_debug):
     if print_out:                          # case the print_out variable is set true
         print("\nCalled the stop release function\n")  # feedback is printed to the terminal
     stop_servos=False            # boolean to stop the servos during solving process, is set false: Servo can be operated
+    stop_event.clear()           # stop event is cleared: servos timers can wait
 
 
 
@@ -474,6 +554,7 @@ def open_pos():
 
 
 
+@stoppable
 def read():
     """ Function to position the top_cover to the read."""
     global t_top_cover, b_servo_operable, b_servo_stopped, b_servo_home
@@ -483,13 +564,13 @@ def read():
             b_servo_operable=False               # variable to block/allow bottom servo operation
             if t_top_cover == 'close':           # cover/lifter position variable set to close
                 t_servo.value = t_servo_read     # servo is positioned to flip the cube
-                time.sleep(t_close_to_flip_time) # time for the servo to reach the flipping position from close position
+                wait(t_close_to_flip_time)        # time for the servo to reach the flipping position from close position
             elif t_top_cover == 'open':          # cover/lifter position variable set to open
                 t_servo.value = t_servo_read     # servo is positioned to flip the cube
-                time.sleep(t_flip_open_time)     # time for the servo to reach the flipping position
+                wait(t_flip_open_time)            # time for the servo to reach the flipping position
             elif t_top_cover == 'flip':          # cover/lifter position variable set to flip (only possible when gui_test)
                 t_servo.value = t_servo_read     # servo is positioned to flip the cube
-                time.sleep(t_flip_open_time)     # time for the servo to reach the flipping position 
+                wait(t_flip_open_time)            # time for the servo to reach the flipping position 
             
             t_top_cover='read'                   # cover/lifter position variable set to read
             return 'read'                        # position of the top_cover is returned
@@ -500,6 +581,7 @@ def read():
 
 
 
+@stoppable
 def flip_up():
     """ Function to raise the flipper to the upper position, to flip the cube around its horizontal axis."""
     
@@ -510,10 +592,10 @@ def flip_up():
             b_servo_operable=False               # variable to block/allow bottom servo operation
             if t_top_cover == 'close':           # cover/lifter position variable set to close
                 t_servo.value = t_servo_flip     # servo is positioned to flip the cube
-                time.sleep(t_close_to_flip_time) # time for the servo to reach the flipping position from close position
+                wait(t_close_to_flip_time)        # time for the servo to reach the flipping position from close position
             elif t_top_cover == 'open' or t_top_cover == 'read':   # cover/lifter position variable set to open or read positions
                 t_servo.value = t_servo_flip     # servo is positioned to flip the cube
-                time.sleep(t_flip_open_time)     # time for the servo to reach the flipping position
+                wait(t_flip_open_time)            # time for the servo to reach the flipping position
             t_top_cover='flip'                   # cover/lifter position variable set to flip
 
 
@@ -522,6 +604,7 @@ def flip_up():
 
 
 
+@stoppable
 def flip_to_read():
     """ Function to raise the top cover to the open position. The cube is not contrained by the top cover or the flipper."""
     
@@ -531,7 +614,7 @@ def flip_to_read():
         if b_servo_stopped==True:                # boolean of bottom servo at location the lifter can be operated
             b_servo_operable=False               # variable to block/allow bottom servo operation
             t_servo.value = t_servo_read         # top servo is positioned in read top cover position, from flip position
-            time.sleep(t_flip_open_time)         # time for the top servo to reach the open top cover position
+            wait(t_flip_open_time)                # time for the top servo to reach the open top cover position
             t_top_cover='open'                   # variable to track the top cover/lifter position
             b_servo_operable=True                # variable to block/allow bottom servo operation
 
@@ -540,6 +623,7 @@ def flip_to_read():
 
 
 
+@stoppable
 def flip_to_open():
     """ Function to raise the top cover to the open position. The cube is not contrained by the top cover or the flipper."""
     
@@ -549,7 +633,7 @@ def flip_to_open():
         if b_servo_stopped==True:                # boolean of bottom servo at location the lifter can be operated
             b_servo_operable=False               # variable to block/allow bottom servo operation
             t_servo.value = t_servo_open         # top servo is positioned in open top cover position, coming from flip
-            time.sleep(t_flip_open_time)         # time for the top servo to reach the open top cover position
+            wait(t_flip_open_time)                # time for the top servo to reach the open top cover position
             t_top_cover='open'                   # variable to track the top cover/lifter position
             b_servo_operable=True                # variable to block/allow bottom servo operation
 
@@ -558,6 +642,7 @@ def flip_to_open():
 
 
 
+@stoppable
 def flip_to_close():
     """ Function to lower the flipper to the close position, position that contrains the cube with the top cover."""
     
@@ -569,20 +654,20 @@ def flip_to_close():
             
             if not flip_to_close_one_step:         # case the flip to close is not set to one step
                 t_servo.value = t_servo_read       # servo is positioned to read position, to let the cube falling onto the holder
-                time.sleep(t_flip_to_close_time)   # time for the servo to reach the flipping position
+                wait(t_flip_to_close_time)          # time for the servo to reach the flipping position
                 t_top_cover == 'read'              # variable to track the top cover/lifter position
             
             t_servo.value = t_servo_close          # servo is positioned to constrain the mid and top cube layers
             
             if t_top_cover == 'flip' or t_top_cover == 'read':  # cover/lifter position variable set to flip
-                time.sleep(t_flip_to_close_time)   # time for the servo to reach the close position
+                wait(t_flip_to_close_time)          # time for the servo to reach the close position
             
             elif t_top_cover == 'open':            # cover/lifter position variable set to open or read positions
-                time.sleep(t_open_close_time)      # time for the servo to reach the flipping position
+                wait(t_open_close_time)             # time for the servo to reach the flipping position
 
             if t_servo_rel < t_servo_close:        # case the t_servo_rel_delta is > zero
                 t_servo.value = t_servo_rel        # servo is positioned to release the tention from top of the cube (in case of contact)
-                time.sleep(t_rel_time)             # time for the servo to release the tension
+                wait(t_rel_time)                    # time for the servo to release the tension
                 
             t_top_cover='close'                    # cover/lifter position variable set to close
             b_servo_operable=True                  # variable to block/allow bottom servo operation
@@ -592,6 +677,7 @@ def flip_to_close():
 
 
 
+@stoppable
 def flip():
     """ Flips the cube during the cube detection phase, and places the top_cover (piCamera) in read position."""
     
@@ -604,7 +690,7 @@ def flip():
         if b_servo_stopped==True:              # boolean of bottom servo at location the lifter can be operated
             b_servo_operable=False             # variable to block/allow bottom servo operation
             t_servo.value = t_servo_read       # top servo is positioned in top cover read position
-            time.sleep(t_flip_open_time+0.1)   # time for the top servo to reach the top cover read position
+            wait(t_flip_open_time+0.1)          # time for the top servo to reach the top cover read position
             t_top_cover='read'                 # variable to track the top cover/lifter position
             b_servo_operable=False             # variable to block/allow bottom servo operation
 
@@ -635,6 +721,7 @@ def flip_toggle(current_pos, t_servo_read, t_servo_flip):
 
 
 
+@stoppable
 def open_cover(target=0, test=False):
     """ Function to open the top cover from the close position, to release the contrain from the cube."""
     
@@ -646,7 +733,7 @@ def open_cover(target=0, test=False):
             if test:                               # case the test variable is set True (used by the GUI)
                 t_servo_open = target              # thepassed target value is assigned to local variable t_servo_open
             t_servo.value = t_servo_open           # servo is positioned to open
-            time.sleep(t_open_close_time)          # time for the servo to reach the open position
+            wait(t_open_close_time)                 # time for the servo to reach the open position
             t_top_cover='open'                     # variable to track the top cover/lifter position
             b_servo_operable=True                  # variable to block/allow bottom servo operation
             return 'open'                          # position of the top_cover is returned
@@ -657,6 +744,7 @@ def open_cover(target=0, test=False):
 
 
 
+@stoppable
 def close_cover(target=0, release=0, timer1=0, timer2=0, test=False):
     """ Function to close the top cover, to contrain the cube.
         Parameters in argument are used by the GUI to set/test the servos positions."""
@@ -670,16 +758,16 @@ def close_cover(target=0, release=0, timer1=0, timer2=0, test=False):
             
             if test:                               # case the test variable is set True (used by the GUI)                 
                 t_servo.value = target             # servo is positioned to open
-                time.sleep(timer1)                 # time for the servo to reach the open position
+                wait(timer1)                        # time for the servo to reach the open position
                 if t_servo_rel < t_servo_close:    # case the t_servo_rel_delta is > zero
                     t_servo.value = target - release   # servo is positioned to release the tention from top of the cube (in case of contact)
-                    time.sleep(timer2)             # time for the servo to release the tension
+                    wait(timer2)                    # time for the servo to release the tension
             else:                                  # case the test variable is set False (function not used by the GUI)
                 t_servo.value = t_servo_close      # servo is positioned to open
-                time.sleep(t_open_close_time)      # time for the servo to reach the open position
+                wait(t_open_close_time)             # time for the servo to reach the open position
                 if t_servo_rel < t_servo_close:    # case the t_servo_rel_delta is > zero
                     t_servo.value = t_servo_rel    # servo is positioned to release the tention from top of the cube (in case of contact)
-                    time.sleep(t_rel_time)         # time for the servo to release the tension
+                    wait(t_rel_time)                # time for the servo to release the tension
             
             t_top_cover='close'                    # cover/lifter position variable set to close
             b_servo_operable=True                  # variable to block/allow bottom servo operation
@@ -690,6 +778,7 @@ def close_cover(target=0, release=0, timer1=0, timer2=0, test=False):
 
 
 
+@stoppable
 def spin_out(direction, target=0, release=0, timer1=0, test=False):
     """ Function that spins the cube holder toward CW or CCW.
         During the spin the cube is not contrained by the top cover.
@@ -718,23 +807,23 @@ def spin_out(direction, target=0, release=0, timer1=0, test=False):
                 if direction=='CCW':                 # case the set direction is CCW
                     if test:                         # case the variable test is set True
                         b_servo.value = target       # bottom servo moves to the most CCW position
-                        time.sleep(timer1)           # time to let the servo reaching the CCW position
+                        wait(timer1)                  # time to let the servo reaching the CCW position
                         if release > 0:              # case release variable is > than 0
                             b_servo.value = target + release   # bottom servo moves back of releave value
                     else:                            # case the variable test is set False
                         b_servo.value = b_servo_CCW_rel  # bottom servo moves to almost the max CCW position
-                        time.sleep(b_spin_time*number)   # time for the bottom servo to reach the most CCW position
+                        wait(b_spin_time*number)          # time for the bottom servo to reach the most CCW position
                         b_servo_CCW_pos=True         # boolean of bottom servo at full CCW position
                         b_servo_CW_pos=False                
                 elif direction=='CW':                # case the set direction is CW
                     if test:                         # case the variable test is set True
                         b_servo.value = target       # bottom servo moves to the most CW position 
-                        time.sleep(timer1)           # time to let the servo reaching the CCW position
+                        wait(timer1)                  # time to let the servo reaching the CCW position
                         if release > 0:              # case release variable is > than 0
                             b_servo.value = target - release   # bottom servo moves back of releave value
                     else:                            # case the variable test is set False
                         b_servo.value = b_servo_CW_rel   # bottom servo moves to almost the max CW position 
-                        time.sleep(b_spin_time*number)   # time for the bottom servo to reach the most CW position
+                        wait(b_spin_time*number)          # time for the bottom servo to reach the most CW position
                         b_servo_CW_pos=True          # boolean of bottom servo at full CW position
                         b_servo_CCW_pos=False                
                 b_servo_stopped=True                 # boolean of bottom servo at location the lifter can be operated
@@ -748,6 +837,7 @@ def spin_out(direction, target=0, release=0, timer1=0, test=False):
 
 
 
+@stoppable
 def spin_home():
     """ Function that spins the cube holder to home position.
         During the spin the cube is not contrained by the top cover.
@@ -765,7 +855,7 @@ def spin_home():
             if b_servo_home==False:             # boolean of bottom servo at home
                 b_servo_stopped = False         # boolean of bottom servo at location the lifter can be operated
                 b_servo.value = b_home          # bottom servo moves to the home position, releasing then the tensions
-                time.sleep(b_spin_time)         # time for the bottom servo to reach the extra home position
+                wait(b_spin_time)                # time for the bottom servo to reach the extra home position
                 b_servo_stopped=True            # boolean of bottom servo at location the lifter can be operated
                 b_servo_home=True               # boolean of bottom servo at home
                 b_servo_CW_pos=False            # boolean of bottom servo at full CW position
@@ -789,6 +879,7 @@ def spin_home():
 
 
 
+@stoppable
 def rotate_out(direction):
     """ Function that rotates the cube holder toward CW or CCW position; During the rotation the cube is contrained by the top cover.
         The cube holder makes first an extra rotation, and later it comes back to the intended position; This approach
@@ -813,16 +904,16 @@ def rotate_out(direction):
                 
                 if direction=='CCW':                      # case the set direction is CCW
                     b_servo.value = b_servo_CCW           # bottom servo moves to the most CCW position
-                    time.sleep(b_rotate_time*number)             # time for the bottom servo to reach the most CCW position
+                    wait(b_rotate_time*number)                    # time for the bottom servo to reach the most CCW position
                     b_servo.value = b_servo_CCW_rel       # bottom servo moves slightly to release the tensions
-                    time.sleep(b_rel_time)                # time for the servo to release the tensions
+                    wait(b_rel_time)                       # time for the servo to release the tensions
                     b_servo_CCW_pos=True                  # boolean of bottom servo at full CCW position
                     b_servo_CW_pos=False
                 elif direction=='CW':                     # case the set direction is CW
                     b_servo.value = b_servo_CW            # bottom servo moves to the most CCW position
-                    time.sleep(b_rotate_time*number)             # time for the bottom servo to reach the most CCW position
+                    wait(b_rotate_time*number)                    # time for the bottom servo to reach the most CCW position
                     b_servo.value = b_servo_CW_rel        # bottom servo moves slightly to release the tensions
-                    time.sleep(b_rel_time)                # time for the servo to release the tensions
+                    wait(b_rel_time)                       # time for the servo to release the tensions
                     b_servo_CW_pos=True                   # boolean of bottom servo at full CW position
                     b_servo_CCW_pos=False
 
@@ -841,6 +932,7 @@ def rotate_out(direction):
 
 
 
+@stoppable
 def rotate_home(direction, home=0, release=0, timer1=0, test=False):
     """ Function that rotates the cube holder to home position; During the rotation the cube is contrained by the top cover.
         The cube holder makes first an extra rotation, and later it comes back to the home position; This approach
@@ -862,9 +954,9 @@ def rotate_home(direction, home=0, release=0, timer1=0, test=False):
                     elif direction=='CW':              # case the set direction is CW
                         if b_servo_CCW_pos==True:      # boolean of bottom servo at full CW position
                             b_servo.value = b_home_from_CCW  # bottom servo moves to the extra home position, from CCW
-                    time.sleep(b_rotate_time)          # time for the bottom servo to reach the extra home position
+                    wait(b_rotate_time)                 # time for the bottom servo to reach the extra home position
                     b_servo.value = b_home                 # bottom servo moves to the home position, releasing then the tensions
-                    time.sleep(b_rel_time)                 # time for the servo to release the tensions
+                    wait(b_rel_time)                        # time for the servo to release the tensions
                     b_servo_stopped=True                   # boolean of bottom servo at location the lifter can be operated
                     b_servo_home=True                      # boolean of bottom servo at home
                     b_servo_CW_pos=False                   # boolean of bottom servo at full CW position
@@ -880,7 +972,7 @@ def rotate_home(direction, home=0, release=0, timer1=0, test=False):
                         b_servo.value = b_home - release   # bottom servo moves to the extra home position, from CW
                     elif direction=='CW':              # case the set direction is CW
                         b_servo.value = b_home + release   # bottom servo moves to the extra home position, from CCW
-                    time.sleep(timer1)                 # time for the bottom servo to reach the extra home position
+                    wait(timer1)                        # time for the bottom servo to reach the extra home position
                     b_servo.value = b_home             # bottom servo moves to the home position, releasing then the tensions
                     return 'home'
 
@@ -898,13 +990,13 @@ def servo_to_pos(servo, pos, rel=''):
         try:                               # tentative
             if servo == 'top':             # case the servo variable in argument equals to 'top'
                 t_servo.value = pos        # top servo is set to position pos
-                time.sleep(1)              # short sleeping time
+                clock.sleep(1)              # short sleeping time
                 if rel != '':              # case the rel variable (release position) in argument is not an empty string
                     t_servo.value = rel    # top servo is set to rel pos
                 
             elif servo == 'bottom':        # case the servo variable in argument equals to 'bottom'
                 b_servo.value = pos        # bottom servo is set to position pos
-                time.sleep(1)              # short sleeping time
+                clock.sleep(1)              # short sleeping time
                 if rel != '':              # case the rel variable (release position) in argument is not an empty string
                     b_servo.value = rel    # bottom servo is set to rel pos
             
@@ -927,57 +1019,21 @@ def servo_to_pos(servo, pos, rel=''):
 def check_moves(moves, print_out=s_debug):
     """ Function that counts the total servo moves, based on the received moves string.
         This function also verifies if the move string is compatible with servo contrained within 180 deg range (from -90 to 90 deg):
-        Not possible to rotate twice +90deg (or -90deg) from the center, nor 3 times +90deg (or -90deg) from one of the two extremes."""
-    
-    servo_angle=0                                         # initial angle is set to zero, as this is the starting condition at string receival
-    servo_angle_ok=True                                   # boolean to track the check result
-    tot_moves=0                                           # counter for the total amount of servo moves (1x complete flip, 1x each 90 deg cube spin or 1st layer rotation)
-    
-    for i in range(len(moves)):                           # iteration over all the string characters
-        if moves[i]=='1':                                 # case direction is CW 
-            if moves[i-1] == 'R' or moves[i-1] == 'S':    # case the direction refers to cube spin or layer rotation
-                servo_angle+=90                           # positive 90deg angle are added to the angle counter
-                tot_moves+=1                              # counter is increased
-
-        elif moves[i]=='0':                               # case direction is CW 
-            if moves[i-1] == 'R' or moves[i-1] == 'S':    # case the direction refers to cube spin or layer rotation
-                servo_angle+=180                          # negative 90deg angle are subtracted from the angle counter
-                tot_moves+=1                              # counter is increased
-
-        elif moves[i]=='3':                               # case direction is CCW 
-            if moves[i-1] == 'R' or moves[i-1] == 'S':    # case the direction refers to cube spin or layer rotation
-                servo_angle-=90                           # negative 90deg angle are subtracted from the angle counter
-                tot_moves+=1                              # counter is increased
-
-        elif moves[i]=='4':                               # case direction is CCW 
-            if moves[i-1] == 'R' or moves[i-1] == 'S':    # case the direction refers to cube spin or layer rotation
-                servo_angle-=180                          # negative 90deg angle are subtracted from the angle counter
-                tot_moves+=1                              # counter is increased
-
-        elif moves[i]=='F':                               # case there is a flip on the move string
-            tot_moves+=int(moves[i+1])                    # counter is increased
-        
-        if servo_angle<-90 or servo_angle>90:             # case the angle counter is out of range
-            if print_out:                                 # case the print_out variable is set true
-                print(f'Servo_angle out of range at string pos:{i}')  # info are printed
-            servo_angle_ok=False                          # bolean of results is updated
-            break                                         # for loop is interrupted
+        Not possible to rotate twice +90deg (or -90deg) from the center, nor 3 times +90deg (or -90deg) from one of the two extremes.
+        The moves are parsed once (RobotOps), and the returned solving percentages are indexed per robot move."""
+    
+    moves = rm.robot_ops(moves)                           # robot moves, parsed as RobotOps
+    servo_angle_ok = moves.angle_ok                       # Cube_holder angle check result
     
     if servo_angle_ok==True:                              # case the coolean is still positive
         if print_out:                                     # case the print_out variable is set true
             print('Servo_angle within range')             # positive result is printed
-    
-    remaining_moves={}                                            # empty dict to store the left moves 
-    left_moves=tot_moves                                          # initial remaining moves are all the moves
-    for i in range(len(moves)):                                   # iteration over all the string characters
-        if moves[i]=='R' or moves[i]=='S':                        # case the move is cube spin or layer rotation               
-            left_moves-=1                                         # counter is decreased by one
-            remaining_moves[i]=int(100*(1-left_moves/tot_moves))  # solving percentage associated to the move index key
-        elif moves[i]=='F':                                       # case there is a flip on the move string
-            left_moves-=int(moves[i+1])                           # counter is decreased by the amount of flips
-            remaining_moves[i]=int(100*(1-left_moves/tot_moves))  # solving percentage associated to the move index key   
+    else:                                                 # case the angle counter is out of range
+        if print_out:                                     # case the print_out variable is set true
+            n = [-90 <= angle <= 90 for angle in moves.angles].index(False)  # first robot move out of range
+            print(f'Servo_angle out of range at string pos:{2*n+1}')  # info are printed
         
-    return servo_angle_ok, tot_moves, remaining_moves
+    return servo_angle_ok, moves.tot_moves, moves.progress
 
 
 
@@ -987,80 +1043,11 @@ def check_moves(moves, print_out=s_debug):
 def estimate_time(moves, timer, slow_time=0):
     """ Function that estimates the total solving time.
     Arguments are the received moves string, and the servos timers.
-    Estimated time is indicative."""
-    
-    t_flip_to_close_time = timer['t_flip_to_close_time']
-    t_close_to_flip_time = timer['t_close_to_flip_time']
-    t_flip_open_time = timer['t_flip_open_time']
-    t_open_close_time = timer['t_open_close_time']
-    t_rel_time = timer['t_rel_time']
-    b_spin_time = timer['b_spin_time']
-    b_rotate_time = timer['b_rotate_time']
-    b_rel_time = timer['b_rel_time']
-    
-    
-    t_top_cover = 'read'                           # variable to track the top cover/lifter position
-    tot_time=0                                     # counter for the total time
-    string_len=len(moves)                          # number of characters in the moves string
-    
-    if string_len>0:                               # case moves > 0 (there are moves)
-        if moves[0] == 'S':                        # case the first move requires a cube spin
-            tot_time += (t_flip_open_time + slow_time)  # time for the top servo to reach the open top cover position
-            t_top_cover = 'open'                   # variable to track the top cover/lifter position
-        elif moves[0] == 'R':                      # case the first move requires a cube layer rotationn
-            tot_time += (t_open_close_time + t_rel_time + slow_time)  # time for the servo to reach the flipping position
-            t_top_cover = 'close'                  # top cover position is initially set to close
-    
-                       
-    for i in range(string_len):                    # iteration over the characters of the moves string     
-        if moves[i]=='F':                          # case there is a flip on the move string
-            flips=int(moves[i+1])                  # number of flips
-            
-            for f in range(flips):                 # iterates over the number of requested flips
-                if t_top_cover == 'close':         # cover/lifter position variable set to close
-                    tot_time += (t_close_to_flip_time + slow_time)  # time for the servo to reach the flipping position
-                elif t_top_cover == 'open' or t_top_cover == 'read':   # cover/lifter position variable set to open or read positions
-                    tot_time += (t_flip_open_time +slow_time)  # time for the servo to reach the flipping position
-                t_top_cover='flip'                 # cover/lifter position variable set to flip
-
-                if f<(flips-1):                    # case there are further flippings to do
-                    tot_time += (t_flip_open_time + slow_time)  # time for the top servo to reach the open top cover position
-                    t_top_cover='read'             # variable to track the top cover/lifter position
-                    
-                if f==(flips-1) and string_len-(i+2)>0:  # case it's the last flip and there is a following command on the move string
-                    if moves[i+2]=='R':            # case the next action is a 1st layer cube rotation
-                        if not flip_to_close_one_step:   # case the flip to close is not set to one step
-                            tot_time += 2*t_flip_to_close_time   # time for the servo to reach the flipping position
-                        tot_time += (t_flip_to_close_time + t_rel_time + slow_time)  # time for the servo to reach the close position
-                        t_top_cover='close'        # cover/lifter position variable set to close
-                    elif moves[i+2]=='S':          # case the next action is a cube spin
-                        tot_time += (t_flip_open_time + slow_time)  # time for the top servo to reach the open top cover position
-                        t_top_cover='open'         # variable to track the top cover/lifter position
-
-        
-        elif moves[i]=='S':                        # case there is a cube spin on the move string
-            if t_top_cover!='open':                # case the top cover is not in open position
-                tot_time += (t_open_close_time + slow_time)   # time for the servo to reach the open position
-            
-            if moves[i+1] == '0' or moves[i+1] == '4':
-                tot_time += (2.1*b_spin_time + slow_time)  # time for the bottom servo to spin
-            else:
-                tot_time += (b_spin_time + slow_time)  # time for the bottom servo to spin
-            t_top_cover='open'                     # cover/lifter position variable set to open
-
-
-        elif moves[i]=='R':                        # case there is a cube 1st layer rotation
-            if t_top_cover!='close':               # case the top cover is not in close position
-                tot_time += (t_open_close_time + t_rel_time + slow_time)   # time for the servo to reach the close position
-            if moves[i+1] == '0' or moves[i+1] == '4':
-                tot_time += (2.1*b_rotate_time + b_rel_time +slow_time)   # time for the bottom servo to rotate
-            else:
-                tot_time += (b_rotate_time + b_rel_time +slow_time)   # time for the bottom servo to rotate
-            t_top_cover='close'                    # cover/lifter position variable set to close
+    The robot time model (Cubotino_T_time_calibration.py) is used when fitted with the same servos timers,
+    otherwise the estimated time is indicative; The estimate is cached by the RobotOps."""
     
-    # time estimation is based on sleep time for servos movements, therefore it is not accurate
-    k=1.08                                         # correction coefficient
-    return round(tot_time*k,1)
+    model = rm.time_model_for(timer)               # robot time model, fitted on the real robot solving times
+    return rm.robot_ops(moves).estimate_time(timer, slow_time, flip_to_close_one_step, model)
 
 
 
@@ -1068,6 +1055,7 @@ def estimate_time(moves, timer, slow_time=0):
 
 
 
+@stoppable
 def fun(print_out=s_debug):
     """ Cube holder spins, to make some vittory noise once the cube is solved."""
 
@@ -1081,7 +1069,7 @@ def fun(print_out=s_debug):
             if b_servo_stopped==True:                # boolean of bottom servo at location the lifter can be operated
                 b_servo_operable=False               # variable to block/allow bottom servo operation
                 t_servo.value = t_servo_open         # top servo is positioned in open top cover position, from close position
-                time.sleep(t_flip_open_time)         # time for the top servo to reach the open top cover position
+                wait(t_flip_open_time)                # time for the top servo to reach the open top cover position
                 t_top_cover='open'                   # variable to track the top cover/lifter position
                 b_servo_operable=True                # variable to block/allow bottom servo operation
         
@@ -1094,11 +1082,11 @@ def fun(print_out=s_debug):
                 elif b_servo_CCW_pos==True:          # boolean of bottom servo at full CCW position
                     b_servo.value = b_home_from_CCW  # bottom servo moves to the extra home position, from CW
                 
-                time.sleep(b_spin_time)              # time for the bottom servo to reach the extra home position
+                wait(b_spin_time)                     # time for the bottom servo to reach the extra home position
                 b_servo_home=True                    # boolean bottom servo is home
 
     
-    time.sleep(0.25)                                 # little delay, to timely separate from previous robot movements
+    wait(0.25)                                        # little delay, to timely separate from previous robot movements
     runs=8                                           # number of sections
     b_delta = (b_servo_CW-b_home)/runs               # PWM amplitute per section
     t_delta = 1.3*b_spin_time/runs                   # time amplitude per section
@@ -1110,20 +1098,20 @@ def fun(print_out=s_debug):
         if not stop_servos:                          # case there is not a stop request for servos
             b_servo_stopped=False                    # boolean of bottom servo at location the lifter can be operated
             b_servo.value = b_target_CCW             # bottom servo moves to the target_CCW position
-            time.sleep(k*(delay_time+i*0.01))        # time for the bottom servo to reach the target position
+            wait(k*(delay_time+i*0.01))               # time for the bottom servo to reach the target position
             k=2                                      # coefficient to double the time, at each move do not start from home anymore
             b_target_CW=b_home-b_delta*(runs-i)      # PWM target calculation for CW postion
             delay_time=t_delta*(runs-i)              # time calculation for the servo movement
         if not stop_servos:                          # case there is not a stop request for servos
             b_servo_operable=False                   # variable to block/allow bottom servo operation
             b_servo.value = b_target_CW              # bottom servo moves to the target_CW position
-            time.sleep(k*(delay_time+i*0.01))        # time for the bottom servo to reach the target position
+            wait(k*(delay_time+i*0.01))               # time for the bottom servo to reach the target position
             b_servo_stopped=True                     # boolean of bottom servo at location the lifter can be operated
     
     if not stop_servos:                              # case there is not a stop request for servos
         b_servo_stopped=False                        # boolean of bottom servo at location the lifter can be operated
         b_servo.value = b_home                       # bottom servo moves to home position
-        time.sleep(k*(delay_time+i*0.010))           # time for the bottom servo to reach home position
+        wait(k*(delay_time+i*0.010))                  # time for the bottom servo to reach home position
         b_servo_stopped=True                         # boolean of bottom servo at location the lifter can be operated
         b_servo_home=True                            # boolean bottom servo is home
 
@@ -1142,31 +1130,32 @@ def servo_solve_cube(moves, scrambling=False, print_out=s_debug, test=False):
         This is substantially the main function."""
     
     global t_top_cover, b_servo_operable, b_servo_stopped, b_servo_home
-    #move_buffer=""
-    if not scrambling: 
-        mqtt_publisher.send_solution(moves)
-
-    start_time=time.time()                         # start time is assigned
+    moves = rm.robot_ops(moves)                    # robot moves, parsed once as RobotOps
+    start_time=clock.time()                         # start time is assigned
     # the received string is analyzed if compatible with servo rotation contraints, and amount of movements
-    servo_angle_ok, tot_moves, remaining_moves = check_moves(moves, print_out=s_debug)
+    servo_angle_ok, tot_moves, progress = check_moves(moves, print_out=s_debug)
+    if not scrambling:                             # case of solving (moves telemetry)
+        mqtt_publisher.send_solution(moves)        # robot moves are published
+        move_telemetry.start(moves, progress)      # robot moves events are coalesced per time window
     
     if not servo_angle_ok:
         print("Error on servo moves algorithm")    # feedback to terminal
         robot_status_='Robot_stopped'              # string variable indicating how the servo_solve_cube function has ended
-        robot_time_=(time.time()-start_time)       # robot time is calculated
+        robot_time_=(clock.time()-start_time)       # robot time is calculated
         return robot_status_, robot_time_          # function returns the cube status and the robot time
         
     if print_out:                                  # case the print_out variable is set true
         print(f'Total amount of servo movements: {tot_moves}\n')   # feedback is printed to the terminal   
 
-    if len(moves)>0:                               # case moves > 0 (there are moves)
-        if moves[0] == 'S':                        # case the first move requires a cube spin
+    ops, args = moves.ops, moves.args              # op codes and arguments of the robot moves
+    n_ops = len(ops)                               # number of robot moves
+    if n_ops>0:                                    # case moves > 0 (there are moves)
+        if ops[0] == rm.OP_S:                      # case the first move requires a cube spin
             flip_to_open()                         # Top_cover is set to open position
-        elif moves[0] == 'R':                      # case the first move requires a cube layer rotation
+        elif ops[0] == rm.OP_R:                    # case the first move requires a cube layer rotation
             flip_to_close()                        # Top_cover is set to close position
     
-    string_len=len(moves)                          # number of characters in the moves string
-    for i in range(string_len):                    # iteration over the characters of the moves string
+    for n in range(n_ops):                         # iteration over the robot moves
         if test:                                   # case test is set True (function is called for test by CLI or GUI)
             if not touch_btn.is_pressed:           # case the touch button is pressed
                 stopping_servos()                  # servos are stopped
@@ -1177,9 +1166,8 @@ def servo_solve_cube(moves, scrambling=False, print_out=s_debug, test=False):
         if stop_servos:                            # case there is a stop request for servos
             break                                  # the foor loop in interrupted
         
-        if i%2==0 and not stop_servos:             # string index having robot movements
-            # calls the display progress bar function. SCRAMBLING is displayed when that fuction is used
-            s_disp.display_progress_bar(remaining_moves[i], scrambling)
+        # calls the display progress bar function. SCRAMBLING is displayed when that fuction is used
+        s_disp.display_progress_bar(progress[n], scrambling)
         
         curpos = ''
         if b_servo_CCW_pos:
@@ -1196,11 +1184,12 @@ def servo_solve_cube(moves, scrambling=False, print_out=s_debug, test=False):
             curpos+='+'
         else:
             curpos+=' '
-        #move_buffer+=moves[i]
-        if not scrambling: 
-            mqtt_publisher.send_command(moves[i], i + 1,string_len)
-        if moves[i]=='F':                          # case there is a flip on the move string
-            flips=int(moves[i+1])                  # number of flips
+        
+        op, arg = ops[n], args[n]                  # op code and argument of the robot move
+        if not scrambling:                         # case of solving (moves telemetry)
+            move_telemetry.move(n)                 # robot move event (published once per time window)
+        if op == rm.OP_F:                          # case there is a flip on the move string
+            flips=arg                              # number of flips
             if print_out:                          # case the print_out variable is set true
                 print(f'To do F{flips}')           # for print_out
             
@@ -1220,26 +1209,19 @@ def servo_solve_cube(moves, scrambling=False, print_out=s_debug, test=False):
                 if f<(flips-1):                    # case there are further flippings to do
                     flip_to_read()                 # lifter is lowered stopping the top cover in read position (cube not constrained)
 
-                if f==(flips-1) and string_len-(i+2)>0:   # case it's the last flip and there is a following command on the move string
-                    if moves[i+2]=='R':            # case the next action is a 1st layer cube rotation
+                if f==(flips-1) and n+1<n_ops:     # case it's the last flip and there is a following robot move
+                    if ops[n+1]==rm.OP_R:          # case the next action is a 1st layer cube rotation
                         flip_to_close()            # top cover is lowered to close position
-                    elif moves[i+2]=='S':          # case the next action is a cube spin
+                    elif ops[n+1]==rm.OP_S:        # case the next action is a cube spin
                         flip_to_open()             # top cover is lowered to open position 
 
 
-        elif moves[i]=='S':                        # case there is a cube spin on the move string
-            direction=int(moves[i+1])              # rotation direction is retrived
+        elif op == rm.OP_S:                        # case there is a cube spin on the move string
+            direction=arg                          # rotation direction is retrived
             if print_out:                          # case the print_out variable is set true
                 print(f'To do S{direction} {curpos}')       # for print_out
 
-            if direction==4:                       # case the direction is CCW
-                set_dir='CCW2'                     # CCW directio is assigned to the variable
-            elif direction==3:                     # case the direction is CCW
-                set_dir='CCW'                      # CCW directio is assigned to the variable
-            elif direction==0:                     # case the direction is CCW
-                set_dir='CW2'                      # CCW directio is assigned to the variable
-            else:                                  # case the direction is CW
-                set_dir='CW'                       # CW directio is assigned to the variable
+            set_dir=directions.get(direction, 'CW')  # direction label for the spin
             
             if b_servo_home==True:                 # case bottom servo is at home
                 spin_out(set_dir)                  # call to function to spin the full cube to full CW or CCW
@@ -1249,19 +1231,12 @@ def servo_solve_cube(moves, scrambling=False, print_out=s_debug, test=False):
                 spin_home()                        # call to function to spin the full cube toward home position
 
 
-        elif moves[i]=='R':                        # case there is a cube 1st layer rotation
-            direction=int(moves[i+1])              # rotation direction is retrived   
+        elif op == rm.OP_R:                        # case there is a cube 1st layer rotation
+            direction=arg                          # rotation direction is retrived   
             if print_out:                          # case the print_out variable is set true
                 print(f'To do R{direction} {curpos}')  # for print_out
 
-            if direction==4:                       # case the direction is CCW
-                set_dir='CCW2'                     # CCW directio is assigned to the variable
-            elif direction==3:                     # case the direction is CCW
-                set_dir='CCW'                      # CCW directio is assigned to the variable
-            elif direction==0:                     # case the direction is CCW
-                set_dir='CW2'                      # CCW directio is assigned to the variable
-            else:                                  # case the direction is CW
-                set_dir='CW'                       # CW directio is assigned to the variable
+            set_dir=directions.get(direction, 'CW')  # direction label for the rotation
             
             if b_servo_home==True:                 # case bottom servo is at home
                 rotate_out(set_dir)                # call to function to rotate cube 1st layer on the set direction, moving out from home              
@@ -1288,7 +1263,9 @@ def servo_solve_cube(moves, scrambling=False, print_out=s_debug, test=False):
             else:                                  # case the robot had no movements to perform (i.e. cube already solved)
                 print("\nNo servo movements needed") #feedback is printed to the terminal
 
-    robot_time_=(time.time()-start_time)           # robot time is calculated
+    if not scrambling:                             # case of solving (moves telemetry)
+        move_telemetry.finish(completed=not stop_servos)   # remaining robot moves events and progress are published
+    robot_time_=(clock.time()-start_time)           # robot time is calculated
     
     return robot_status_, robot_time_              # function returns the cube status and the robot time
 
@@ -1638,17 +1615,15 @@ def test_set_of_movements():
     global touch_btn, robot_init_status
     
     # buttons at the display board, used as stop buttons when servos setting/testing via GUI
-    from gpiozero import Button     # library to manage GPIO
- 
     try:                            # tentative
         touch_btn                   # name of touch button
     except NameError:               # case a name error exception is raised
-        touch_btn = Button(26)      # touch button object is created
+        touch_btn = backend.button(26)  # touch button object is created
     
     print('\nDemonstration of the robot servos current settings, by solving a predefined scrambled cube')   
     print('Press the touch button to interrupt the test')
     
-    movements= 'F1R1S3R1F3S3R1F1S4R0F3S4R0S3F1S3R0S3F3R1F1S4R0F1S3R1F3S4R0F1S4R0S3F1R3F1S1R3S1F1R3F2S1R3S1F1R3S1F1R3S1F3R3F3R1F2R1S3R1F1S3R1F2S4R0'
+    movements= test_moves                # predefined robot movements string
     # to complete the moves of this string CUBOTino takes 1m:8secs (18/04/2022)
     
     s_debug= False  # True               # boolean for s_debug printouts purpose
@@ -0,0 +1,214 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+# Servos and GPIO backends for Cubotino_T_servos.py
+#
+# GpioBackend drives the real servos, led and buttons via gpiozero (pigpio pin factory) and RPi.GPIO.
+# SimBackend has the same interface, without any hardware: The servos record the commanded positions
+# and the time is a virtual clock, that advances on sleep instead of waiting.
+# Both clocks have a cancellable wait(secs, event): The servos timers wait on the stop event, so that a stop
+# request wakes up the servos sequence immediately, instead of at the end of the current servo timer.
+# With the SimBackend, a full robot solving sequence is replayed in milliseconds, and the robot time is
+# the one the real robot would take with the same servos timers.
+#
+# Example:
+#   import Cubotino_T_servos as servo
+#   import Cubotino_T_servos_backend as sb
+#   servo.set_backend(sb.SimBackend())
+#
+#############################################################################################################
+"""
+
+
+import time                                   # time library, the real clock
+
+
+
+
+class Clock:
+    """ Real clock, with the time() and sleep() of the time library, and a cancellable wait."""
+
+    def time(self):
+        return time.time()                    # current time
+
+    def sleep(self, secs):
+        if secs > 0:                          # case of a positive sleeping time
+            time.sleep(secs)
+
+    def wait(self, secs, event):
+        """ Waits secs seconds, or less when the event (threading.Event) is set. Returns True when the event is set."""
+        if secs > 0:                          # case of a positive waiting time
+            return event.wait(secs)           # the thread sleeps, and it is woken up by event.set()
+        return event.is_set()
+
+
+
+
+class VirtualClock:
+    """ Clock with the same time() and sleep() of the time library: sleep advances the time, without waiting."""
+
+    def __init__(self, start=0.0):
+        self.t = start                        # virtual time, in seconds
+
+    def time(self):
+        return self.t                         # current virtual time
+
+    def sleep(self, secs):
+        if secs > 0:                          # case of a positive sleeping time
+            self.t += secs                    # virtual time is advanced
+
+    def wait(self, secs, event):
+        """ Advances the time by secs, unless the event is already set. Returns True when the event is set."""
+        if event.is_set():                    # case the event is set (i.e. stop request before waiting)
+            return True
+        self.sleep(secs)                      # virtual time is advanced
+        return event.is_set()
+
+    def reset(self, start=0.0):
+        self.t = start                        # virtual time is set back to start
+
+
+
+
+class GpioBackend:
+    """ Real servos, led and buttons, based on gpiozero and RPi.GPIO libraries."""
+
+    simulated = False                         # real hardware
+
+    def __init__(self):
+        self.clock = Clock()                  # real time
+        import RPi.GPIO as GPIO               # import RPi GPIO library
+        GPIO.setmode(GPIO.BCM)                # setting GPIO pins as "Broadcom SOC channel" number, these are the numbers after "GPIO"
+        GPIO.setwarnings(False)               # setting GPIO to don't return allarms
+        self.GPIO = GPIO
+        self.factory = None                   # pigpio pin factory, created once the pigpiod server runs
+
+    def pin_factory(self):
+        """ Returns the pigpio pin factory, to use hardare timers on PWM (to avoid servo jitter)."""
+        if self.factory is None:              # case the pin factory does not exist yet
+            from gpiozero.pins.pigpio import PiGPIOFactory   # pigpio library is used, to use hardare timers on PWM
+            self.factory = PiGPIOFactory()    # pin factory setting to use hardware timers, to avoid servo jitter
+        return self.factory
+
+    def servo(self, pin, initial_value, min_pulse_width, max_pulse_width, name=''):
+        """ Returns a servo object, the pulse widths are in seconds."""
+        from gpiozero import Servo            # import modules for the PWM part
+        return Servo(pin,                                   # GPIO pin associated to the servo
+                     initial_value = initial_value,         # servo positioned to initial_value
+                     min_pulse_width = min_pulse_width,     # min Pulse Width the servo reacts to
+                     max_pulse_width = max_pulse_width,     # max Pulse Width the servo reacts to
+                     frame_width=0.020,                     # min pulse width variation aceepted
+                     pin_factory=self.pin_factory())        # way to use hardware based timers for the PWM
+
+    def pwm_led(self, pin):
+        """ Returns a PWM led object."""
+        from gpiozero import PWMLED           # import modules for the PWM part
+        # NOTE: High freq. on the led PWM prevents camera from seeing flickering
+        return PWMLED(pin, active_high=True, initial_value=0, frequency=5000000, pin_factory=self.pin_factory())
+
+    def button(self, pin):
+        """ Returns a button object."""
+        from gpiozero import Button           # library to manage GPIO
+        return Button(pin)
+
+    def set_low(self, pins):
+        """ Sets the GPIO pins as output, and forces them to low."""
+        for pin in pins:                      # iteration over the pins
+            self.GPIO.setup(pin, self.GPIO.OUT, initial=self.GPIO.LOW)
+
+
+
+
+class SimServo:
+    """ Simulated servo: Each commanded position is recorded, with the (virtual) time and the servo name."""
+
+    def __init__(self, name, backend, initial_value=0):
+        self.name = name                      # servo name
+        self.backend = backend                # backend recording the positions
+        self._value = None                    # servo position (None when detached)
+        self.value = initial_value            # servo positioned to initial_value
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value                   # servo position
+        self.backend.log.append((self.backend.clock.time(), self.name, value))
+
+    def detach(self):
+        self.value = None                     # PWM is stopped
+
+    def close(self):
+        self._value = None
+
+
+
+
+class SimLed:
+    """ Simulated PWM led."""
+
+    def __init__(self):
+        self.value = 0                        # led brightness
+
+    def off(self):
+        self.value = 0
+
+
+
+
+class SimButton:
+    """ Simulated button, never touched."""
+
+    is_pressed = True                         # same reading as the real touch button when not touched
+
+
+
+
+class NullDisplay:
+    """ Display replacement, without any display: All the methods do nothing."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+
+
+class SimBackend:
+    """ Simulated servos, led and buttons, with a virtual clock.
+        The log is a list of (time, servo name, position), one per commanded servo position."""
+
+    simulated = True                          # no hardware
+
+    def __init__(self, clock=None):
+        self.clock = clock if clock is not None else VirtualClock()   # virtual clock, unless a clock is given
+        self.log = []                         # commanded servos positions
+        self.display = NullDisplay()          # display replacement
+        self.servos = {}                      # simulated servos, per GPIO pin
+
+    def servo(self, pin, initial_value, min_pulse_width, max_pulse_width, name=''):
+        """ Returns a simulated servo, named as per name argument (or after the GPIO pin)."""
+        self.servos[pin] = SimServo(name if name else f'gpio{pin}', self, initial_value)
+        return self.servos[pin]
+
+    def pwm_led(self, pin):
+        return SimLed()
+
+    def button(self, pin):
+        return SimButton()
+
+    def set_low(self, pins):
+        pass
+
+    def reset(self):
+        """ Clears the log and sets the clock back to zero."""
+        self.log.clear()
+        if hasattr(self.clock, 'reset'):      # case the clock is a virtual one
+            self.clock.reset()
+
+    def moves(self, name):
+        """ Returns the list of (time, position) commanded to the servo name."""
+        return [(t, value) for t, servo_name, value in self.log if servo_name == name]
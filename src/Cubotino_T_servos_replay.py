@@ -0,0 +1,134 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+# Replays the robot solving sequences on simulated servos (Cubotino_T_servos_backend.SimBackend).
+#
+# The servos functions of Cubotino_T_servos.py are executed as on the robot, while the servos timers advance
+# a virtual clock instead of sleeping: Each solving sequence is replayed in few milliseconds.
+# For each solution, the simulated robot time (sum of the servos timers) is compared to the estimated one
+# (Cubotino_T_servos.estimate_time); The commanded servos positions are in the simulated backend log.
+#
+# The solutions are taken from a corpus file (Cubotino_T_corpus.py), or the example solutions are used.
+#
+# Example: python Cubotino_T_servos_replay.py --corpus corpus_seed1_10000.npz --sets random maxdepth
+#
+#############################################################################################################
+"""
+
+
+import os, sys, csv, json, time               # python libraries
+import Cubotino_T_moves as rm                 # custom library, traslates the cuber solution string in robot movements string
+import Cubotino_T_servos as servo             # custom library controlling Cubotino servos
+import Cubotino_T_servos_backend as sb        # custom library, with the simulated servos backend
+
+
+row = "#"*95                                  # string of characters used as separator
+
+
+
+
+def load_servo_settings(fname):
+    """ Returns the servos settings dict, from the servos settings file, with the values as float.
+        The servos settings file is read directly, as this script is meant to also run on PCs (no GPIO)."""
+
+    with open(fname, "r") as f:               # servo_settings file is opened in reading mode
+        return {key: float(value) for key, value in json.load(f).items()}   # json file is parsed to a local dict
+
+
+
+
+def init_sim(servo_settings, f_to_close_mode=False):
+    """ Sets the simulated servos backend, and initializes the servos with the servo_settings dict.
+        Returns the simulated backend and the servos timers."""
+
+    backend = servo.set_backend(sb.SimBackend())   # simulated servos, with virtual clock
+    ret, timer = servo.init_servo(print_out=False, start_pos='read', f_to_close_mode=f_to_close_mode,
+                                  servo_settings=servo_settings)
+    return backend, timer
+
+
+
+
+def replay(backend, timer, solution):
+    """ Replays the robot moves of the solution on the simulated servos.
+        Returns the robot moves, the robot status, the simulated robot time and the estimated robot time."""
+
+    robot, moves, tot_moves, opt = rm.robot_required_moves(solution, '', simulation=False)
+    servo.servo_start_pos(start_pos='read')   # servos to the start position, as after the cube status reading
+    backend.reset()                           # log cleared and virtual clock set to zero
+    robot_status, robot_time = servo.servo_solve_cube(moves, scrambling=True)   # robot solver is called
+    est_time = servo.estimate_time(moves, timer)   # estimated robot time
+    return moves, robot_status, robot_time, est_time
+
+
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    # argument parser object creation
+    parser = argparse.ArgumentParser(description='Replays robot solving sequences on simulated servos')
+    parser.add_argument("--corpus", type=str, default='',
+                        help="Corpus file (Cubotino_T_corpus.py) with the solutions (default the example solutions)")
+    parser.add_argument("--sets", type=str, nargs='*', default=[],
+                        help="Corpus sets to replay (default all)")
+    parser.add_argument("--servo_settings", type=str, default='',
+                        help="Servos settings file (default Cubotino_T_servo_settings.txt)")
+    parser.add_argument("--fast", action='store_true',
+                        help="From Flip-Up to close in one step instead of two")
+    parser.add_argument("-o", "--out", type=str, default='',
+                        help="CSV file to save the replay results")
+    args = parser.parse_args()
+
+    fname = args.servo_settings
+    if fname == '':                           # case the servos settings file is not in argument
+        fname = 'Cubotino_T_servo_settings.txt'
+        if not os.path.exists(fname):         # case the robot servos settings file does not exist
+            fname = 'Cubotino_T_servo_settings_default.txt'
+
+    if args.corpus != '':                     # case a corpus file is in argument
+        import Cubotino_T_corpus as corpus    # custom library, seeded cube status and their solutions
+        solutions = corpus.load(args.corpus, args.sets)['solutions']
+    else:                                     # case no corpus file in argument
+        solutions = list(rm.example_solutions)
+
+    backend, timer = init_sim(load_servo_settings(fname), args.fast)
+
+    results = []                              # list of replay results
+    start = time.time()                       # replay start time
+    for s in solutions:                       # iteration over the solutions
+        if s[:5] == 'Error':                  # case the corpus has a solver error
+            continue
+        moves, robot_status, robot_time, est_time = replay(backend, timer, s)
+        delta = round(100*(robot_time-est_time)/robot_time, 2) if robot_time else 0
+        results.append({'solution': s, 'robot_moves': str(moves), 'tot_moves': moves.tot_moves,
+                        'robot_status': robot_status, 'sim_time': round(robot_time, 3),
+                        'est_time': est_time, 'delta_pct': delta, 'servo_cmds': len(backend.log)})
+    elapsed = time.time() - start             # replay elapsed time
+
+    if len(results) == 0:                     # case of no solutions to replay
+        print("No solutions to replay")
+        sys.exit(1)
+
+    if args.out != '':                        # case a CSV file is in argument
+        with open(args.out, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+            writer.writeheader()
+            writer.writerows(results)
+
+    deltas = [abs(r['delta_pct']) for r in results]
+    failed = [r for r in results if r['robot_status'] != 'Cube_solved']
+    print(row)
+    print(f"Replayed {len(results):,d} solving sequences in {round(1000*elapsed, 1)} ms, on simulated servos")
+    print(f"Simulated robot time (s): mean {round(sum(r['sim_time'] for r in results)/len(results), 2)}"
+          f"   max {max(r['sim_time'] for r in results)}")
+    print(f"Estimated robot time (s): mean {round(sum(r['est_time'] for r in results)/len(results), 2)}"
+          f"   max {max(r['est_time'] for r in results)}")
+    print(f"Estimated vs simulated time delta (%): mean {round(sum(deltas)/len(deltas), 2)}   max {max(deltas)}")
+    print(f"Sequences not completed: {len(failed)}")
+    if args.out != '':                        # case a CSV file is in argument
+        print(f"Results saved at: {args.out}")
+    print(row)
@@ -0,0 +1,222 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+# Motion scheduler for the two servos: Overlaps the servos actions, where allowed by the safety constraints.
+#
+# servo_solve_cube() drives the servos strictly one action after the other, with a sleep after each command.
+# The scheduler turns the robot moves into a timeline of per-servo actions:
+#  1) the servos commands (servo, position, sleep time) are planned by a private instance of Cubotino_T_servos.py
+#     on simulated servos, synced to the state of the real one: Same functions, same commands, no servos movement.
+#  2) each command is an action of its servo, with the sleep time as duration; Actions moving back the servo by
+#     the release angle (bottom servo after a rotation, top servo after closing) are release actions.
+#  3) the actions are scheduled with these constraints:
+#      - actions of the same servo are sequential
+#      - bottom servo actions start once the top servo actions are completed (b_servo_operable)
+#      - top servo actions start once the bottom servo movements are completed (b_servo_stopped), while the
+#        bottom servo release can overlap the top servo action (i.e. top cover rising while the holder releases)
+# The timeline is played on the servos, each command at its scheduled start time.
+#
+# Example: python Cubotino_T_servos_scheduler.py --corpus corpus_seed1_10000.npz
+#
+#############################################################################################################
+"""
+
+
+import os, time, importlib.util               # python libraries
+import Cubotino_T_moves as rm                 # custom library, traslates the cuber solution string in robot movements string
+import Cubotino_T_servos as servo             # custom library controlling Cubotino servos
+import Cubotino_T_servos_backend as sb        # custom library, with the simulated servos backend
+
+
+# servos state variables of Cubotino_T_servos.py, synced between the real servos and the planner
+state = ('t_top_cover', 'b_servo_operable', 'b_servo_stopped', 'b_servo_home', 'b_servo_CW_pos', 'b_servo_CCW_pos',
+         'flip_to_close_one_step')
+
+_planner = None                               # private instance of Cubotino_T_servos.py, on simulated servos
+_planner_key = None                           # servos settings the planner has been initialized with
+row = "#"*95                                  # string of characters used as separator
+
+
+
+
+def planner(servo_settings, f_to_close_mode=False):
+    """ Returns a private instance of Cubotino_T_servos.py, on simulated servos, initialized with the servo_settings.
+        The instance is re-initialized when the servos settings change."""
+
+    global _planner, _planner_key
+    key = (tuple(sorted(servo_settings.items())), f_to_close_mode)   # servos settings identifier
+    if _planner is None or key != _planner_key:   # case the planner does not exist or has other settings
+        spec = importlib.util.find_spec('Cubotino_T_servos')   # same source as the real servos module
+        _planner = importlib.util.module_from_spec(spec)       # separated module, with its own globals
+        spec.loader.exec_module(_planner)
+        _planner.set_backend(sb.SimBackend()) # simulated servos, with virtual clock
+        _planner.init_servo(print_out=False, start_pos='read', f_to_close_mode=f_to_close_mode,
+                            servo_settings=dict(servo_settings))
+        _planner_key = key
+    return _planner
+
+
+
+
+def plan(moves, src=servo):
+    """ Plans the servos commands of the robot moves, starting from the state of the servos module src.
+        Returns a dict with the servos start positions, the commands log (time, servo name, position),
+        the sequential end time and the servos state at the end."""
+
+    p = planner(src.servos_settings, src.flip_to_close_one_step)
+    for name in state:                        # iteration over the servos state variables
+        setattr(p, name, getattr(src, name))  # planner state is synced to the src one
+    p.stop_servos = False                     # planner servos can be operated
+    p.stop_event.clear()
+    p.t_servo.value = src.t_servo.value       # planner servos positions are synced to the src ones
+    p.b_servo.value = src.b_servo.value
+    start = {'t_servo': p.t_servo.value, 'b_servo': p.b_servo.value}
+    p.backend.reset()                         # log cleared and virtual clock set to zero
+    p.servo_solve_cube(moves, scrambling=True)   # servos commands are planned
+    return {'start': start, 'log': list(p.backend.log), 'end': p.clock.time(),
+            'state': {name: getattr(p, name) for name in state}}
+
+
+
+
+def timeline(planned, servo_settings, overlap=True):
+    """ Returns the timeline of the planned servos commands: A list of actions dict (servo, position, kind,
+        duration, start), sorted by start time. When overlap is False, the timeline is the sequential one."""
+
+    s = servo_settings
+    b_rel = {round(s['b_servo_CCW'] + s['b_rel_CCW'], 3): s['b_servo_CCW'],   # release position: rotation position
+             round(s['b_servo_CW'] - s['b_rel_CW'], 3): s['b_servo_CW']}
+    b_extra = (round(s['b_home'] - s['b_extra_home_CW'], 3), round(s['b_home'] + s['b_extra_home_CCW'], 3))
+    t_rel = round(s['t_servo_close'] - s['t_servo_rel_delta'], 3)
+
+    log = planned['log']
+    pos = dict(planned['start'])              # servos positions
+    actions = []
+    for i, (t, name, value) in enumerate(log):    # iteration over the planned commands
+        duration = (log[i+1][0] if i+1 < len(log) else planned['end']) - t   # sleep time after the command
+        prev = pos.get(name)
+        if name == 'b_servo':                 # case of bottom servo
+            release = (b_rel.get(value) == prev) or (value == s['b_home'] and prev in b_extra)
+        else:                                 # case of top servo
+            release = (value == t_rel and prev == s['t_servo_close'])
+        actions.append({'servo': name, 'position': value, 'kind': 'release' if release else 'move',
+                        'duration': round(duration, 4), 'start': round(t, 4)})
+        pos[name] = value
+
+    if overlap:                               # case of overlapped timeline
+        end = {'t_servo': 0.0, 'b_servo': 0.0}        # end time of the last action, per servo
+        b_move_end = 0.0                      # end time of the last bottom servo movement (not release)
+        for a in actions:                     # iteration over the actions, in planned order
+            if a['servo'] == 'b_servo':       # case of bottom servo action
+                a['start'] = max(end['b_servo'], end['t_servo'])
+            else:                             # case of top servo action
+                a['start'] = max(end['t_servo'], b_move_end)
+            end[a['servo']] = a['start'] + a['duration']
+            if a['servo'] == 'b_servo' and a['kind'] == 'move':   # case of bottom servo movement
+                b_move_end = end['b_servo']
+        actions.sort(key=lambda a: a['start'])    # stable sort, planned order for same start time
+    return actions
+
+
+
+
+def duration(actions):
+    """ Returns the total time of the timeline."""
+    return round(max((a['start'] + a['duration'] for a in actions), default=0), 3)
+
+
+
+
+def play(actions, src=servo):
+    """ Plays the timeline on the servos of the servos module src: Each command is sent at its start time.
+        The waits are cancellable (src.stop_event): Returns False when stopped, otherwise True."""
+
+    clock = src.clock                         # servos clock (virtual clock on simulated servos)
+    t_ref = clock.time()                      # timeline start time
+    servos = {'t_servo': src.t_servo, 'b_servo': src.b_servo}
+    for a in actions:                         # iteration over the actions, sorted by start time
+        if src.stop_servos or clock.wait(t_ref + a['start'] - clock.time(), src.stop_event):   # waits for the action start time
+            return False                      # case there is a stop request for servos
+        servos[a['servo']].value = a['position']   # servo command
+    return not clock.wait(t_ref + duration(actions) - clock.time(), src.stop_event)   # waits for the last action to complete
+
+
+
+
+def solve_overlapped(moves, src=servo):
+    """ Plans the robot moves, and plays the overlapped timeline on the servos of src.
+        The servos state of src is updated as after servo_solve_cube. Returns robot status and robot time."""
+
+    start_time = src.clock.time()             # start time is assigned
+    planned = plan(moves, src)
+    if not play(timeline(planned, src.servos_settings), src):   # case the robot has been stopped
+        return 'Robot_stopped', src.clock.time() - start_time
+    for name, value in planned['state'].items():   # iteration over the servos state at the end
+        setattr(src, name, value)             # servos state as after servo_solve_cube
+    return 'Cube_solved', src.clock.time() - start_time
+
+
+
+
+if __name__ == "__main__":
+    """ Reports the sequential and the overlapped robot time, on a corpus or on the example solutions."""
+
+    import argparse
+    import Cubotino_T_servos_replay as replay # custom library, to replay robot moves on simulated servos
+
+    # argument parser object creation
+    parser = argparse.ArgumentParser(description='Sequential vs overlapped servos timeline, on simulated servos')
+    parser.add_argument("--corpus", type=str, default='',
+                        help="Corpus file (Cubotino_T_corpus.py) with the solutions (default the example solutions)")
+    parser.add_argument("--sets", type=str, nargs='*', default=[],
+                        help="Corpus sets to use (default all)")
+    parser.add_argument("--servo_settings", type=str, default='',
+                        help="Servos settings file (default Cubotino_T_servo_settings.txt)")
+    parser.add_argument("--fast", action='store_true',
+                        help="From Flip-Up to close in one step instead of two")
+    args = parser.parse_args()
+
+    fname = args.servo_settings
+    if fname == '':                           # case the servos settings file is not in argument
+        fname = 'Cubotino_T_servo_settings.txt'
+        if not os.path.exists(fname):         # case the robot servos settings file does not exist
+            fname = 'Cubotino_T_servo_settings_default.txt'
+
+    if args.corpus != '':                     # case a corpus file is in argument
+        import Cubotino_T_corpus as corpus    # custom library, seeded cube status and their solutions
+        solutions = corpus.load(args.corpus, args.sets)['solutions']
+    else:                                     # case no corpus file in argument
+        solutions = list(rm.example_solutions)
+
+    backend, timer = replay.init_sim(replay.load_servo_settings(fname), args.fast)   # simulated servos
+    seq_times, ovl_times, est_times, mismatch = [], [], [], 0
+    start = time.time()                       # start time
+    for s in solutions:                       # iteration over the solutions
+        if s[:5] == 'Error':                  # case the corpus has a solver error
+            continue
+        moves = rm.robot_required_moves(s, '', simulation=False)[1]
+        servo.servo_start_pos(start_pos='read')   # servos to the start position, as after the cube status reading
+        planned = plan(moves)
+        seq_times.append(planned['end'])      # sequential time
+        actions = timeline(planned, servo.servos_settings)
+        ovl_times.append(duration(actions))   # overlapped time
+        est_times.append(servo.estimate_time(moves, timer))
+        solve_overlapped(moves)               # overlapped timeline played on the simulated servos
+        final = {name: value for t, name, value in planned['log']}   # servos positions at the end, as planned
+        if final != {'t_servo': servo.t_servo.value, 'b_servo': servo.b_servo.value}:
+            mismatch += 1                     # servos positions differ from the sequential ones
+    elapsed = time.time() - start
+
+    n = len(seq_times)
+    saved = [a - b for a, b in zip(seq_times, ovl_times)]
+    print(row)
+    print(f"Scheduled {n:,d} solving sequences in {round(elapsed, 2)} secs")
+    print(f"Estimated robot time (s):         mean {round(sum(est_times)/n, 2)}")
+    print(f"Sequential servos timeline (s):   mean {round(sum(seq_times)/n, 2)}   max {round(max(seq_times), 2)}")
+    print(f"Overlapped servos timeline (s):   mean {round(sum(ovl_times)/n, 2)}   max {round(max(ovl_times), 2)}")
+    print(f"Time saved by overlapping (s):    mean {round(sum(saved)/n, 2)}   max {round(max(saved), 2)}"
+          f"   ({round(100*sum(saved)/sum(seq_times), 2)} %)")
+    print(f"Sequences ending at different servos positions: {mismatch}")
+    print(row)
@@ -0,0 +1,131 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+# Stop latency benchmark: Time from the stop request (Cubotino_T_servos.stopping_servos) to the servos sequence
+# being interrupted, while servo_solve_cube() is running.
+#
+# The servos are simulated (Cubotino_T_servos_backend.SimBackend), yet on the real clock: The servos timers really
+# wait, as on the robot. The solving sequence runs on a thread, and the stop is requested after a random delay.
+# Two clocks are compared:
+#  - event: the servos timers wait on the stop event, and they are woken up by the stop request
+#  - polling: the servos timers ignore the stop event, as with time.sleep(): The stop request is only noticed
+#    once the current servos movement function is completed (reference)
+# For each trial, the latency and the servos commands sent after the stop request are measured.
+# The trials run the example solutions, or the corpus solutions (Cubotino_T_corpus.py) with --corpus, in turn.
+#
+# Example: python Cubotino_T_servos_stop_bench.py --trials 20
+#
+#############################################################################################################
+"""
+
+
+import os, time, random, threading            # python libraries
+import Cubotino_T_moves as rm                 # custom library, traslates the cuber solution string in robot movements string
+import Cubotino_T_servos as servo             # custom library controlling Cubotino servos
+import Cubotino_T_servos_backend as sb        # custom library, with the simulated servos backend
+import Cubotino_T_servos_replay as replay     # custom library, to replay robot moves on simulated servos
+
+
+row = "#"*95                                  # string of characters used as separator
+
+
+
+
+class PollingClock(sb.Clock):
+    """ Real clock ignoring the stop event while waiting, as the servos timers did with time.sleep()."""
+
+    def wait(self, secs, event):
+        self.sleep(secs)                      # the thread sleeps for the full time
+        return False                          # stop request is left to the servos movement functions checks
+
+
+
+
+def trial(backend, moves, delay):
+    """ Runs the robot moves on a thread, and requests the stop after delay seconds.
+        Returns the stop latency (secs), the servos commands after the stop request, and the robot status."""
+
+    servo.servo_start_pos(start_pos='read')   # servos to the start position, as after the cube status reading
+    backend.reset()                           # log cleared
+    result = {}
+    solver = threading.Thread(target=lambda: result.update(status=servo.servo_solve_cube(moves, scrambling=True)[0]))
+    solver.start()
+    time.sleep(delay)                         # servos sequence is running
+    t_stop = time.time()                      # stop request time
+    servo.stopping_servos(print_out=False)    # stop request
+    solver.join()
+    latency = time.time() - t_stop            # time for servo_solve_cube to return
+    commands = sum(1 for t, name, value in backend.log if t > t_stop)   # servos commands after the stop request
+    return latency, commands, result.get('status')
+
+
+
+
+def bench(clock, servo_settings, sequences, delays, f_to_close_mode=False):
+    """ Returns the list of trial results, with the servos timers on clock. The trials run the robot moves
+        sequences in turn."""
+
+    backend = servo.set_backend(sb.SimBackend(clock=clock))   # simulated servos, on the real clock
+    servo.init_servo(print_out=False, start_pos='read', f_to_close_mode=f_to_close_mode, servo_settings=servo_settings)
+    return [trial(backend, sequences[i % len(sequences)], delay) for i, delay in enumerate(delays)]
+
+
+
+
+def stats(results):
+    """ Returns a report string of the trials results."""
+
+    latency = sorted(1000*r[0] for r in results)  # latencies in ms
+    p95 = latency[min(len(latency)-1, int(0.95*len(latency)))]
+    stopped = sum(1 for r in results if r[2] == 'Robot_stopped')
+    return (f"latency (ms) mean {round(sum(latency)/len(latency), 1):>7}   p95 {round(p95, 1):>7}"
+            f"   max {round(latency[-1], 1):>7}   commands after stop: {sum(r[1] for r in results):>3}"
+            f"   stopped {stopped}/{len(results)}")
+
+
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    # argument parser object creation
+    parser = argparse.ArgumentParser(description='Stop latency of the servos sequences, on simulated servos')
+    parser.add_argument("--corpus", type=str, default='',
+                        help="Corpus file (Cubotino_T_corpus.py) with the solutions (default the example solutions)")
+    parser.add_argument("--sets", type=str, nargs='*', default=[],
+                        help="Corpus sets to use (default all)")
+    parser.add_argument("--trials", type=int, default=10,
+                        help="Stop requests per clock")
+    parser.add_argument("--max_delay", type=float, default=3.0,
+                        help="Max delay of the stop request, from the sequence start (secs)")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="Seed of the random stop delays")
+    parser.add_argument("--servo_settings", type=str, default='',
+                        help="Servos settings file (default Cubotino_T_servo_settings.txt)")
+    parser.add_argument("--fast", action='store_true',
+                        help="From Flip-Up to close in one step instead of two")
+    args = parser.parse_args()
+
+    fname = args.servo_settings
+    if fname == '':                           # case the servos settings file is not in argument
+        fname = 'Cubotino_T_servo_settings.txt'
+        if not os.path.exists(fname):         # case the robot servos settings file does not exist
+            fname = 'Cubotino_T_servo_settings_default.txt'
+    servo_settings = replay.load_servo_settings(fname)
+
+    if args.corpus != '':                     # case a corpus file is in argument
+        import Cubotino_T_corpus as corpus    # custom library, seeded cube status and their solutions
+        solutions = corpus.load(args.corpus, args.sets)['solutions']
+    else:                                     # case no corpus file in argument
+        solutions = list(rm.example_solutions)
+    sequences = [rm.robot_required_moves(s, '', simulation=False)[1] for s in solutions if s[:5] != 'Error']
+    random.seed(args.seed)
+    delays = [random.uniform(0.2, args.max_delay) for i in range(args.trials)]   # stop request delays
+
+    print(row)
+    for name, clock in (('polling', PollingClock()), ('event', sb.Clock())):
+        print(f"{name:>8} {stats(bench(clock, servo_settings, sequences, delays, args.fast))}")
+    print(row)
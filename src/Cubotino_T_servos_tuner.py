@@ -0,0 +1,260 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+# Servos timers auto-tuner: Searches the shortest servos timers (sleep times) still handling the cube safely.
+#
+# Each servos timer (t_flip_open_time, b_spin_time, b_rotate_time, t_rel_time, etc) is binary searched, one at
+# the time, between zero and its current value: Each tentative value is tested by running the test robot moves
+# (Cubotino_T_servos.test_moves, plus the example solutions or the corpus solutions) and by checking the result.
+# Once the shortest passing value is found, a safety margin is added; The following timers are searched with
+# the already tuned ones in place.
+#
+# Checkers:
+#  - simulation (default): Simulated servos; The commanded servos positions are checked against a slew-rate model
+#    of the servos, meaning every servo command must come after the previous servos movements are completed.
+#    A custom checker can be passed as module:function, called as function(backend, start, servo_settings)
+#    where start has the servos positions at the start, and returning True when passing.
+#  - robot: Real servos; After each test run the user confirms the cube has been properly handled (not jammed,
+#    layers aligned): Place a cube on the robot before starting.
+#
+# The tuned timers are saved to the servos settings file (with a backup of the previous one) when --save is used;
+# Saving requires --robot or --checker, as the default simulated checker has never been measured on a robot.
+#
+# Example: python Cubotino_T_servos_tuner.py --margin 15
+#          python Cubotino_T_servos_tuner.py --robot --timers b_spin_time b_rotate_time --save
+#
+#############################################################################################################
+"""
+
+
+import os, sys, datetime                      # python libraries
+import Cubotino_T_moves as rm                 # custom library, traslates the cuber solution string in robot movements string
+import Cubotino_T_servos as servo             # custom library controlling Cubotino servos
+import Cubotino_T_servos_replay as replay     # custom library, to replay robot moves on simulated servos
+
+
+# servos timers that can be tuned, as per servos settings file
+timers = ('t_flip_to_close_time', 't_close_to_flip_time', 't_flip_open_time', 't_open_close_time', 't_rel_time',
+          'b_spin_time', 'b_rotate_time', 'b_rel_time')
+row = "#"*95                                  # string of characters used as separator
+
+
+
+
+class SlewRateChecker:
+    """ Checks the simulated servos log, based on a slew-rate model of the servos: A servo moving from position a to
+        position b takes settle + |b-a|/speed seconds (positions in gpiozero format, from -1 to 1).
+        The bottom servo is slower when the top cover is closed (cube layer rotation, loaded servo).
+        Each servo command has to come after the previous movements of both servos are completed."""
+
+    def __init__(self, t_speed=2.5, b_speed=2.0, b_loaded_speed=1.6, settle=0.08):
+        self.t_speed = t_speed                # top servo speed (position units per second)
+        self.b_speed = b_speed                # bottom servo speed, cube not constrained
+        self.b_loaded_speed = b_loaded_speed  # bottom servo speed, cube constrained by the top cover
+        self.settle = settle                  # servo settling time, after reaching the position
+        self.violation = ''                   # description of the first violation found
+
+    def __call__(self, backend, start, servo_settings):
+        pos = dict(start)                     # current servos positions
+        busy = dict.fromkeys(start, 0.0)      # time each servo completes its current movement
+        closed = servo_settings['t_servo_close'] - servo_settings['t_servo_rel_delta'] - 0.01  # top cover (nearly) closed
+        for t, name, value in backend.log:    # iteration over the commanded servos positions
+            if value is None:                 # case the servo is detached
+                continue
+            for other, t_end in busy.items(): # iteration over the servos
+                if t_end > t + 1e-6:          # case a servo is still moving
+                    self.violation = f'{name} commanded at {round(t,3)}s, while {other} moving until {round(t_end,3)}s'
+                    return False
+            if name == 't_servo':             # case of top servo
+                speed = self.t_speed
+            else:                             # case of bottom servo
+                loaded = pos.get('t_servo') is not None and pos['t_servo'] >= closed
+                speed = self.b_loaded_speed if loaded else self.b_speed
+            busy[name] = t + self.settle + abs(value - pos.get(name, value))/speed
+            pos[name] = value
+        end = backend.clock.time()            # end of the sequence
+        if max(busy.values()) > end + 1e-6:   # case a servo is still moving at the end
+            self.violation = f'servos moving until {round(max(busy.values()),3)}s, after the end at {round(end,3)}s'
+            return False
+        self.violation = ''
+        return True
+
+
+
+
+class UserChecker:
+    """ Asks the user whether the cube has been properly handled by the real servos."""
+
+    violation = 'cube not properly handled'
+
+    def __call__(self, backend, start, servo_settings):
+        answer = input('Cube properly handled (not jammed, layers aligned)? [y/n]: ')
+        ok = answer.strip().lower().startswith('y')
+        if not ok:                            # case of failure
+            input('Place the cube back on the robot, then press Enter: ')
+        return ok
+
+
+
+
+def load_checker(spec):
+    """ Returns the checker function from a 'module:function' string."""
+
+    import importlib
+    module, function = spec.split(':')
+    return getattr(importlib.import_module(module), function)
+
+
+
+
+def run_trial(backend, servo_settings, sequences):
+    """ Runs the robot moves sequences with the servo_settings timers. Returns the servos positions at the start,
+        or None when a sequence is not completed."""
+
+    servo.load_servos_parameters(False, servo_settings)   # servos timers under test
+    start = {s.name: s.value for s in getattr(backend, 'servos', {}).values()}   # simulated servos positions
+    if hasattr(backend, 'reset'):             # case of simulated backend
+        backend.reset()                       # log cleared and virtual clock set to zero
+    servo.servo_start_pos(start_pos='read')   # servos to the start position
+    for moves in sequences:                   # iteration over the robot moves sequences
+        robot_status, robot_time = servo.servo_solve_cube(moves, scrambling=True)
+        if robot_status != 'Cube_solved':     # case the sequence is not completed
+            return None
+        servo.servo_start_pos(start_pos='read')   # servos back to the start position, as after solving
+    return start
+
+
+
+
+def check(backend, checker, servo_settings, sequences):
+    """ Returns True when the robot moves sequences pass the checker, with the servo_settings timers."""
+
+    start = run_trial(backend, servo_settings, sequences)
+    return start is not None and bool(checker(backend, start, servo_settings))
+
+
+
+
+def tune(backend, checker, servo_settings, sequences, names=timers, margin=10, tol=0.01, print_out=True):
+    """ Binary searches the shortest passing value of each timer in names, and adds the margin (in percentage).
+        Tuned values are never bigger than the current ones. Returns the tuned servo_settings dict."""
+
+    s = dict(servo_settings)                  # servos settings being tuned
+    if not check(backend, checker, s, sequences):   # case the current servos settings do not pass
+        raise ValueError(f'Current servos settings do not pass the check: {getattr(checker, "violation", "")}')
+
+    for name in names:                        # iteration over the timers to tune
+        lo, hi = 0.0, s[name]                 # search range: hi is passing
+        while hi - lo > tol:                  # case the search range is bigger than the tolerance
+            mid = round((lo + hi)/2, 3)       # tentative value
+            if check(backend, checker, {**s, name: mid}, sequences):   # case the tentative value passes
+                hi = mid                      # search continues on shorter values
+            else:                             # case the tentative value fails
+                lo = mid                      # search continues on longer values
+            if print_out:                     # case print_out is set true
+                print(f'{name}: {mid} {"pass" if hi == mid else "fail"}')
+        tuned = min(round(hi*(1 + margin/100), 3), s[name])   # margin added, never longer than current value
+        if print_out:                         # case print_out is set true
+            print(f'{name}: {s[name]} --> {tuned} (shortest passing {hi})\n')
+        s[name] = tuned                       # tuned value is used for the following timers
+    return s
+
+
+
+
+def save_servo_settings(fname, servo_settings, tuned):
+    """ Saves the tuned servo settings to fname, after a backup copy of the current ones (as the servos GUI does)."""
+
+    from Cubotino_T_settings_manager import settings   # custom library managing the settings files (robot only)
+    
+    fname = os.path.join(settings.folder, fname)  # folder and file name of the servos settings
+    if os.path.exists(fname):                 # case the servo_settings file exists
+        stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')   # date_time for the backup file name
+        backup_fname = fname[:-4] + '_backup_' + stamp + '.txt'     # backup file name
+        print("\nSaving previous settings to backup file:", backup_fname)
+        settings.save_setting(backup_fname, dict(servo_settings), debug=False)  # current servo_settings are saved to a backup file
+        settings.backups_cleanup(fname, n=10) # calls the function that keeps the latest n backups
+    settings.save_setting(fname, dict(tuned), debug=False)   # tuned servo_settings are saved
+
+
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    # argument parser object creation
+    parser = argparse.ArgumentParser(description='Searches the shortest servos timers still handling the cube safely')
+    parser.add_argument("--servo_settings", type=str, default='',
+                        help="Servos settings file (default Cubotino_T_servo_settings.txt)")
+    parser.add_argument("--timers", type=str, nargs='*', default=list(timers), choices=timers,
+                        help="Timers to tune (default all)")
+    parser.add_argument("--margin", type=float, default=10,
+                        help="Safety margin added to the shortest passing timers, in percentage")
+    parser.add_argument("--tol", type=float, default=0.01,
+                        help="Binary search tolerance, in seconds")
+    parser.add_argument("--robot", action='store_true',
+                        help="Tunes on the real servos, the user checks the cube handling")
+    parser.add_argument("--checker", type=str, default='',
+                        help="Custom checker for the simulated servos, as module:function")
+    parser.add_argument("--corpus", type=str, default='',
+                        help="Corpus file (Cubotino_T_corpus.py) with the solutions (default the example solutions)")
+    parser.add_argument("--sets", type=str, nargs='*', default=[],
+                        help="Corpus sets to use (default all)")
+    parser.add_argument("--short", action='store_true',
+                        help="Only the test robot moves, without the example (or corpus) solutions")
+    parser.add_argument("--fast", action='store_true',
+                        help="From Flip-Up to close in one step instead of two")
+    parser.add_argument("--save", action='store_true',
+                        help="Saves the tuned timers to the servos settings file")
+    args = parser.parse_args()
+    if args.save and not (args.robot or args.checker):   # case of saving timers tuned on the default simulated checker
+        print("--save requires --robot or --checker: the default simulated checker is not measured on a robot")
+        sys.exit(1)
+
+    fname = args.servo_settings
+    if fname == '':                           # case the servos settings file is not in argument
+        fname = 'Cubotino_T_servo_settings.txt'
+        if not os.path.exists(fname) and not args.robot:   # case the robot servos settings file does not exist
+            fname = 'Cubotino_T_servo_settings_default.txt'
+    servo_settings = replay.load_servo_settings(fname)
+
+    sequences = [servo.test_moves]            # robot moves sequences for each test run
+    if not args.short:                        # case the solutions are also requested
+        if args.corpus != '':                 # case a corpus file is in argument
+            import Cubotino_T_corpus as corpus    # custom library, seeded cube status and their solutions
+            solutions = corpus.load(args.corpus, args.sets)['solutions']
+        else:                                 # case no corpus file in argument
+            solutions = list(rm.example_solutions)
+        sequences += [rm.robot_required_moves(s, '', simulation=False)[1] for s in solutions if s[:5] != 'Error']
+
+    if args.robot:                            # case of real servos
+        servo.init_servo(print_out=False, start_pos='read', f_to_close_mode=args.fast, servo_settings=servo_settings)
+        backend, checker = servo.backend, UserChecker()
+    else:                                     # case of simulated servos
+        backend, timer = replay.init_sim(servo_settings, args.fast)
+        checker = load_checker(args.checker) if args.checker else SlewRateChecker()
+
+    try:                                      # tentative
+        tuned = tune(backend, checker, servo_settings, sequences, args.timers, args.margin, args.tol)
+    except ValueError as e:                   # case the current servos settings do not pass
+        print(e)
+        sys.exit(1)
+
+    timer_old = servo.load_servos_parameters(False, servo_settings)   # servos timers before tuning
+    timer_new = servo.load_servos_parameters(False, tuned)            # servos timers after tuning
+    est_old = sum(servo.estimate_time(moves, timer_old) for moves in sequences)
+    est_new = sum(servo.estimate_time(moves, timer_new) for moves in sequences)
+    print(row)
+    print(f"{'timer':>22}{'current':>10}{'tuned':>10}")
+    for name in args.timers:                  # iteration over the tuned timers
+        print(f"{name:>22}{servo_settings[name]:>10}{tuned[name]:>10}")
+    print(f"\nEstimated time of the test sequences: {round(est_old,1)} s --> {round(est_new,1)} s")
+    if args.save:                             # case the tuned timers have to be saved
+        if fname.endswith('_default.txt'):    # case the servos settings are the default ones
+            fname = 'Cubotino_T_servo_settings.txt'  # the tracked default file is never overwritten
+        save_servo_settings(fname, servo_settings, tuned)
+        print(f"Tuned servos settings saved at: {fname}")
+    print(row)
@@ -43,6 +43,10 @@ parser.add_argument("-r", "--runs", type=int,
 parser.add_argument("--plot", action='store_true',
                     help="Enables a graphical animation")
 
+# --corpus argument is added to the parser
+parser.add_argument("--corpus", type=str,
+                    help="Corpus file (Cubotino_T_corpus.py) with the cube status to test")
+
 # --status argument is added to the parser
 parser.add_argument("-s", "--status", type=str,
                     help="Enter the cube status and test the solver")
@@ -55,7 +59,7 @@ args = parser.parse_args()   # argument parsed assignement
 
 
 def imports(plot):
-    global np, math, time, rm, servo, dt, os, path, pathlib
+    global np, math, time, rm, sim, corpus, servo, dt, os, path, pathlib
     
     import math                                   # math library
     import time                                   # time check
@@ -63,6 +67,8 @@ def imports(plot):
     import datetime as dt                         # used for timestamp
     import os.path, pathlib                       # folder names management
     import Cubotino_T_moves as rm                 # custom library, traslates the cuber solution string in robot movements string
+    import Cubotino_T_cube_sim as sim             # custom library, virtual cube manipulated by the robot movements
+    import Cubotino_T_corpus as corpus            # custom library, corpus of cube status with solutions
     import Cubotino_T_servos as servo             # custom library for the servos control
     if plot:                                      # case plot is set True (cube status sketch plotting to screen)
         global cv2                                # openCV library is set as global variable
@@ -159,42 +165,6 @@ def scramble():
 
 
 
-def cube_facelets_permutation(cube_status, move_type, direction):
-    """Function that updates the cube status, according to the move type the robot does
-       The 'ref' tuples provide the facelet current reference position to be used on the updated position.
-       As example, in case of flip, the resulting facelet 0 is the one currently in position 23 (ref[0]).
-       The initial cube orientation is not the one the robos has after the scanning process."""
-
-    if move_type == 'F':      # case the robot move is a cube flip (complete cube rotation around L-R horizontal axis) 
-        ref=(53,52,51,50,49,48,47,46,45,11,14,17,10,13,16,9,12,15,0,1,2,3,4,5,6,7,8,18,
-             19,20,21,22,23,24,25,26,42,39,36,43,40,37,44,41,38,35,34,33,32,31,30,29,28,27)
-    
-    elif move_type == 'S':    # case the robot move is a spin (complete cube rotation around vertical axis)
-        if direction == '1':  # case spin is CW
-            ref=(2,5,8,1,4,7,0,3,6,18,19,20,21,22,23,24,25,26,36,37,38,39,40,41,42,43,44,
-                 33,30,27,34,31,28,35,32,29,45,46,47,48,49,50,51,52,53,9,10,11,12,13,14,15,16,17)
-        elif direction == '3':   # case spin is CCW
-            ref=(6,3,0,7,4,1,8,5,2,45,46,47,48,49,50,51,52,53,9,10,11,12,13,14,15,16,17,
-                 29,32,35,28,31,34,27,30,33,18,19,20,21,22,23,24,25,26,36,37,38,39,40,41,42,43,44)   
-    
-    elif move_type == 'R':    # case the robot move is a rotation (lowest layer rotation versus mid and top ones) 
-        if direction == '1':  # case 1st layer rotation is CW
-            ref=(0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,24,25,26,18,19,20,21,22,23,42,43,44,
-                 33,30,27,34,31,28,35,32,29,36,37,38,39,40,41,51,52,53,45,46,47,48,49,50,15,16,17)
-        elif direction == '3':   # case 1st layer rotation is CCW
-            ref=(0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,51,52,53,18,19,20,21,22,23,15,16,17,
-                 29,32,35,28,31,34,27,30,33,36,37,38,39,40,41,24,25,26,45,46,47,48,49,50,42,43,44)
-    
-    new_status = ""              # empty string to generate the cube status, updated according to move_type and direction
-    for i in range(54):          # iteration over the 54 facelets
-        new_status+=str(cube_status[ref[i]])  # updated cube status takes the facelet from previous status at ref location
-    
-    return new_status            # updated cube status is returned
-
-
-
-
-
 def cube_sketch_coordinates(x_start, y_start, d, gap=0):
     """ Generates a list and a dict with the top-left coordinates of each facelet, as per the URFDLB order.
     These coordinates are later used to draw a cube sketch
@@ -297,18 +267,20 @@ def plot_interpreted_colors(wait, cube_status, test, startup=False, kill=False):
 
 
 
-def cube_solution(cube_string, printout, informative):
+def cube_solution(cube_string, printout, informative, s=None):
     """ Calls the Hegbert Kociemba solver, and returns the solution's moves
     from: https://github.com/hkociemba/RubiksCube-TwophaseSolver 
     (Solve Rubik's Cube in less than 20 moves on average with Python)
-    The returned string is slightly manipulated to have the moves amount at the start."""
+    The returned string is slightly manipulated to have the moves amount at the start.
+    When the solution s is given (i.e. precomputed in a corpus file) the solver is not called."""
     
     simulation = True                             # simulation is set True (cube oriented as per URF)
     
-    sv_max_moves = 20           # solver parameter: max 20 moves or best at timeout
-    sv_max_time = 2             # solver parameter: timeout of 2 seconds, if not solution within max moves
-    s = sv.solve(cube_string, sv_max_moves, sv_max_time)  # solver is called
-    s = s[:s.find('(')]         # solution capture the sequence of manoeuvres
+    if s is None:               # case the solution is not given
+        sv_max_moves = 20       # solver parameter: max 20 moves or best at timeout
+        sv_max_time = 2         # solver parameter: timeout of 2 seconds, if not solution within max moves
+        s = sv.solve(cube_string, sv_max_moves, sv_max_time)  # solver is called
+        s = s[:s.find('(')]     # solution capture the sequence of manoeuvres
     
     # solution_text places the amount of moves first, and the solution (sequence of manoeuvres) afterward
     solution_Text = s[s.find('(')+1:s.find(')')-1]+' moves  '+ s[:s.find('(')] 
@@ -333,24 +305,10 @@ def cube_solution(cube_string, printout, informative):
 
 
 def solved_status_check(cube_status):
-    """Checks is a cube status string is a solved cube.
-        The test is performed on 5 faces, that if ok it also means the 6th face is ok.
+    """Checks is a cube status string is a solved cube, via the virtual cube (all the facelets match their face center).
         Funtion returns 1 for a solved cube, otherwise 0.
     """
-    # facelets identification number by face: U R F D L B
-    cube = ((0,1,2,3,4,5,6,7,8),(9,10,11,12,13,14,15,16,17),(18,19,20,21,22,23,24,25,26),\
-            (27,28,29,30,31,32,33,34,35),(36,37,38,39,40,41,42,43,44))
-    
-    if len(cube_status) == 54:  # case the cube status is complete (54 facelets)
-        for face in cube:       # iteration over the faces
-            for i in range(8):  # iteration over 8 facelets
-                
-                # case the facelets at location i+1 differs from facelet at location 0 (ref)
-                if cube_status[face[i+1]] != cube_status[face[0]]:
-                    return 0   # returns zero (means cube is not solved)
-        return 1               # returns 1 (means 5 faces are correct, therefore also the 6th one)
-    else:
-        return 0
+    return int(sim.is_solved(cube_status))  # returns 1 (means cube is solved) or zero (means cube is not solved)
 
 
 
@@ -358,8 +316,8 @@ def solved_status_check(cube_status):
 
 
 
-def test_random_permutations(runs, cube_status, timer, plot, debug, printout):
-    """Generates random cube status (permutations) of a Rubik's cube.
+def test_random_permutations(runs, cube_status, timer, plot, debug, printout, corpus_fname=''):
+    """Generates random cube status (permutations) of a Rubik's cube, or takes them from a corpus file.
     Each random permutation is analysed from the Cubotino_T_moves.
     Each set of robot movements is virtually applied.
     After each of the (virtual) cube manipulation, the cube status is updated to reflect the new status.
@@ -369,9 +327,14 @@ def test_random_permutations(runs, cube_status, timer, plot, debug, printout):
     
     start = time.time()                           # initial time reference 
     
+    cubes = None                                  # corpus cube status and solutions
     if len(cube_status.strip().replace(" ","")) == 54: # case the script was launched with a cube status as argument
         random_status = False                     # random_status variable is set False
         runs = 1                                  # number of test is limited to one
+    elif corpus_fname:                            # case the script was launched with a corpus file as argument
+        random_status = True                      # random_status variable is set True (cubes are from the corpus)
+        cubes = corpus.load(corpus_fname)         # corpus cube status, with precomputed solutions
+        runs = len(cubes['states'])               # number of test is the corpus size
     else:                                         # script not launched with a cube status as argument
         random_status = True                      # random_status variable is set True
 
@@ -396,7 +359,11 @@ def test_random_permutations(runs, cube_status, timer, plot, debug, printout):
                 print(row,"\n")                       # print a separation string
                 print(f"Test number: {test:,d}")      # feedback is printed to terminal
             
-        if random_status:                         # case random_cube is set True (random cube status generation)
+        solution = None                           # solution is searched by the solver
+        if cubes is not None:                     # case the cube status are taken from a corpus file
+            cube_status = cubes['states'][test-1] # cube_status from the corpus
+            solution = cubes['solutions'][test-1] # precomputed solution from the corpus
+        elif random_status:                       # case random_cube is set True (random cube status generation)
             cube_status = scramble()              # a random cube_status is generated
 
         if printout:                              # case printout is set True
@@ -405,7 +372,7 @@ def test_random_permutations(runs, cube_status, timer, plot, debug, printout):
             else:                                 # case the cube status is entered by user
                 print("Entered cube_status:", cube_status)  # feedback is printed to terminal
         
-        a,b,c,d,e,f,g = cube_solution(cube_status, printout,informative=informative) # Kociemba solver is called to have the solution string
+        a,b,c,d,e,f,g = cube_solution(cube_status, printout,informative=informative, s=solution) # Kociemba solver is called to have the solution string
         solution, solution_Text, robot_moves, total_robot_moves, est_time, opt, depth = a,b,c,d,e,f,g
             
         if solution_Text != 'Error':              # case no errors returned by the Kociemba solver
@@ -425,31 +392,12 @@ def test_random_permutations(runs, cube_status, timer, plot, debug, printout):
                 show_ms = t1                      # sketch showing time as per t1
                 plot_interpreted_colors(show_ms, cube_status, test, startup=True) # initial cube status is plot to the screen
             
-            for i in range(0, len(robot_moves),2): # iteration over the robot movements
-                if plot:                          # case plot variable is set True (sketch with the cube status on screen)
-                    show_ms = t2                  # sketch showing time as per t2
-                move_type = robot_moves[i:i+1]    # robot move type is retrieved from robot_moves string
-                direction = robot_moves[i+1:i+2]  # robot move direction/repeats is retrieved from robot_moves string
-                if move_type == 'F':              # case the robot move is F (flip)
-                    for i in range(int(direction)):  # iteration over the quantity of flips
-                        cube_status = cube_facelets_permutation(cube_status, move_type, direction)  # facelets permutation assigned to new_cube_status
-                        if plot:                  # case plot variable is set True (sketch with the cube status on screen)
-                            plot_interpreted_colors(show_ms, cube_status, test)  # the new cube status is plot to the screen
-                else:                             # case the robot move is not F (not flip means spin or rotate)
-                    if direction == '0':
-                        cube_status = cube_facelets_permutation(cube_status, move_type, '1') # facelets permutation assigned to new_cube_status
-                        cube_status = cube_facelets_permutation(cube_status, move_type, '1') # facelets permutation assigned to new_cube_status
-                        if plot:                  # case plot variable is set True (sketch with the cube status on screen)
-                            plot_interpreted_colors(show_ms, cube_status, test)  # the new cube status is plot to the screen
-                    elif direction == '4':
-                        cube_status = cube_facelets_permutation(cube_status, move_type, '3') # facelets permutation assigned to new_cube_status
-                        cube_status = cube_facelets_permutation(cube_status, move_type, '3') # facelets permutation assigned to new_cube_status
-                        if plot:                  # case plot variable is set True (sketch with the cube status on screen)
-                            plot_interpreted_colors(show_ms, cube_status, test)  # the new cube status is plot to the screen
-                    else:  
-                        cube_status = cube_facelets_permutation(cube_status, move_type, direction) # facelets permutation assigned to new_cube_status
-                        if plot:                  # case plot variable is set True (sketch with the cube status on screen)
-                            plot_interpreted_colors(show_ms, cube_status, test)  # the new cube status is plot to the screen
+            if plot:                              # case plot variable is set True (sketch with the cube status on screen)
+                show_ms = t2                      # sketch showing time as per t2
+                for cube_status in sim.frames(cube_status, robot_moves)[1:]:  # cube status after each robot movement
+                    plot_interpreted_colors(show_ms, cube_status, test)  # the new cube status is plot to the screen
+            else:                                 # case plot variable is set False
+                cube_status = sim.apply(cube_status, robot_moves)  # robot movements applied at once, as single permutation
             
             if plot:                              # case plot variable is set True (sketch with the cube status on screen)
                 show_ms = t1                      # sketch showing time as per t1
@@ -588,13 +536,17 @@ if __name__ == "__main__":
     
     if runs > 20000:                 # case runs is too big (data is tored in list and later saved to a text file)
         runs = 20000                 # runs is limited to 20000
-        print("Test limited to 20K runs")  # feedback is printed
+        print("Test limited to 20K runs (Cubotino_T_test_runner.py has no limit)")  # feedback is printed
     
     row = "#"*95                     # string of characters used as separator
     print(row,'\n')                  # a row separation is printed to the terminal
     
+    corpus_fname = ''                # corpus file name is initially set as empty string
+    if args.corpus != None:          # case 'corpus' argument exists
+        corpus_fname = args.corpus   # 'corpus' argument is assigned to corpus_fname
+    
     # command to generate, and solve, random cube status
-    test_random_permutations(runs, cube_status, timer, plot, debug, printout)
+    test_random_permutations(runs, cube_status, timer, plot, debug, printout, corpus_fname)
 
 ####################################################################################################
 ####################################################################################################
@@ -0,0 +1,211 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+# Report generator for the results of Cubotino_T_test_runner.py
+#
+# The report has:
+#  - percentile tables of the robot movements and of the estimated robot time, overall and per solution depth
+#  - histograms of the robot movements and of the estimated robot time, per solution depth
+#  - the savings of each optimization rule (robot movements and estimated time), versus the not optimized moves
+# The report statistics are saved to report.json in the results folder: This file can be used as baseline.
+# When a baseline file is given, the median and p95 estimated robot time are compared to the baseline ones:
+# The script exits with code 1 in case of regression beyond the threshold (in percentage).
+#
+# Example: python Cubotino_T_test_report.py TestRuns/seed1 --baseline baseline.json --threshold 0.5
+#
+#############################################################################################################
+"""
+
+
+import os, sys, glob, json                    # python libraries
+import numpy as np                            # arrays
+import Cubotino_T_test_runner as runner       # custom library, with the shard files reader
+
+
+percentiles = (0, 5, 25, 50, 75, 95, 99, 100) # percentiles in the tables
+row = "#"*95                                  # string of characters used as separator
+
+
+
+
+def load_results(folder, partial=False):
+    """ Returns a dict of arrays with the records of the completed shards in folder (also the partial ones, if requested).
+        Records with solver errors are excluded."""
+
+    fnames = sorted(glob.glob(os.path.join(folder, 'shard_*.csv')))
+    if partial:                               # case the shards in progress are also requested
+        fnames += sorted(glob.glob(os.path.join(folder, 'shard_*.part')))
+
+    cols = {key: [] for key in ('depth', 'tot_moves', 'est_time', 'opt1', 'opt2', 'base_moves', 'base_time', 'solved')}
+    for fname in fnames:                      # iteration over the shard files
+        for r in runner.read_rows(fname):     # records, up to an eventual truncated one
+            if r['depth'] < 0:                # case of solver error
+                continue
+            for key, values in cols.items():  # iteration over the columns
+                values.append(r[key])
+    return {key: np.array(values) for key, values in cols.items()}
+
+
+
+
+def percentile_stats(values):
+    """ Returns a dict with count, mean and the percentiles of the values."""
+
+    if len(values) == 0:
+        return {'count': 0}
+    stats = {'count': int(len(values)), 'mean': round(float(np.mean(values)), 2)}
+    for p, v in zip(percentiles, np.percentile(values, percentiles)):
+        stats[f'p{p}'] = round(float(v), 2)
+    return stats
+
+
+
+
+def optimization_savings(res):
+    """ Returns a dict with the savings (robot movements and estimated time) per optimization rule."""
+
+    savings = {}
+    rules = {'opt1': (res['opt1'] > 0) & (res['opt2'] == 0),
+             'opt2': (res['opt2'] > 0) & (res['opt1'] == 0),
+             'opt1+opt2': (res['opt1'] > 0) & (res['opt2'] > 0)}
+    for rule, mask in rules.items():          # iteration over the optimization rules
+        saved_moves = res['base_moves'][mask] - res['tot_moves'][mask]
+        saved_time = res['base_time'][mask] - res['est_time'][mask]
+        savings[rule] = {'fired': int(np.sum(mask)),
+                         'fired_pct': round(100*float(np.mean(mask)), 3) if len(mask) else 0,
+                         'saved_moves': int(np.sum(saved_moves)),
+                         'saved_time': round(float(np.sum(saved_time)), 1),
+                         'mean_saved_moves': round(float(np.mean(saved_moves)), 2) if len(saved_moves) else 0,
+                         'mean_saved_time': round(float(np.mean(saved_time)), 2) if len(saved_time) else 0}
+    tot_base_time = float(np.sum(res['base_time']))
+    savings['total_saved_time_pct'] = round(100*(tot_base_time-float(np.sum(res['est_time'])))/tot_base_time, 3) if tot_base_time else 0
+    return savings
+
+
+
+
+def report(res):
+    """ Returns a dict with all the report statistics."""
+
+    stats = {'cubes': int(len(res['depth'])), 'failures': int(len(res['depth']) - np.sum(res['solved'])),
+             'tot_moves': percentile_stats(res['tot_moves']), 'est_time': percentile_stats(res['est_time']),
+             'depth': {}, 'optimizations': optimization_savings(res)}
+    for depth in np.unique(res['depth']):     # iteration over the solution depths
+        mask = res['depth'] == depth
+        stats['depth'][str(depth)] = {'tot_moves': percentile_stats(res['tot_moves'][mask]),
+                                      'est_time': percentile_stats(res['est_time'][mask])}
+    return stats
+
+
+
+
+def print_table(title, rows):
+    """ Prints a percentile table, rows is a list of (label, stats dict)."""
+
+    print(f"\n{title}")
+    print(f"{'':>8}{'count':>10}{'mean':>9}" + ''.join(f"{'p'+str(p):>9}" for p in percentiles))
+    for label, stats in rows:
+        if stats['count'] == 0:
+            continue
+        print(f"{label:>8}{stats['count']:>10,d}{stats['mean']:>9}" + ''.join(f"{stats['p'+str(p)]:>9}" for p in percentiles))
+
+
+
+
+def print_histogram(title, res, key, bins):
+    """ Prints a text histogram of res[key] per solution depth, bins is the quantity of bins."""
+
+    values = res[key]
+    edges = np.histogram_bin_edges(values, bins=bins)   # same bins for all the depths
+    print(f"\n{title}")
+    for depth in np.unique(res['depth']):     # iteration over the solution depths
+        counts, _ = np.histogram(values[res['depth'] == depth], bins=edges)
+        peak = max(int(np.max(counts)), 1)
+        print(f"  depth {depth}")
+        for count, low, high in zip(counts, edges[:-1], edges[1:]):
+            bar = '#'*int(round(40*count/peak))
+            print(f"{low:>10.1f} - {high:<8.1f}{count:>9,d} {bar}")
+
+
+
+
+def print_report(stats, res, bins):
+    print(row)
+    print(f"Tested {stats['cubes']:,d} cube's status with {stats['failures']:,d} failures")
+    print_table("Robot movements", [('all', stats['tot_moves'])] +
+                [(f"d{d}", s['tot_moves']) for d, s in stats['depth'].items()])
+    print_table("Estimated robot time (s)", [('all', stats['est_time'])] +
+                [(f"d{d}", s['est_time']) for d, s in stats['depth'].items()])
+    print_histogram("Robot movements histogram, per solution depth", res, 'tot_moves', bins)
+    print_histogram("Estimated robot time histogram (s), per solution depth", res, 'est_time', bins)
+
+    print("\nOptimizations savings, versus the not optimized robot moves")
+    print(f"{'rule':>10}{'fired':>10}{'fired %':>9}{'moves':>10}{'time (s)':>11}{'moves/cube':>12}{'time/cube':>11}")
+    for rule, s in stats['optimizations'].items():
+        if rule == 'total_saved_time_pct':
+            continue
+        print(f"{rule:>10}{s['fired']:>10,d}{s['fired_pct']:>9}{s['saved_moves']:>10,d}{s['saved_time']:>11}"
+              f"{s['mean_saved_moves']:>12}{s['mean_saved_time']:>11}")
+    print(f"Estimated robot time saved by the optimizations: {stats['optimizations']['total_saved_time_pct']} %")
+    print(row)
+
+
+
+
+def compare(stats, baseline, threshold):
+    """ Compares median and p95 estimated robot time to the baseline ones.
+        Returns True when there is a regression beyond the threshold (in percentage)."""
+
+    regression = False
+    print(f"\nComparison to baseline (threshold {threshold} %)")
+    for p in ('p50', 'p95'):
+        new, old = stats['est_time'][p], baseline['est_time'][p]
+        delta = round(100*(new-old)/old, 3) if old else 0
+        failed = delta > threshold
+        regression = regression or failed
+        print(f"{p:>6} estimated time: baseline {old}  new {new}  delta {delta} %  {'REGRESSION' if failed else 'ok'}")
+    if stats['failures'] > 0:                 # case of cubes not solved by the robot moves
+        print(f"{stats['failures']:,d} cubes not solved by the robot moves: REGRESSION")
+        regression = True
+    return regression
+
+
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    # argument parser object creation
+    parser = argparse.ArgumentParser(description='Report of the Cubotino_T_test_runner.py results')
+    parser.add_argument("folder", type=str,
+                        help="Folder with the test runner results")
+    parser.add_argument("--partial", action='store_true',
+                        help="Includes the shards in progress")
+    parser.add_argument("--bins", type=int, default=12,
+                        help="Quantity of bins of the histograms")
+    parser.add_argument("--baseline", type=str, default='',
+                        help="Baseline report.json file to compare with")
+    parser.add_argument("--threshold", type=float, default=1.0,
+                        help="Max allowed increase (in percentage) of the median and p95 estimated robot time")
+    args = parser.parse_args()
+
+    res = load_results(args.folder, args.partial)
+    if len(res['depth']) == 0:                # case of no results in folder
+        print(f"No results found in {args.folder}")
+        sys.exit(1)
+
+    stats = report(res)
+    print_report(stats, res, args.bins)
+    fname = os.path.join(args.folder, 'report.json')
+    with open(fname, 'w') as f:
+        json.dump(stats, f, indent=1)
+    print(f"Report saved at: {fname}")
+
+    if args.baseline != '':                   # case a baseline is given
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(stats, baseline, args.threshold):
+            sys.exit(1)
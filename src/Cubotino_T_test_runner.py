@@ -0,0 +1,292 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+# Parallel runner to virtually solve random generated Rubik's cube status, by the CUBOTino_T robot solver.
+# This is the multiprocessing version of Cubotino_T_test_random.py, meant for millions of cube status.
+#
+# The work is split in shards (blocks of cube status), each shard has its own seed: Same seed, same cubes.
+# Each worker process generates the random cube status of a shard, gets the Kociemba solution, translates it
+# into robot moves, estimates the servos time, applies the robot moves to the virtual cube and checks the result.
+# Each record is streamed (append-only) to the shard CSV file, within the output folder:
+#  - shard_000012.part is a shard in progress (also after an interruption)
+#  - shard_000012.csv is a completed shard, shard_000012.json has its summary
+# When the runner is launched again, with the same output folder, completed shards are skipped and the
+# partial ones are resumed from the last written record.
+# The summary is aggregated incrementally, as soon as each shard is completed, and saved to summary.json.
+#
+# The cube status, with precomputed solutions, can also be taken from a corpus file (Cubotino_T_corpus.py).
+#
+# Example: python Cubotino_T_test_runner.py -r 1000000 --seed 1 -o TestRuns/seed1
+#          python Cubotino_T_test_runner.py --corpus corpus_seed1_10000.npz
+#
+#############################################################################################################
+"""
+
+
+import os, sys, csv, json, time, random       # python libraries
+import multiprocessing as mp                  # parallel processes
+import Cubotino_T_moves as rm                 # custom library, traslates the cuber solution string in robot movements string
+import Cubotino_T_cube_sim as sim             # custom library, virtual cube manipulated by the robot movements
+import Cubotino_T_corpus as corpus            # custom library, seeded cube status and Kociemba solver
+
+
+# columns of the shard CSV files
+# base_moves and base_time refer to the robot moves without optimizations, to measure the optimizations savings
+fields = ('shard', 'idx', 'cube_status', 'solution', 'depth', 'robot_moves', 'tot_moves', 'est_time', 'opt1', 'opt2',
+          'base_moves', 'base_time', 'solved')
+
+block = 100                                   # cube status solved before being checked, as a batch, and written to file
+
+
+
+
+def load_timer(fname):
+    """ Returns the servos timers dict, as Cubotino_T_servos.load_servos_parameters(), from the servos settings file.
+        The servos settings file is read directly, as this runner is meant to also run on PCs (no GPIO)."""
+
+    with open(fname, "r") as f:               # servo_settings file is opened in reading mode
+        s = {key: float(value) for key, value in json.load(f).items()}   # json file is parsed to a local dict
+
+    timer = {}                                # dict to store the servos timer values
+    for key in ('t_flip_to_close_time', 't_close_to_flip_time', 't_flip_open_time', 't_open_close_time',
+                't_rel_time', 'b_spin_time', 'b_rotate_time', 'b_rel_time'):
+        timer[key] = s[key]
+    if round(s['t_servo_close'] - s['t_servo_rel_delta'], 3) >= s['t_servo_close']:  # case the t_servo_rel_delta is not > zero
+        timer['t_rel_time'] = 0
+    return timer
+
+
+
+
+def cube_solution(cube_status, timer, s=None):
+    """ Calls the Kociemba solver (when the solution s is not given), and translates the solution into robot moves.
+        Returns the solution, its depth, the robot moves, the total robot moves, the estimated time, optimizations,
+        and the total robot moves and estimated time without optimizations."""
+
+    if s is None:                             # case the solution is not precomputed (i.e. by the corpus)
+        s = corpus.solve(cube_status)         # solver is called (max 20 moves or best at timeout of 2 seconds)
+    if s[:5] == 'Error':                      # case the solver returned an error
+        return s, -1, '', 0, 0, (0, 0), 0, 0
+    robot, moves, tot_moves, opt = rm.robot_required_moves(s, '', simulation=True)
+    est_time = moves.estimate_time(timer)     # estimated time for the robot moves
+    if any(opt):                              # case the optimizations changed the robot moves
+        robot, base, base_moves, _ = rm.robot_required_moves(s, '', simulation=True, optimize=False)
+        base_time = base.estimate_time(timer) # estimated time for the robot moves without optimizations
+    else:                                     # case the optimizations did not change the robot moves
+        base_moves, base_time = tot_moves, est_time
+    depth = len(s.replace(" ","")) // 2       # cube status depth
+    return s.strip(), depth, moves, tot_moves, est_time, opt, base_moves, base_time
+
+
+
+
+def shard_fname(folder, shard, ext):
+    return os.path.join(folder, f'shard_{shard:06d}.{ext}')
+
+
+
+
+def shard_summary(shard, rows):
+    """ Returns a dict with the summary of the records (rows) of one shard."""
+
+    moves = [r['tot_moves'] for r in rows if r['depth'] >= 0]
+    times = [r['est_time'] for r in rows if r['depth'] >= 0]
+    depths = {}                               # quantity of cube status per solution depth
+    for r in rows:
+        depths[str(r['depth'])] = depths.get(str(r['depth']), 0) + 1
+    return {'shard': shard, 'cubes': len(rows), 'solved': sum(r['solved'] for r in rows),
+            'errors': sum(1 for r in rows if r['depth'] < 0),
+            'sum_moves': sum(moves), 'sum_time': round(sum(times), 1),
+            'min_time': min(times, default=0), 'max_time': max(times, default=0),
+            'opt1': sum(r['opt1'] for r in rows), 'opt2': sum(r['opt2'] for r in rows), 'depths': depths}
+
+
+
+
+def read_rows(fname):
+    """ Returns the records of a shard file, as list of dicts with numeric values converted."""
+
+    rows = []
+    with open(fname, newline='') as f:
+        for r in csv.DictReader(f):
+            if None in r.values():            # case of a record truncated by an interruption
+                break
+            r.setdefault('base_moves', r['tot_moves'])   # older files have no base columns
+            r.setdefault('base_time', r['est_time'])     # older files have no base columns
+            try:                              # tentative
+                for key in ('shard', 'idx', 'depth', 'tot_moves', 'opt1', 'opt2', 'base_moves', 'solved'):
+                    r[key] = int(r[key])
+                for key in ('est_time', 'base_time'):
+                    r[key] = float(r[key])
+            except ValueError:                # case of a record truncated within its last field(s)
+                break
+            rows.append(r)
+    return rows
+
+
+
+
+def run_shard(job):
+    """ Worker function: solves, and virtually checks, the cube status of one shard.
+        Records are appended to the shard .part file, that is renamed .csv once the shard is completed."""
+
+    folder, seed, shard, size, timer, corpus_fname, shard_size = job
+    part = shard_fname(folder, shard, 'part')
+    done = read_rows(part) if os.path.exists(part) else []   # records written before an interruption
+    rnd = random.Random(f'{seed}-{shard}')    # random generator of the shard: same seed, same cubes
+    if corpus_fname:                          # case the cube status are taken from a corpus file
+        cubes = corpus.load(corpus_fname)     # corpus, with the precomputed solutions
+        start = shard * shard_size            # corpus index of the first cube status of the shard
+
+    with open(part, 'w', newline='') as f:    # records written before an interruption are rewritten
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(done)
+        rows = []
+        for idx in range(size):               # iteration over the cube status of the shard
+            if corpus_fname:                  # case the cube status are taken from a corpus file
+                cube_status, s = cubes['states'][start+idx], cubes['solutions'][start+idx]
+            else:                             # case of random cube status
+                cube_status, s = corpus.scramble(rnd), None   # always generated to keep the random sequence
+            if idx < len(done):               # case the record was written before an interruption
+                continue
+            solution, depth, moves, tot_moves, est_time, opt, base_moves, base_time = cube_solution(cube_status, timer, s)
+            rows.append({'shard': shard, 'idx': idx, 'cube_status': cube_status, 'solution': solution,
+                         'depth': depth, 'robot_moves': moves, 'tot_moves': tot_moves, 'est_time': est_time,
+                         'opt1': opt[0], 'opt2': opt[1], 'base_moves': base_moves, 'base_time': base_time, 'solved': 0})
+
+            if len(rows) == block or idx == size-1:   # case a block of cubes is ready to be checked and written
+                states = sim.apply_batch(sim.to_batch([r['cube_status'] for r in rows]), [r['robot_moves'] for r in rows])
+                for r, ok in zip(rows, sim.is_solved_batch(states)):
+                    r['solved'] = int(ok and r['depth'] >= 0)
+                writer.writerows(rows)        # records are appended to the shard file
+                f.flush()                     # records are flushed, to don't loose them on interruptions
+                done.extend(rows)
+                rows = []
+
+    summary = shard_summary(shard, done)
+    with open(shard_fname(folder, shard, 'json'), 'w') as f:
+        json.dump(summary, f)
+    os.replace(part, shard_fname(folder, shard, 'csv'))   # shard is marked as completed
+    return summary
+
+
+
+
+def aggregate(total, summary):
+    """ Updates the total summary dict with the summary of one shard."""
+
+    for key in ('cubes', 'solved', 'errors', 'sum_moves', 'opt1', 'opt2'):
+        total[key] = total.get(key, 0) + summary[key]
+    total['sum_time'] = round(total.get('sum_time', 0) + summary['sum_time'], 1)
+    if summary['cubes'] > summary['errors']:
+        total['min_time'] = min(total.get('min_time', summary['min_time']), summary['min_time'])
+        total['max_time'] = max(total.get('max_time', summary['max_time']), summary['max_time'])
+    depths = total.setdefault('depths', {})
+    for depth, n in summary['depths'].items():
+        depths[depth] = depths.get(depth, 0) + n
+    return total
+
+
+
+
+def print_total(total, runs, start, resumed):
+    cubes = total.get('cubes', 0)
+    valid = cubes - total.get('errors', 0)
+    avg_moves = round(total.get('sum_moves', 0)/valid, 1) if valid else 0
+    avg_time = round(total.get('sum_time', 0)/valid, 1) if valid else 0
+    rate = round((cubes-resumed)/(time.time()-start), 1)   # cubes per second, resumed ones excluded
+    print(f"  Tested: {cubes:,d} (of {runs:,d})  Failures: {cubes-total.get('solved', 0):,d}  "
+          f"Avg moves: {avg_moves}  Avg time: {avg_time}  ({rate} cubes/s)", end='\r', flush=True)
+
+
+
+
+def run(runs, seed, folder, timer, workers, shard_size, corpus_fname=''):
+    """ Runs (or resumes) the test of runs cube status, split in shards, on workers processes.
+        When corpus_fname is given, the cube status and solutions are taken from the corpus file (runs is the corpus size)."""
+
+    if corpus_fname:                          # case the cube status are taken from a corpus file
+        runs = len(corpus.load(corpus_fname)['states'])
+    os.makedirs(folder, exist_ok=True)
+    settings_fname = os.path.join(folder, 'run.json')
+    run_settings = {'seed': seed, 'shard_size': shard_size, 'timer': timer, 'corpus': corpus_fname}
+    if os.path.exists(settings_fname):        # case of a resumed run
+        with open(settings_fname) as f:
+            previous = json.load(f)
+        if previous != run_settings:          # case the resumed run had other settings
+            print(f"Folder {folder} has results for other settings: {previous}")
+            sys.exit(1)
+    else:
+        with open(settings_fname, 'w') as f:
+            json.dump(run_settings, f)
+
+    shards = (runs + shard_size - 1) // shard_size   # quantity of shards
+    total, jobs = {}, []
+    for shard in range(shards):               # iteration over the shards
+        size = min(shard_size, runs - shard*shard_size)
+        if os.path.exists(shard_fname(folder, shard, 'csv')):   # case the shard was already completed
+            with open(shard_fname(folder, shard, 'json')) as f:
+                aggregate(total, json.load(f))
+        else:
+            jobs.append((folder, seed, shard, size, timer, corpus_fname, shard_size))
+    print(f"Shards: {shards:,d}  completed: {shards-len(jobs):,d}  to do: {len(jobs):,d}  workers: {workers}")
+
+    start = time.time()
+    resumed = total.get('cubes', 0)           # cubes tested on previous runs
+    initializer = None if corpus_fname else corpus.import_solver   # the solver is only needed without corpus
+    with mp.Pool(workers, initializer=initializer) as pool:
+        for summary in pool.imap_unordered(run_shard, jobs):
+            aggregate(total, summary)         # summary is updated as soon as a shard is completed
+            with open(os.path.join(folder, 'summary.json'), 'w') as f:
+                json.dump(total, f, indent=1)
+            print_total(total, runs, start, resumed)
+    print()
+    return total
+
+
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    # argument parser object creation
+    parser = argparse.ArgumentParser(description='Parallel test of random cube status via a virtual cube manipulator')
+    parser.add_argument("-r", "--runs", type=int, default=100000,
+                        help="Number of random cubes to test (no limit)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed for the random cubes generation")
+    parser.add_argument("-o", "--out", type=str, default='',
+                        help="Output folder, to be reused to resume a run (default TestRuns/seed<seed>)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="Number of worker processes (default all the cores)")
+    parser.add_argument("--shard", type=int, default=1000,
+                        help="Cube status per shard")
+    parser.add_argument("--corpus", type=str, default='',
+                        help="Corpus file (Cubotino_T_corpus.py) with the cube status and solutions to test")
+    parser.add_argument("--servo_settings", type=str, default='',
+                        help="Servos settings file for the time estimation (default Cubotino_T_servo_settings.txt)")
+    args = parser.parse_args()
+
+    fname = args.servo_settings
+    if fname == '':                           # case the servos settings file is not in argument
+        fname = 'Cubotino_T_servo_settings.txt'
+        if not os.path.exists(fname):         # case the robot servos settings file does not exist
+            fname = 'Cubotino_T_servo_settings_default.txt'
+    folder = args.out
+    if folder == '':                          # case the output folder is not in argument
+        name = os.path.splitext(os.path.basename(args.corpus))[0] if args.corpus else f'seed{args.seed}'
+        folder = os.path.join('TestRuns', name)
+
+    total = run(args.runs, args.seed, folder, load_timer(fname), args.workers, args.shard, args.corpus)
+
+    row = "#"*95                              # string of characters used as separator
+    print(row)
+    print(f"Tested {total.get('cubes', 0):,d} random cube's status with {total.get('cubes', 0)-total.get('solved', 0):,d} failures")
+    print("Optimization type 1 being used:", total.get('opt1', 0))
+    print("Optimization type 2 being used:", total.get('opt2', 0))
+    print(f"Results saved at: {folder}")
+    print(row)
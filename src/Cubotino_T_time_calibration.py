@@ -0,0 +1,210 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+#############################################################################################################
+# Calibration of the robot time model, on the real robot solving times.
+#
+# The robot solving time is estimated as the sum of the servos transitions time costs (Cubotino_T_moves.time_features):
+# By default the costs are the servos timers (sleep times) multiplied by a correction coefficient.
+# This script fits the costs by least squares, on the robot solving times recorded by the robot:
+#  - the solver log (CubesDataLog/Cubotino_solver_log.txt), with RobotSolvingTime(s), CubeSolution and Flip2close
+#  - or a CSV file with robot_moves and robot_time columns (i.e. per-solve telemetry, or Cubotino_T_servos_replay.py output)
+# The robot moves are rebuilt from each solution, and the servos transitions are counted.
+# The fit is regularized toward the servos timers costs, so that rare transitions keep a sensible cost.
+# The fitted model is saved to Cubotino_T_time_model.json, that is used by Cubotino_T_servos.estimate_time()
+# as long as the servos timers do not change.
+#
+# The release of the tension (top cover and Cube_holder) always follows a close or a rotation, therefore it is
+# not fitted separately: Its time is part of the close, flip_to_close and rotate costs.
+#
+# Example: python Cubotino_T_time_calibration.py CubesDataLog/Cubotino_solver_log.txt
+#
+#############################################################################################################
+"""
+
+
+import os, sys, csv, json, time               # python libraries
+import numpy as np                            # arrays
+import Cubotino_T_moves as rm                 # custom library, traslates the cuber solution string in robot movements string
+
+
+k = 1.08                                      # correction coefficient of the servos timers estimate
+row = "#"*95                                  # string of characters used as separator
+
+
+
+
+def load_timer(fname):
+    """ Returns the servos timers dict, as Cubotino_T_servos.load_servos_parameters(), from the servos settings file."""
+
+    with open(fname, "r") as f:               # servo_settings file is opened in reading mode
+        s = {key: float(value) for key, value in json.load(f).items()}   # json file is parsed to a local dict
+
+    timer = {}                                # dict to store the servos timer values
+    for key in ('t_flip_to_close_time', 't_close_to_flip_time', 't_flip_open_time', 't_open_close_time',
+                't_rel_time', 'b_spin_time', 'b_rotate_time', 'b_rel_time'):
+        timer[key] = s[key]
+    if round(s['t_servo_close'] - s['t_servo_rel_delta'], 3) >= s['t_servo_close']:  # case the t_servo_rel_delta is not > zero
+        timer['t_rel_time'] = 0
+    return timer
+
+
+
+
+def load_samples(fname, flip2close='2'):
+    """ Returns a list of (robot moves, flip to close in one step, robot time) from the solver log or a CSV file.
+        The flip2close argument is used when the file has no Flip2close column."""
+
+    with open(fname, newline='') as f:
+        delimiter = '\t' if '\t' in f.readline() else ','   # solver log is tab separated
+        f.seek(0)
+        samples = []
+        for r in csv.DictReader(f, delimiter=delimiter):
+            try:                              # tentative
+                if 'robot_moves' in r:        # case of CSV file with the robot moves
+                    moves = r['robot_moves']
+                    robot_time = float(r.get('robot_time') or r['sim_time'])
+                else:                         # case of solver log, robot moves are rebuilt from the solution
+                    solution = r['CubeSolution'].strip()
+                    if solution == '' or solution[:5] == 'Error':   # case of no solution
+                        continue
+                    solution = solution.split('(')[0]   # eventual amount of moves is removed
+                    moves = rm.robot_required_moves(solution, '', simulation=False)[1]
+                    robot_time = float(r['RobotSolvingTime(s)'])
+                one_step = (r.get('Flip2close') or r.get('flip2close') or flip2close).strip() == '1'
+            except (KeyError, ValueError, TypeError):   # case of missing columns or not numeric values
+                continue
+            if robot_time > 0:                # case of a valid robot time
+                samples.append((rm.robot_ops(moves), one_step, robot_time))
+    return samples
+
+
+
+
+def design(samples):
+    """ Returns the servos transitions counts (N, features) array, and the robot times (N) array."""
+
+    A = np.array([moves.time_counts(one_step) for moves, one_step, robot_time in samples], dtype=float)
+    y = np.array([robot_time for moves, one_step, robot_time in samples], dtype=float)
+    return A, y
+
+
+
+
+def fit(A, y, prior, weight=1.0):
+    """ Returns the servos transitions costs fitted by least squares, regularized toward the prior costs.
+        The weight is the prior strength, compared to one sample; Costs are never negative."""
+
+    n = A.shape[1]                            # quantity of servos transitions
+    lam = np.sqrt(weight)                     # regularization factor
+    A_aug = np.vstack([A, lam*np.eye(n)])     # each prior cost is an additional sample
+    y_aug = np.concatenate([y, lam*prior])
+    costs, *_ = np.linalg.lstsq(A_aug, y_aug, rcond=None)
+    return np.clip(costs, 0, None)
+
+
+
+
+def robust_fit(A, y, prior, weight=1.0, n_mad=4):
+    """ Fits the costs, drops the samples with residual beyond n_mad times the median absolute deviation
+        (i.e. robot stopped while solving), and fits again. Returns the costs and the used samples mask."""
+
+    costs = fit(A, y, prior, weight)
+    res = y - A @ costs                       # residuals
+    mad = np.median(np.abs(res - np.median(res)))
+    mask = np.abs(res - np.median(res)) <= n_mad*max(mad, 0.25)   # residuals within 1 sec are always kept
+    return fit(A[mask], y[mask], prior, weight), mask
+
+
+
+
+def errors(A, y, costs):
+    """ Returns a dict with mean absolute error, root mean square error and mean absolute error in percentage."""
+
+    res = A @ costs - y
+    return {'mae': round(float(np.mean(np.abs(res))), 3), 'rmse': round(float(np.sqrt(np.mean(res**2))), 3),
+            'mape': round(float(100*np.mean(np.abs(res)/y)), 2)}
+
+
+
+
+def calibrate(samples, timer, weight=1.0, holdout=5):
+    """ Returns the robot time model dict, fitted on the samples.
+        One sample every holdout is kept out of the fit, to compare the model with the servos timers estimate."""
+
+    prior = np.array([rm.timer_costs(timer)[f]*k for f in rm.time_features])   # servos timers costs, as estimate_time
+    A, y = design(samples)
+    test = np.zeros(len(y), dtype=bool)       # holdout samples mask
+    if holdout > 1 and len(y) >= 2*holdout:   # case there are enough samples for the holdout
+        test[::holdout] = True
+
+    check = {}                                # holdout errors, of servos timers estimate and of the model
+    if np.any(test):                          # case of holdout samples
+        costs, mask = robust_fit(A[~test], y[~test], prior, weight)
+        check = {'holdout': int(np.sum(test)), 'timers': errors(A[test], y[test], prior),
+                 'model': errors(A[test], y[test], costs)}
+
+    costs, mask = robust_fit(A, y, prior, weight)   # model fitted on all the samples
+    return {'version': 1, 'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'timer': timer,
+            'costs': {f: round(float(c), 4) for f, c in zip(rm.time_features, costs)},
+            'prior': {f: round(float(c), 4) for f, c in zip(rm.time_features, prior)},
+            'counts': {f: int(c) for f, c in zip(rm.time_features, A[mask].sum(axis=0))},
+            'samples': int(np.sum(mask)), 'outliers': int(len(y)-np.sum(mask)),
+            'fit': errors(A[mask], y[mask], costs), 'check': check}
+
+
+
+
+def print_model(model):
+    print(row)
+    print(f"Robot time model fitted on {model['samples']:,d} solving cycles ({model['outliers']} outliers excluded)")
+    print(f"\n{'transition':>16}{'count':>10}{'timers (s)':>12}{'fitted (s)':>12}")
+    for f in rm.time_features:                # iteration over the servos transitions
+        print(f"{f:>16}{model['counts'][f]:>10,d}{model['prior'][f]:>12}{model['costs'][f]:>12}")
+    print(f"\nFit errors: {model['fit']}")
+    if model['check']:                        # case of holdout check
+        c = model['check']
+        print(f"Holdout ({c['holdout']} cycles) errors, servos timers estimate: {c['timers']}")
+        print(f"Holdout ({c['holdout']} cycles) errors, robot time model:       {c['model']}")
+    print(row)
+
+
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    # argument parser object creation
+    parser = argparse.ArgumentParser(description='Fits the robot time model on the real robot solving times')
+    parser.add_argument("data", type=str, nargs='?', default=os.path.join('CubesDataLog', 'Cubotino_solver_log.txt'),
+                        help="Solver log, or CSV file with robot_moves and robot_time columns")
+    parser.add_argument("--servo_settings", type=str, default='',
+                        help="Servos settings file used while logging (default Cubotino_T_servo_settings.txt)")
+    parser.add_argument("--flip2close", type=str, default='2', choices=('1', '2'),
+                        help="Flip to close steps, when not in the data file")
+    parser.add_argument("--weight", type=float, default=1.0,
+                        help="Strength of the servos timers costs, compared to one solving cycle")
+    parser.add_argument("--holdout", type=int, default=5,
+                        help="One solving cycle every holdout is used to check the model (0 for none)")
+    parser.add_argument("-o", "--out", type=str, default=rm.time_model_fname,
+                        help="Robot time model file (default Cubotino_T_time_model.json)")
+    args = parser.parse_args()
+
+    fname = args.servo_settings
+    if fname == '':                           # case the servos settings file is not in argument
+        fname = 'Cubotino_T_servo_settings.txt'
+        if not os.path.exists(fname):         # case the robot servos settings file does not exist
+            fname = 'Cubotino_T_servo_settings_default.txt'
+
+    samples = load_samples(args.data, args.flip2close)
+    if len(samples) < len(rm.time_features):  # case of too few solving cycles
+        print(f"Found {len(samples)} solving cycles in {args.data}, at least {len(rm.time_features)} are needed")
+        sys.exit(1)
+
+    model = calibrate(samples, load_timer(fname), args.weight, args.holdout)
+    print_model(model)
+    with open(args.out, 'w') as f:
+        json.dump(model, f, indent=1)
+    print(f"Robot time model saved at: {args.out}")
@@ -0,0 +1,109 @@
+import threading
+import time
+
+from mqtt_publisher import mqtt_publisher
+
+
+class FaceImagePublisher:
+    """Publishes the cube face images from a worker thread, off the detection loop.
+
+    The detection loop only hands over frame references:
+      - offer(side, frame): latest frame of the side being detected (single slot per side,
+        a newer frame replaces the one not yet encoded). Previews are encoded as thumbnails
+        (thumb_width, jpeg_quality) at most max_fps per second.
+      - accept(side, frame): the side has been detected; its frame is published at full
+        resolution (full_quality), and the pending preview of the side is discarded.
+    Encoding and publishing happen in the worker thread, the detection loop never waits.
+    Settings are read from the MQTT config file (face_max_fps, face_thumb_width,
+    face_jpeg_quality, face_full_quality), unless given as arguments.
+    """
+
+    def __init__(self, publisher, max_fps=None, thumb_width=None, jpeg_quality=None, full_quality=None):
+        config = publisher.config
+        self.publisher = publisher
+        self.max_fps = float(config.get("face_max_fps", 2) if max_fps is None else max_fps)
+        self.thumb_width = int(config.get("face_thumb_width", 160) if thumb_width is None else thumb_width)
+        self.jpeg_quality = int(config.get("face_jpeg_quality", 70) if jpeg_quality is None else jpeg_quality)
+        self.full_quality = int(config.get("face_full_quality", 90) if full_quality is None else full_quality)
+        self.cond = threading.Condition()
+        self.previews = {}        # side -> latest frame offered, not yet encoded
+        self.accepted = {}        # side -> accepted frame, not yet encoded
+        self.last_preview = 0.0   # time of the last preview encoding
+        self.offered = 0
+        self.replaced = 0         # offered frames replaced before being encoded
+        self.published = 0
+        self.thread = None
+
+    def _start(self):
+        """Start the worker thread, at the first frame (caller holds the lock)."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def offer(self, side, frame):
+        """Hand over the latest frame of the side being detected (non-blocking).
+        The frame is encoded later, on the worker thread: it must not be drawn on afterwards (pass a copy)."""
+        with self.cond:
+            self.offered += 1
+            if side in self.previews:
+                self.replaced += 1
+            self.previews[side] = frame
+            self._start()
+            self.cond.notify()
+
+    def accept(self, side, frame):
+        """Hand over the frame of the detected side, to be published at full resolution (non-blocking).
+        As for offer(), the frame must not be drawn on afterwards."""
+        with self.cond:
+            self.previews.pop(side, None)
+            self.accepted[side] = frame
+            self._start()
+            self.cond.notify()
+
+    def _next(self):
+        """Wait for the next frame to encode; returns (side, frame, full resolution)."""
+        with self.cond:
+            while True:
+                if self.accepted:
+                    side = min(self.accepted)
+                    return side, self.accepted.pop(side), True
+                if self.previews:
+                    wait = self.last_preview + 1 / self.max_fps - time.monotonic()
+                    if wait <= 0:
+                        self.last_preview = time.monotonic()
+                        side, frame = self.previews.popitem()
+                        return side, frame, False
+                    self.cond.wait(wait)
+                else:
+                    self.cond.wait()
+
+    def encode(self, frame, width=0, quality=90):
+        """JPEG buffer and dimensions of the frame, resized to width (when smaller than the frame)."""
+        import cv2
+        h, w = frame.shape[:2]
+        if width and w > width:
+            frame = cv2.resize(frame, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buffer, frame.shape[1], frame.shape[0]
+
+    def _run(self):
+        while True:
+            side, frame, full = self._next()
+            try:
+                if full:
+                    buffer, w, h = self.encode(frame, 0, self.full_quality)
+                else:
+                    buffer, w, h = self.encode(frame, self.thumb_width, self.jpeg_quality)
+                self.publisher.send_face_image(side, buffer, w, h)
+                self.published += 1
+            except Exception as e:
+                print(f"Exception while publishing the face image: {e}")
+
+    def stats(self):
+        with self.cond:
+            return {"offered": self.offered, "replaced": self.replaced, "published": self.published,
+                    "pending": len(self.previews) + len(self.accepted)}
+
+
+# Global instance, used by the cube detection loop
+face_images = FaceImagePublisher(mqtt_publisher)
@@ -1,160 +1,596 @@
+"""MQTT publisher of the robot data (status, solution, moves telemetry, images).
+
+One publisher, three modes ("mode" in mqtt_config.json):
+  - sync: each message is published and confirmed before returning (blocking)
+  - async: messages are queued in memory (PublishQueue) and published by a worker thread
+  - spool: as async, yet while the broker is unavailable the messages are appended to a
+    disk spool (Spool), replayed in order on reconnection at a limited rate
+JSON messages carry an "id" (publisher session and sequence number), for the backend to
+drop the duplicates eventually replayed from the spool, and the "robot" id.
+The topic may contain {robot_id} (i.e. "robot/{robot_id}/data"), for a fleet of robots to
+share the broker; "robot_id" defaults to the host name.
+"""
+
 import paho.mqtt.client as mqtt
+import glob
 import json
 import time
-import base64
 import os
+import socket
+import struct
 import threading
+import zlib
+from collections import deque
 
 # Path to config file
 CONFIG_FILE = "mqtt_config.json"
+MODES = ("sync", "async", "spool")
+
+# Drop priority per message type: when the queue is full, the oldest message of the
+# highest priority number is dropped first. Priority 0 messages are never dropped.
+# Image and face messages are bounded anyway, as only the latest one (per side) is kept.
+PRIORITY = {"status": 0, "solution": 1, "image": 1, "face": 1, "moves": 2, "command": 2}
+DEFAULT_PRIORITY = 2
+# Message types for which only the latest queued message is kept (per side, for faces)
+LATEST_ONLY = {"image", "face"}
+
+# Binary image messages, published on <topic>/image/<side> (side 1 to 6, or "collage"):
+# header (magic, version, kind, side, encoding, timestamp, width, height) followed by the image bytes
+IMAGE_HEADER = struct.Struct("!4sBBBBdHH")
+IMAGE_MAGIC = b"CIMG"
+IMAGE_VERSION = 1
+IMAGE_KINDS = {"face": 1, "image": 2}
+IMAGE_ENCODINGS = {"jpeg": 1, "png": 2}
+
+
+def image_encoding(data):
+    """Image encoding, from the leading bytes of the image data."""
+    if bytes(data[:8]) == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    return "jpeg"
+
+
+def pack_image(kind, side, data, width=0, height=0, timestamp=None):
+    """Binary image message: header followed by the (JPEG or PNG) image bytes."""
+    header = IMAGE_HEADER.pack(IMAGE_MAGIC, IMAGE_VERSION, IMAGE_KINDS[kind], side,
+                               IMAGE_ENCODINGS[image_encoding(data)],
+                               time.time() if timestamp is None else timestamp, width, height)
+    return header + bytes(data)
+
+
+def unpack_image(payload):
+    """Header dict and image bytes (memoryview, no copy) of a binary image message."""
+    magic, version, kind, side, encoding, timestamp, width, height = IMAGE_HEADER.unpack_from(payload)
+    if magic != IMAGE_MAGIC:
+        raise ValueError("Not an image message")
+    kinds = {v: k for k, v in IMAGE_KINDS.items()}
+    encodings = {v: k for k, v in IMAGE_ENCODINGS.items()}
+    header = {"type": kinds.get(kind, ""), "version": version, "side": side, "encoding": encodings.get(encoding, ""),
+              "timestamp": timestamp, "width": width, "height": height}
+    return header, memoryview(payload)[IMAGE_HEADER.size:]
+
+
+class PublishQueue:
+    """Bounded publish queue with per-type drop rules.
+
+    Messages are published in FIFO order. When maxsize messages are queued, the oldest
+    message of the lowest priority (highest PRIORITY number) is dropped; status messages
+    are never dropped (the queue exceeds maxsize only when it is full of them). For image and face messages only the latest one (per side) is kept.
+    get_batch() blocks until messages are available and the ready() callable is True.
+    """
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.cond = threading.Condition()
+        self.queues = {}          # priority -> deque of entries [seq, topic, message, key]
+        self.latest = {}          # key -> queued entry, for the LATEST_ONLY types
+        self.seq = 0
+        self.depth = 0
+        self.enqueued = 0
+        self.published = 0
+        self.dropped = {}         # message type -> dropped messages
+        self.max_depth = 0
+
+    def _drop(self, entry, reason_type):
+        """Mark a queued entry as dropped (lazy removal)."""
+        entry[2] = None
+        if entry[3] is not None and self.latest.get(entry[3]) is entry:
+            del self.latest[entry[3]]
+        self.depth -= 1
+        self.dropped[reason_type] = self.dropped.get(reason_type, 0) + 1
+
+    def _drop_lowest(self, priority):
+        """Drop the oldest message of the lowest priority, not higher than priority.
+        Returns False when nothing can be dropped (the new message is then dropped)."""
+        for p in sorted(self.queues, reverse=True):
+            if p < priority:
+                break
+            q = self.queues[p]
+            while q:
+                entry = q.popleft()
+                if entry[2] is not None:
+                    self._drop(entry, entry[2].get("type", ""))
+                    return True
+        return False
+
+    def put(self, topic, message):
+        """Queue the message; returns False when the message is dropped."""
+        msg_type = message.get("type", "")
+        priority = PRIORITY.get(msg_type, DEFAULT_PRIORITY)
+        key = None
+        if msg_type in LATEST_ONLY:
+            key = (topic, msg_type, message.get("side"))
+        with self.cond:
+            if key is not None and key in self.latest:
+                self._drop(self.latest[key], msg_type)   # superseded by the newer one
+            if self.depth >= self.maxsize and not self._drop_lowest(max(priority, 1)) and priority > 0:
+                self.dropped[msg_type] = self.dropped.get(msg_type, 0) + 1
+                return False
+            entry = [self.seq, topic, message, key]
+            self.seq += 1
+            self.queues.setdefault(priority, deque()).append(entry)
+            if key is not None:
+                self.latest[key] = entry
+            self.depth += 1
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, self.depth)
+            self.cond.notify()
+        return True
+
+    def _pop(self):
+        """Pop the oldest live entry across the priorities (caller holds the lock)."""
+        best = None
+        for q in self.queues.values():
+            while q and q[0][2] is None:
+                q.popleft()   # dropped entries
+            if q and (best is None or q[0][0] < best[0][0]):
+                best = q
+        if best is None:
+            return None
+        entry = best.popleft()
+        if entry[3] is not None and self.latest.get(entry[3]) is entry:
+            del self.latest[entry[3]]
+        self.depth -= 1
+        return entry
+
+    def get_batch(self, ready, max_batch=100, timeout=1.0):
+        """Wait for messages (and ready() True), and return up to max_batch (topic, message) in FIFO order."""
+        with self.cond:
+            while not (self.depth and ready()):
+                if not self.cond.wait(timeout) and not self.depth:
+                    return []
+            batch = []
+            while len(batch) < max_batch:
+                entry = self._pop()
+                if entry is None:
+                    break
+                batch.append((entry[1], entry[2]))
+            return batch
+
+    def notify(self):
+        """Wake up the worker (i.e. once connected)."""
+        with self.cond:
+            self.cond.notify_all()
+
+    def stats(self):
+        """Queue depth and counters."""
+        with self.cond:
+            return {"depth": self.depth, "max_depth": self.max_depth, "enqueued": self.enqueued,
+                    "published": self.published, "dropped": dict(self.dropped)}
+
+
+class Spool:
+    """Append-only, size-capped disk spool of MQTT messages.
+
+    Records are appended to segment files (spool_<n>.seg) of up to segment_size bytes; once
+    the spool exceeds max_bytes the oldest segment is deleted. Each record is framed as
+    magic, topic length, payload length, CRC32 (of topic and payload), topic, payload.
+    read() returns the records of the oldest segment in order: a record with a wrong checksum
+    is skipped, a truncated record (i.e. power loss while writing) ends the segment.
+    Fully replayed segments are deleted with remove().
+    """
+
+    RECORD = struct.Struct("!4sHII")
+    MAGIC = b"SPL1"
+
+    def __init__(self, folder="mqtt_spool", segment_size=1 << 20, max_bytes=50 << 20):
+        self.folder = folder
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.dropped_segments = 0
+        os.makedirs(folder, exist_ok=True)
+        self.segments = sorted(glob.glob(os.path.join(folder, "spool_*.seg")))
+        self.next_index = 1 + max([self._index(f) for f in self.segments], default=0)
+
+    def _index(self, fname):
+        return int(os.path.basename(fname)[6:-4])
+
+    def pending(self):
+        """True when the spool has records to replay."""
+        with self.lock:
+            return bool(self.segments)
+
+    def size(self):
+        with self.lock:
+            return sum(os.path.getsize(f) for f in self.segments if os.path.exists(f))
+
+    def append(self, topic, payload):
+        """Append a record; payload is str (JSON) or bytes."""
+        topic_b = topic.encode("utf-8")
+        payload_b = payload.encode("utf-8") if isinstance(payload, str) else bytes(payload)
+        record = self.RECORD.pack(self.MAGIC, len(topic_b), len(payload_b),
+                                  zlib.crc32(payload_b, zlib.crc32(topic_b))) + topic_b + payload_b
+        with self.lock:
+            if not self.segments or os.path.getsize(self.segments[-1]) + len(record) > self.segment_size:
+                self.segments.append(os.path.join(self.folder, f"spool_{self.next_index:08d}.seg"))
+                self.next_index += 1
+            with open(self.segments[-1], "ab") as f:
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+            while len(self.segments) > 1 and sum(os.path.getsize(f) for f in self.segments) > self.max_bytes:
+                os.remove(self.segments.pop(0))   # size cap: oldest segment is dropped
+                self.dropped_segments += 1
+
+    def read(self):
+        """Segment file name and list of (topic, payload bytes) of the oldest segment, or (None, [])."""
+        with self.lock:
+            if not self.segments:
+                return None, []
+            fname = self.segments[0]
+            with open(fname, "rb") as f:
+                data = f.read()
+        records, pos = [], 0
+        while pos + self.RECORD.size <= len(data):
+            magic, topic_len, payload_len, crc = self.RECORD.unpack_from(data, pos)
+            end = pos + self.RECORD.size + topic_len + payload_len
+            if magic != self.MAGIC or end > len(data):
+                break   # truncated or corrupted tail
+            topic_b = data[pos + self.RECORD.size:pos + self.RECORD.size + topic_len]
+            payload_b = data[pos + self.RECORD.size + topic_len:end]
+            if zlib.crc32(payload_b, zlib.crc32(topic_b)) == crc:
+                records.append((topic_b.decode("utf-8"), payload_b))
+            pos = end
+        return fname, records
+
+    def remove(self, fname):
+        """Delete a replayed segment."""
+        with self.lock:
+            if fname in self.segments:
+                self.segments.remove(fname)
+                os.remove(fname)
+
+
+class MQTTPublisher:
+    def __init__(self, config=None, connect=True):
+        """Initialize the MQTT Publisher and read config once."""
+        self.config = config if config is not None else self.read_config()
+        self.broker = self.config["broker_ip"]
+        self.port = int(self.config["port"]) if self.config["port"] else None
+        self.robot_id = self.config.get("robot_id") or socket.gethostname()
+        self.topic = self.config["topic"].format(robot_id=self.robot_id) if self.config["topic"] else None
+        self.debug_enabled = self.config.get("debug", False)  # Read debug flag from config
+        self.mode = self.config.get("mode", "async")
+        if self.mode not in MODES:
+            raise ValueError(f"MQTT publisher mode must be one of {MODES}, not {self.mode}")
+        self.max_batch = int(self.config.get("max_batch", 100))  # Messages published per burst
+        self.replay_rate = float(self.config.get("spool_replay_rate", 50))  # Spool messages replayed per second
+        self.session = f"{int(time.time()):x}"  # Message ids are session-sequence
+        self.seq = 0
+        self.seq_lock = threading.Lock()
+
+        self.mqtt_client = mqtt.Client()
+        self.mqtt_client.on_connect = self.on_connect
+        self.mqtt_client.on_disconnect = self.on_disconnect
+        self.is_connected = False
+        self.reconnect_attempt = 0
+        self.listeners = []  # Callbacks receiving each JSON message sent (i.e. the server state)
+        self.spool = None
+        if self.mode == "spool":
+            self.spool = Spool(self.config.get("spool_dir", "mqtt_spool"),
+                               int(self.config.get("spool_segment_size", 1 << 20)),
+                               int(self.config.get("spool_max_bytes", 50 << 20)))
+        self.publish_queue = PublishQueue(int(self.config.get("queue_size", 1000)))  # Messages to be published
+        if self.mode != "sync":
+            self._publish_thread = threading.Thread(target=self._process_publish_queue, daemon=True)
+            self._publish_thread.start()
+
+        if connect:
+            self.connect_mqtt()
+
+    def read_config(self):
+        """Read MQTT broker details from the config file."""
+        if not os.path.exists(CONFIG_FILE):
+            print("Config file not found. Using default values.")
+            return {"broker_ip": None, "port": None, "topic": "robot/data", "debug": False, "mode": "async",
+                    "telemetry_window": 0.5, "queue_size": 1000, "max_batch": 100}
+
+        with open(CONFIG_FILE, "r") as file:
+            return json.load(file)
+
+    def on_connect(self, client, userdata, flags, rc):
+        """Handle MQTT connection."""
+        if rc == 0:
+            self.is_connected = True
+            self.reconnect_attempt = 0
+            self.publish_queue.notify()  # queued messages can be published
+            if self.debug_enabled:
+                print("Connected to MQTT Broker")
+        else:
+            print(f"Failed to connect to MQTT Broker. Return code: {rc}")
+
+    def on_disconnect(self, client, userdata, rc):
+        """Handle unexpected disconnections."""
+        self.is_connected = False
+        if rc != 0:
+            print("Unexpected disconnection. Attempting to reconnect...")
+            threading.Thread(target=self.reconnect_mqtt, daemon=True).start()
+
+    def reconnect_mqtt(self):
+        """Reconnect to MQTT broker with exponential backoff."""
+        while not self.is_connected:
+            try:
+                self.reconnect_attempt += 1
+                self.connect_mqtt()
+                if self.is_connected:
+                    if self.debug_enabled:
+                        print("Reconnected successfully.")
+                    return
+                sleep_time = min(2**self.reconnect_attempt, 30)  # Exponential backoff (max 30 sec)
+                if self.debug_enabled:
+                    print(f"Reconnecting in {sleep_time} seconds...")
+                time.sleep(sleep_time)
+            except Exception as e:
+                print(f"Reconnection failed: {e}")
+                time.sleep(min(2**self.reconnect_attempt, 30))  # Retry with backoff
+
+    def connect_mqtt(self):
+        """Connect to the MQTT broker if not already connected."""
+        if self.is_connected:
+            return  # Already connected, no need to reconnect
+
+        if not self.broker or not self.port:
+            print("MQTT broker details are missing. Cannot connect.")
+            return None
 
-# Global MQTT client instance
-mqtt_client = None
-is_connected = False  # Track connection status
-reconnect_attempt = 0  # Track reconnect attempts
-
-def read_config():
-    """Read broker IP and port from the config file."""
-    if not os.path.exists(CONFIG_FILE):
-        print("Config file not found. Using default values.")
-        return {"broker_ip": None, "port": None, "topic": "robot/data"}
-    
-    with open(CONFIG_FILE, "r") as file:
-        return json.load(file)
-
-def on_connect(client, userdata, flags, rc):
-    """Callback for when the client connects to the broker."""
-    global is_connected, reconnect_attempt
-    if rc == 0:
-        is_connected = True
-        reconnect_attempt = 0  # Reset reconnect attempts
-        print("Connected to MQTT broker successfully.")
-    else:
-        print(f"Failed to connect to MQTT broker. Return code: {rc}")
-
-def on_disconnect(client, userdata, rc):
-    """Callback for when the client disconnects."""
-    global is_connected
-    is_connected = False
-    if rc != 0:
-        print("Unexpected disconnection. Attempting to reconnect...")
-        threading.Thread(target=reconnect_mqtt, daemon=True).start()
-
-def reconnect_mqtt():
-    """Reconnect to MQTT broker with exponential backoff."""
-    global mqtt_client, is_connected, reconnect_attempt
-    while not is_connected:
         try:
-            reconnect_attempt += 1
-            connect_mqtt()
-            if is_connected:
-                print("Reconnected successfully.")
-                return
-            sleep_time = min(2**reconnect_attempt, 30)  # Exponential backoff (max 30 sec)
-            print(f"Reconnecting in {sleep_time} seconds...")
-            time.sleep(sleep_time)
+            if self.debug_enabled:
+                print(f"Connecting to MQTT broker at {self.broker}:{self.port}...")
+            self.mqtt_client.connect(self.broker, self.port, 60)
+            self.mqtt_client.loop_start()  # Keeps MQTT connection alive
+            time.sleep(1)  # Give it time to establish connection
         except Exception as e:
-            print(f"Reconnection failed: {e}")
-            time.sleep(min(2**reconnect_attempt, 30))  # Retry with backoff
-
-def connect_mqtt():
-    """Connect to the MQTT broker if not already connected."""
-    global mqtt_client, is_connected
-
-    if is_connected:
-        return  # Already connected, no need to reconnect
-
-    config = read_config()
-    broker = config["broker_ip"]
-    port = config["port"]
-
-    if not broker or not port:
-        print("MQTT broker details are missing. Cannot connect.")
-        return None
-
-    if mqtt_client is None:
-        mqtt_client = mqtt.Client()
-        mqtt_client.on_connect = on_connect
-        mqtt_client.on_disconnect = on_disconnect
-
-    try:
-        print(f"Connecting to MQTT broker at {broker}:{port}...")
-        mqtt_client.connect(broker, int(port), 60)
-        mqtt_client.loop_start()  # ✅ Keeps MQTT connection alive
-        time.sleep(1)  # Give it time to establish connection
-        return mqtt_client
-    except Exception as e:
-        print(f"Failed to connect to MQTT broker: {e}")
-        return None
-
-def publish_message(topic, message):
-    """Publish message and ensure connection before sending."""
-    connect_mqtt()  # Ensure connection before publishing
-
-    if not is_connected:
-        print("Cannot publish: No connection to MQTT broker. Retrying...")
-        while not is_connected:  # Wait until reconnected
-            time.sleep(1)
-        print("Reconnected, retrying publish.")
-
-    try:
-        result = mqtt_client.publish(topic, json.dumps(message), qos=1)
-        result.wait_for_publish()  # Block until the message is published
-        print(f"Published message to {topic}")
+            print(f"Failed to connect to MQTT Broker: {e}")
+
+    def _enqueue_publish(self, topic, message):
+        """Publish (sync mode) or enqueue a message; returns False when the message is dropped."""
+        if "payload" not in message:
+            with self.seq_lock:
+                self.seq += 1
+                message["id"] = f"{self.session}-{self.seq}"  # deduplication id
+            message.setdefault("robot", self.robot_id)
+        if self.mode == "sync":
+            return self._publish_sync(topic, message)
+        return self.publish_queue.put(topic, message)
+
+    def _payload(self, message):
+        return message["payload"] if "payload" in message else json.dumps(message)  # binary or JSON
+
+    def _publish_sync(self, topic, message, timeout=10):
+        """Publish and wait for the broker confirmation (sync mode)."""
+        self.connect_mqtt()  # Ensure connection before publishing
+        start = time.time()
+        while not self.is_connected and time.time() - start < timeout:
+            time.sleep(0.1)
+        try:
+            result = self.mqtt_client.publish(topic, self._payload(message), qos=1)
+            result.wait_for_publish(timeout)  # Block until the message is published
+            with self.publish_queue.cond:
+                self.publish_queue.published += 1
+            return result.is_published()
+        except Exception as e:
+            print(f"Exception during publish: {e}")
+            return False
+
+    def _publish(self, topic, payload):
+        """Publish without waiting; returns False when the client could not take the message."""
+        try:
+            result = self.mqtt_client.publish(topic, payload, qos=1)
+            return getattr(result, "rc", mqtt.MQTT_ERR_SUCCESS) == mqtt.MQTT_ERR_SUCCESS
+        except Exception as e:
+            print(f"Exception during queued publish: {e}")
+            return False
+
+    def _replay_spool(self):
+        """Replay the oldest spool segment in order, at replay_rate messages per second."""
+        fname, records = self.spool.read()
+        for topic, payload in records:
+            if not self.is_connected or not self._publish(topic, payload):
+                return False   # segment kept, replayed again once connected (duplicates dropped by id)
+            time.sleep(1 / self.replay_rate)
+        self.spool.remove(fname)
+        if self.debug_enabled:
+            print(f"Replayed {len(records)} spooled messages")
         return True
-    except Exception as e:
-        print(f"Exception during publish: {e}")
-        return False
 
-def send_solution(solution_string):
-    """Send the solution string before solving starts."""
-    config = read_config()
-    message = {
-        "type": "solution",
-        "solution": solution_string,
-        "timestamp": int(time.time())
-    }
-    return publish_message(config["topic"], message)
-
-def send_command(command, step, total_steps):
-    """Send each command as it is executed."""
-    config = read_config()
-    message = {
-        "type": "command",
-        "command": command,
-        "step": step,
-        "total_steps": total_steps,
-        "timestamp": int(time.time())
-    }
-    return publish_message(config["topic"], message)
-
-def send_face_image(side, image_buffer):
-    """Send each face image as scanned."""
-    config = read_config()
-    encoded_string = base64.b64encode(image_buffer).decode('utf-8')
-    message = {
-        "type": "face",
-        "side": side,
-        "image_data": encoded_string ,
-        "timestamp": int(time.time())
-    }
-    return publish_message(config["topic"], message)
-
-def send_image(image_path):
-    """Send the final image after solving."""
-    try:
-        with open(image_path, "rb") as img_file:
-            encoded_string = base64.b64encode(img_file.read()).decode('utf-8')
-
-        config = read_config()
+    def _process_publish_queue(self):
+        """Publish the queued messages in bursts, in a separate thread.
+        In spool mode, messages are spooled while disconnected (or while older ones are still spooled)."""
+        spool = self.spool
+        ready = (lambda: True) if spool else (lambda: self.is_connected)
+        while True:
+            if spool and self.is_connected and spool.pending():
+                if not self._replay_spool():
+                    time.sleep(0.5)
+                continue
+            batch = self.publish_queue.get_batch(ready, self.max_batch, timeout=0.5)
+            for topic, message in batch:
+                payload = self._payload(message)
+                if spool and (not self.is_connected or spool.pending() or not self._publish(topic, payload)):
+                    spool.append(topic, payload)
+                elif not spool:
+                    self._publish(topic, payload)
+                    # We don't block here
+            if batch:
+                with self.publish_queue.cond:
+                    self.publish_queue.published += len(batch)
+                if self.debug_enabled:
+                    print(f"Published {len(batch)} queued messages")
+
+    def queue_stats(self):
+        """Publish queue depth, counters and dropped messages per type (and spool size, in spool mode)."""
+        stats = self.publish_queue.stats()
+        if self.spool:
+            stats["spool_bytes"] = self.spool.size()
+            stats["spool_dropped_segments"] = self.spool.dropped_segments
+        return stats
+
+    def add_listener(self, callback):
+        """Registers callback(message), called with each JSON message sent (also without broker)."""
+        self.listeners.append(callback)
+
+    def send_message(self, message):
+        """General method to send a message."""
+        for callback in self.listeners:
+            try:
+                callback(message)
+            except Exception as e:
+                print(f"Exception in message listener: {e}")
+        if self.broker and self.port and self.topic:
+            return self._enqueue_publish(self.topic, message)
+        else:
+            print("MQTT broker details or topic not configured.")
+            return False
+
+    def send_solution(self, solution_string):
+        """Send the solution string before solving starts (non-blocking)."""
         message = {
-            "type": "image",
-            "image_data": encoded_string,
+            "type": "solution",
+            "solution": solution_string,
             "timestamp": int(time.time())
         }
-        return publish_message(config["topic"], message)
+        return self.send_message(message)
 
-    except FileNotFoundError:
-        print(f"Error: Image file '{image_path}' not found!")
-        return False
+    def send_command(self, command, step, total_steps):
+        """Send each command as it is executed (non-blocking)."""
+        message = {
+            "type": "command",
+            "command": command,
+            "step": step,
+            "total_steps": total_steps,
+            "timestamp": int(time.time())
+        }
+        return self.send_message(message)
+
+    def send_moves(self, events, progress, total):
+        """Send a batch of robot move events, with the solving progress (non-blocking)."""
+        message = {
+            "type": "moves",
+            "events": events,
+            "progress": progress,
+            "total": total,
+            "timestamp": int(time.time())
+        }
+        return self.send_message(message)
+
+    def send_status(self, robot_state):
+        """Send robot status (non-blocking)."""
+        message = {
+            "type": "status",
+            "robot_state": robot_state,
+            "timestamp": int(time.time())
+        }
+        return self.send_message(message)
+
+    def send_cycle(self, color_method, phases, solved):
+        """Send the solve cycle summary: color detection winner, phase times (secs) and outcome (non-blocking)."""
+        message = {
+            "type": "cycle",
+            "color_method": color_method,
+            "phases": {phase: round(secs, 2) for phase, secs in phases.items()},
+            "solved": solved,
+            "timestamp": int(time.time())
+        }
+        return self.send_message(message)
+
+    def send_binary(self, topic, msg_type, side, payload):
+        """Queue a binary message on topic; msg_type and side are used by the queue drop rules."""
+        if self.broker and self.port and self.topic:
+            return self._enqueue_publish(topic, {"type": msg_type, "side": side, "payload": payload})
+        else:
+            print("MQTT broker details or topic not configured.")
+            return False
+
+    def send_face_image(self, side, image_buffer, width=0, height=0):
+        """Send each face image as scanned, as binary message on <topic>/image/<side> (non-blocking)."""
+        payload = pack_image("face", side, image_buffer, width, height)
+        return self.send_binary(f"{self.topic}/image/{side}", "face", side, payload)
+
+    def send_image(self, image_path, width=0, height=0):
+        """Send the final image after solving, as binary message on <topic>/image/collage (non-blocking)."""
+        try:
+            with open(image_path, "rb") as img_file:
+                payload = pack_image("image", 0, img_file.read(), width, height)
+            return self.send_binary(f"{self.topic}/image/collage", "image", 0, payload)
+
+        except FileNotFoundError:
+            print(f"Error: Image file '{image_path}' not found!")
+            return False
+
+class MoveTelemetry:
+    """Coalesces the robot move events of a solving sequence into few "moves" messages.
+
+    One event per robot move (op, arg, index, total, monotonic time t) is buffered; the buffer is
+    sent as one message once the window (secs, "telemetry_window" in the config file) has elapsed
+    since the previous message, and at the end of the sequence. Each message carries the solving
+    progress percentage of the completed robot moves.
+    """
+
+    def __init__(self, publisher, window=None):
+        self.publisher = publisher
+        self.window = float(publisher.config.get("telemetry_window", 0.5) if window is None else window)
+        self.lock = threading.Lock()
+        self.events = []
+        self.moves = ""
+        self.progress_table = ()
+        self.progress = 0
+        self.last_sent = 0.0
+
+    def start(self, moves, progress):
+        """Start a new sequence: moves is the robot moves string, progress the percentage after each move."""
+        with self.lock:
+            self.events = []
+            self.moves = str(moves)
+            self.progress_table = tuple(progress)
+            self.progress = 0
+            self.last_sent = time.monotonic()
+
+    def move(self, index):
+        """Record the start of the robot move at index; sends the batch when the window has elapsed."""
+        now = time.monotonic()
+        with self.lock:
+            self.events.append({
+                "op": self.moves[2*index],
+                "arg": int(self.moves[2*index + 1]),
+                "index": index,
+                "total": len(self.progress_table),
+                "t": round(now, 3)
+            })
+            self.progress = self.progress_table[index - 1] if index > 0 else 0
+            if now - self.last_sent < self.window:
+                return
+            events, self.events, self.last_sent = self.events, [], now
+        self.publisher.send_moves(events, self.progress, len(self.progress_table))
+
+    def finish(self, completed=True):
+        """Send the buffered events, with 100% progress when the sequence has been completed."""
+        with self.lock:
+            if completed:
+                self.progress = 100
+            events, self.events, self.last_sent = self.events, [], time.monotonic()
+        self.publisher.send_moves(events, self.progress, len(self.progress_table))
 
+# Global instance of MQTTPublisher, reused in all modules
+mqtt_publisher = MQTTPublisher()
+move_telemetry = MoveTelemetry(mqtt_publisher)
@@ -0,0 +1,120 @@
+"""Throughput and backpressure benchmark of the MQTTPublisher queue, against a local broker stand-in.
+
+The stand-in replaces the paho client: publish() only counts the messages (optionally
+waiting a fixed time per message), so the benchmark measures the publisher queue alone.
+
+Scenarios:
+  - throughput: messages enqueued as fast as possible, broker connected
+  - broker down: mixed messages enqueued while disconnected, then the broker comes back;
+    the queue depth stays bounded, status messages are all published, and only the
+    latest face image per side is kept
+The legacy queue (list, pop(0), one message every 0.1 s) is measured for reference.
+
+Example: python mqtt_publisher_bench.py --messages 20000
+"""
+
+import argparse
+import threading
+import time
+
+from mqtt_publisher import MQTTPublisher
+
+
+class StandInClient:
+    """Local broker stand-in, with the publish() of the paho client."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.messages = []
+
+    def publish(self, topic, payload, qos=0):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.messages.append((topic, payload))
+
+
+def make_publisher(queue_size, latency=0.0):
+    """Publisher on the broker stand-in, not connected."""
+    config = {"broker_ip": "stand-in", "port": 1883, "topic": "robot/data", "debug": False,
+              "queue_size": queue_size, "max_batch": 100}
+    publisher = MQTTPublisher(config, connect=False)
+    publisher.mqtt_client = StandInClient(latency)
+    return publisher
+
+
+def connect(publisher):
+    publisher.on_connect(None, None, None, 0)
+
+
+def wait_drained(publisher, timeout=60):
+    start = time.time()
+    while publisher.queue_stats()["depth"] and time.time() - start < timeout:
+        time.sleep(0.001)
+    while publisher.queue_stats()["published"] < publisher.queue_stats()["enqueued"] - sum(
+            publisher.queue_stats()["dropped"].values()) and time.time() - start < timeout:
+        time.sleep(0.001)
+
+
+def moves_message(i):
+    return {"type": "moves", "events": [{"op": "F", "arg": 1, "index": i, "total": 0, "t": 0.0}],
+            "progress": 0, "total": 0, "timestamp": 0}
+
+
+def bench_throughput(n, latency):
+    publisher = make_publisher(queue_size=n, latency=latency)
+    connect(publisher)
+    start = time.perf_counter()
+    for i in range(n):
+        publisher.send_message(moves_message(i))
+    wait_drained(publisher)
+    elapsed = time.perf_counter() - start
+    return len(publisher.mqtt_client.messages) / elapsed, publisher.queue_stats()
+
+
+def bench_broker_down(n, queue_size):
+    publisher = make_publisher(queue_size=queue_size)
+    statuses = 0
+    for i in range(n):
+        if i % 100 == 0:
+            publisher.send_status(f"state {i}")
+            statuses += 1
+        elif i % 10 == 0:
+            publisher.send_face_image(1 + i % 6, b"\xff\xd8jpeg" * 100)
+        else:
+            publisher.send_message(moves_message(i))
+    stats_down = publisher.queue_stats()
+    connect(publisher)
+    wait_drained(publisher)
+    published = publisher.mqtt_client.messages
+    published_status = sum(1 for t, p in published if isinstance(p, str) and '"type": "status"' in p)
+    published_faces = sum(1 for t, p in published if "/image/" in t)
+    return stats_down, publisher.queue_stats(), statuses, published_status, published_faces
+
+
+def bench_legacy(secs):
+    """Legacy worker loop: list, pop(0), one message every 0.1 s."""
+    queue, sent = [moves_message(i) for i in range(1000)], []
+    start = time.time()
+    while time.time() - start < secs:
+        if queue:
+            sent.append(queue.pop(0))
+        time.sleep(0.1)
+    return len(sent) / (time.time() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MQTTPublisher queue benchmark, on a broker stand-in")
+    parser.add_argument("--messages", type=int, default=20000, help="Messages per scenario")
+    parser.add_argument("--queue_size", type=int, default=1000, help="Queue size for the broker down scenario")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stand-in time per published message (secs)")
+    parser.add_argument("--legacy_secs", type=float, default=2.0, help="Legacy queue measuring time (secs)")
+    args = parser.parse_args()
+
+    rate, stats = bench_throughput(args.messages, args.latency)
+    print(f"throughput:  {rate:,.0f} msg/s   ({stats})")
+    print(f"legacy:      {bench_legacy(args.legacy_secs):,.1f} msg/s")
+    down, after, statuses, pub_status, pub_faces = bench_broker_down(args.messages, args.queue_size)
+    print(f"broker down: max depth {down['max_depth']} (queue size {args.queue_size}), dropped {down['dropped']}")
+    print(f"reconnected: published {after['published']}, status {pub_status}/{statuses}, face images {pub_faces}")
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class RobotEvents:
+    """Versioned robot state, pushed to the long-poll (/status?wait_for_change=) and SSE (/events) clients.
+
+    The state holds the API status (idle, scrambling, solving, stopping), the robot phase (robot
+    state of the status messages, "scanning" with the side, "moving" with the solving progress),
+    the solution and the last error. update() can be called from any thread: the version is
+    bumped only when the state changes, and the asyncio waiters are woken up on their loop.
+    The last `history` states are kept, for the SSE clients to receive every transition.
+    """
+
+    def __init__(self, history=200):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.state = {"status": "idle", "phase": "idle", "side": None, "progress": 0,
+                      "solution": None, "error": None, "time": time.time()}
+        self.history = deque(maxlen=history)  # states, with their version
+        self.waiters = set()  # (event loop, asyncio.Event)
+
+    def update(self, **changes):
+        """Applies the changes to the state; returns the new version (unchanged when nothing changed)."""
+        with self.lock:
+            if all(self.state.get(key) == value for key, value in changes.items()):
+                return self.version
+            self.state.update(changes, time=time.time())
+            self.version += 1
+            self.history.append({"version": self.version, **self.state})
+            waiters = list(self.waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # event loop closed
+        return self.version
+
+    def on_message(self, message):
+        """Publisher listener: the state follows the status, solution and moves messages."""
+        msg_type = message.get("type")
+        if msg_type == "status":
+            self.update(phase=message["robot_state"].lower(), side=None)
+        elif msg_type == "solution":
+            self.update(solution=message["solution"], progress=0)
+        elif msg_type == "moves":
+            self.update(phase="moving", progress=message["progress"])
+
+    def snapshot(self):
+        """Current state, with its version."""
+        with self.lock:
+            return {"version": self.version, **self.state}
+
+    def since(self, version):
+        """States after version, oldest first; None when they are no longer in the history, or when
+        version is ahead of the state (i.e. a client reconnecting after a restart reset the version)."""
+        with self.lock:
+            if version > self.version:
+                return None
+            if version == self.version:
+                return []
+            if not self.history or self.history[0]["version"] > version + 1:
+                return None
+            return [state for state in self.history if state["version"] > version]
+
+    async def wait(self, version, timeout=30):
+        """Waits until the state version differs from version (or timeout secs); returns the current state."""
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        with self.lock:
+            if self.version != version:
+                return {"version": self.version, **self.state}
+            self.waiters.add(entry)
+        try:
+            await asyncio.wait_for(entry[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.lock:
+                self.waiters.discard(entry)
+        return self.snapshot()
+
+
+# Global instance, updated by the robot cycles and the published messages
+robot_events = RobotEvents()
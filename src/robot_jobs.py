@@ -0,0 +1,173 @@
+import itertools
+import json
+import os
+import threading
+import time
+
+JOB_KINDS = ("scramble", "solve")
+QUEUED, RUNNING, DONE, FAILED, CANCELLED, INTERRUPTED = "queued", "running", "done", "failed", "cancelled", "interrupted"
+FINISHED = (DONE, FAILED, CANCELLED, INTERRUPTED)
+
+
+class JobQueue:
+    """Persistent FIFO queue of robot jobs, run one at a time by a dedicated worker thread.
+
+    A job is a dict: id, kind (scramble or solve), cycle, priority (higher first, FIFO within the
+    same priority), state (queued, running, done, failed, cancelled, interrupted), timestamps
+    (created, started, finished), duration (secs), result and error.
+    runner(job) runs the job on the worker thread and returns its result (i.e. "Cube_solved");
+    an exception fails the job. cancel_running(job_id) stops the running job (i.e. as the stop button),
+    and returns True when it has been stopped; It is called holding self.cond (reentrant), for the job
+    not to end (and the next one start) meanwhile. Only the jobs actually stopped are marked cancelled.
+    The queue is saved to path (JSON, atomic replace) at every change: queued jobs survive a restart,
+    while a job found running at startup is marked interrupted. The last `history` finished jobs are kept.
+    listener(stats), when given, is called with the queue stats at every change.
+    """
+
+    def __init__(self, runner, cancel_running, path="robot_jobs.json", history=200, listener=None):
+        self.runner = runner
+        self.cancel_running = cancel_running
+        self.path = path
+        self.history = history
+        self.listener = listener
+        self.cond = threading.Condition()
+        self.jobs = []  # all the jobs kept, in submission order
+        self.running = None
+        self.cancelled = set()  # ids of the running jobs stopped by cancel
+        self.load()
+        self.ids = itertools.count(1 + max((job["id"] for job in self.jobs), default=0))
+        self.thread = None
+
+    def load(self):
+        """Loads the saved queue; jobs saved as running have been interrupted by a restart."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.jobs = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading the jobs queue {self.path}: {e}")
+            self.jobs = []
+        for job in self.jobs:
+            if job["state"] == RUNNING:
+                job.update(state=INTERRUPTED, finished=time.time(), error="Robot restarted while running")
+
+    def save(self):
+        """Saves the queue (caller holds the lock)."""
+        finished = [job for job in self.jobs if job["state"] in FINISHED]
+        if len(finished) > self.history:
+            drop = {id(job) for job in finished[:len(finished) - self.history]}
+            self.jobs = [job for job in self.jobs if id(job) not in drop]
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self.jobs, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Error saving the jobs queue {self.path}: {e}")
+
+    def changed(self):
+        """Saves the queue, wakes up the worker and notifies the listener (caller holds the lock)."""
+        self.save()
+        self.cond.notify_all()
+        if self.listener:
+            self.listener(self._stats())
+
+    def start(self):
+        """Starts the worker thread."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def submit(self, kind, cycle=1, priority=0):
+        """Queues a job; returns it."""
+        return self.submit_batch([(kind, cycle)], priority)[0]
+
+    def submit_batch(self, jobs, priority=0):
+        """Queues the (kind, cycle) jobs, in order; returns them."""
+        for kind, cycle in jobs:
+            if kind not in JOB_KINDS:
+                raise ValueError(f"Job kind must be one of {JOB_KINDS}, not {kind}")
+        with self.cond:
+            new = [{"id": next(self.ids), "kind": kind, "cycle": cycle, "priority": priority, "state": QUEUED,
+                    "created": time.time(), "started": None, "finished": None, "duration": None,
+                    "result": None, "error": None} for kind, cycle in jobs]
+            self.jobs.extend(new)
+            self.changed()
+            return [dict(job) for job in new]
+
+    def cancel(self, job_id):
+        """Cancels a queued job, or stops the running one; returns the job (None when not found),
+        with stopping True when the running job has been stopped."""
+        with self.cond:
+            job = self._find(job_id)
+            if job is None or job["state"] in FINISHED:
+                return dict(job) if job else None
+            if job["state"] == QUEUED:
+                job.update(state=CANCELLED, finished=time.time())
+                self.changed()
+                return dict(job)
+            stopping = self.running is job and bool(self.cancel_running(job_id))
+            if stopping:                                # case the running job has been stopped
+                self.cancelled.add(job_id)
+            return dict(job, stopping=stopping)
+
+    def cancel_queued(self):
+        """Cancels all the queued jobs; returns how many."""
+        with self.cond:
+            queued = [job for job in self.jobs if job["state"] == QUEUED]
+            for job in queued:
+                job.update(state=CANCELLED, finished=time.time())
+            if queued:
+                self.changed()
+            return len(queued)
+
+    def get(self, job_id):
+        with self.cond:
+            job = self._find(job_id)
+            return dict(job) if job else None
+
+    def list(self):
+        """Running job, queued jobs (in run order) and finished jobs (latest first)."""
+        with self.cond:
+            return {"running": dict(self.running) if self.running else None,
+                    "queued": [dict(job) for job in self._queued()],
+                    "finished": [dict(job) for job in reversed(self.jobs) if job["state"] in FINISHED],
+                    **self._stats()}
+
+    def stats(self):
+        with self.cond:
+            return self._stats()
+
+    def _stats(self):
+        return {"queued_jobs": len(self._queued()), "running_job": self.running["id"] if self.running else None}
+
+    def _find(self, job_id):
+        return next((job for job in self.jobs if job["id"] == job_id), None)
+
+    def _queued(self):
+        """Queued jobs, in run order: higher priority first, then submission order."""
+        return sorted((job for job in self.jobs if job["state"] == QUEUED), key=lambda job: -job["priority"])
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self._queued():
+                    self.cond.wait()
+                job = self._queued()[0]
+                job.update(state=RUNNING, started=time.time())
+                self.running = job
+                self.changed()
+            try:
+                result, error = self.runner(dict(job)), None
+            except Exception as e:
+                result, error = None, str(e)
+                print(f"Exception while running job {job['id']} ({job['kind']}): {e}")
+            with self.cond:
+                finished = time.time()
+                state = CANCELLED if job["id"] in self.cancelled else (FAILED if error else DONE)
+                self.cancelled.discard(job["id"])
+                job.update(state=state, finished=finished, duration=round(finished - job["started"], 3),
+                           result=result, error=error)
+                self.running = None
+                self.changed()